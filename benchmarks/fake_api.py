@@ -0,0 +1,607 @@
+"""A local stand-in for the Discord REST API, for end-to-end load tests.
+
+Serves the routes the bot and the worker use (login, command sync, guilds,
+channels, roles, member roles, messages, threads, interaction callbacks and
+webhook followups) from an in-memory world, with Discord's rate limit headers:
+each route and major ID (channel, guild, interaction or webhook) gets a bucket of
+--route-limit requests per --route-window seconds, and all but interaction
+routes share --global-limit requests per second. Requests over a limit get a 429
+with retry_after, which discord.py's own client handles. Interaction callbacks
+arriving more than 3 seconds after the interaction was created fail, as on Discord.
+
+    python -m benchmarks.fake_api --port 8081 --members 1000
+    DISCORD_API_BASE=http://127.0.0.1:8081/api/v10 DISCORD_TOKEN=x python -m bot.worker --once
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from aiohttp import web
+from discord.utils import snowflake_time, time_snowflake
+
+from bot.config import MEMBER_ROLES
+
+API_PREFIX = '/api/v10'
+# Interactions must be answered this many seconds after they were created
+INTERACTION_DEADLINE = 3.0
+ADMINISTRATOR = 1 << 3
+ALL_PERMISSIONS = (1 << 51) - 1
+CHANNEL_TEXT, CHANNEL_VOICE, CHANNEL_CATEGORY, CHANNEL_THREAD = 0, 2, 4, 11
+# Interaction callback types that post or update a message, and the one that opens a modal
+MESSAGE_CALLBACKS = (4, 7)
+CALLBACK_MODAL = 9
+# Share of members holding one member role; the rest have none
+MEMBER_ROLE_SHARE = 0.6
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _json(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), status=status,
+                        headers={**(headers or {}), 'Content-Type': 'application/json'})
+
+
+def _error(status: int, message: str, code: int = 0) -> web.Response:
+    return _json({'message': message, 'code': code}, status=status)
+
+
+class InteractionTiming:
+    """When an interaction was created, first answered and last followed up, in epoch seconds."""
+
+    __slots__ = ('created', 'acked', 'done', 'expired')
+
+    def __init__(self, created: float):
+        self.created = created
+        self.acked: Optional[float] = None
+        self.done: Optional[float] = None
+        self.expired = False
+
+
+class FakeDiscordAPI:
+    """One bot, its application and guilds of seeded members, served over HTTP."""
+
+    def __init__(self, guilds: int = 1, members: int = 1000, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 route_limit: int = 5, route_window: float = 1.0, global_limit: int = 50, seed: int = 1):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.route_limit = route_limit
+        self.route_window = route_window
+        self.global_limit = global_limit
+        self.rng = random.Random(seed)
+        self._ids = itertools.count(time_snowflake(datetime.now(timezone.utc)))
+        # Per-route request and 429 counts, keyed like 'POST /channels/{channel_id}/messages'
+        self.requests = Counter()
+        self.rate_limited = Counter()
+        self.interactions: Dict[str, InteractionTiming] = {}
+        # Interaction token -> the modal it was answered with, as the user's client would show it
+        self.modals: Dict[str, dict] = {}
+        self._buckets: Dict[tuple, list] = {}
+
+        self.application_id = self.next_id()
+        self.user = self._user(self.application_id, 'Benchmark Bot', bot=True)
+        self.guilds: Dict[int, dict] = {}
+        self.channels: Dict[int, dict] = {}
+        self.messages: Dict[int, dict] = {}
+        self.commands: Dict[Optional[int], list] = {}
+        for n in range(guilds):
+            self._seed_guild(f"Load Test {n}", members)
+        self.runner: Optional[web.AppRunner] = None
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    # ============== WORLD ==============
+
+    def _user(self, user_id: int, name: str, bot: bool = False) -> dict:
+        return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': None,
+                'avatar': None, 'bot': bot}
+
+    def _member(self, user: dict, roles: list) -> dict:
+        return {'user': user, 'roles': [str(r) for r in roles], 'nick': None, 'avatar': None,
+                'joined_at': _now_iso(), 'deaf': False, 'mute': False, 'flags': 0, 'pending': False}
+
+    def _seed_guild(self, name: str, members: int):
+        guild_id = self.next_id()
+        owner_id = self.next_id()
+        guild = {
+            'id': str(guild_id), 'name': name, 'icon': None, 'owner_id': str(owner_id), 'features': [],
+            'verification_level': 0, 'default_message_notifications': 0, 'explicit_content_filter': 0,
+            'mfa_level': 0, 'nsfw_level': 0, 'premium_tier': 0, 'preferred_locale': 'en-US',
+            'system_channel_flags': 0, 'afk_timeout': 300, 'emojis': [], 'stickers': [],
+            'roles': {}, 'members': {},
+        }
+        self.guilds[guild_id] = guild
+        # @everyone shares the guild's ID
+        self._add_role(guild, {'name': '@everyone'}, role_id=guild_id)
+        member_roles = [self._add_role(guild, {'name': role_name})['id'] for role_name in MEMBER_ROLES]
+        guild['members'][owner_id] = self._member(self._user(owner_id, 'owner'), [])
+        guild['members'][self.application_id] = self._member(self.user, [])
+        for i in range(members):
+            user_id = self.next_id()
+            roles = [self.rng.choice(member_roles)] if self.rng.random() < MEMBER_ROLE_SHARE else []
+            guild['members'][user_id] = self._member(self._user(user_id, f"member{i}"), roles)
+        for channel_name in ('general', 'bot-commands'):
+            self._add_channel(guild_id, {'name': channel_name, 'type': CHANNEL_TEXT})
+
+    def _add_role(self, guild: dict, fields: dict, role_id: int = None) -> dict:
+        role = {
+            'id': str(role_id or self.next_id()), 'name': fields.get('name', 'new role'), 'color': fields.get('color', 0),
+            'hoist': bool(fields.get('hoist')), 'position': len(guild['roles']), 'permissions': '0',
+            'managed': False, 'mentionable': bool(fields.get('mentionable')), 'flags': 0,
+            'icon': None, 'unicode_emoji': None,
+        }
+        guild['roles'][int(role['id'])] = role
+        return role
+
+    def _add_channel(self, guild_id: int, fields: dict) -> dict:
+        channel = {
+            'id': str(self.next_id()), 'guild_id': str(guild_id), 'name': fields.get('name', 'channel'),
+            'type': fields.get('type', CHANNEL_TEXT), 'position': len(self.channels),
+            'permission_overwrites': [], 'parent_id': fields.get('parent_id'), 'topic': fields.get('topic'),
+            'nsfw': False, 'rate_limit_per_user': 0, 'flags': 0, 'last_message_id': None,
+        }
+        if channel['type'] == CHANNEL_VOICE:
+            channel.update(bitrate=64000, user_limit=0, rtc_region=None)
+        self.channels[int(channel['id'])] = channel
+        return channel
+
+    def _add_thread(self, parent: dict, name: str, thread_id: int = None) -> dict:
+        thread = {
+            'id': str(thread_id or self.next_id()), 'guild_id': parent['guild_id'], 'parent_id': parent['id'],
+            'owner_id': self.user['id'], 'name': name, 'type': CHANNEL_THREAD, 'last_message_id': None,
+            'rate_limit_per_user': 0, 'message_count': 0, 'member_count': 1, 'flags': 0,
+            'thread_metadata': {'archived': False, 'locked': False, 'auto_archive_duration': 1440,
+                                'archive_timestamp': _now_iso()},
+        }
+        self.channels[int(thread['id'])] = thread
+        return thread
+
+    def _message(self, channel_id: str, body: dict, guild_id: str = None, webhook_id: str = None) -> dict:
+        message = {
+            'id': str(self.next_id()), 'channel_id': channel_id, 'author': self.user,
+            'content': body.get('content') or '', 'timestamp': _now_iso(), 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+            'embeds': body.get('embeds') or [], 'components': body.get('components') or [],
+            'pinned': False, 'type': 0, 'flags': body.get('flags') or 0,
+        }
+        if webhook_id:
+            message['webhook_id'] = webhook_id
+        if guild_id:
+            # Only channel messages can be fetched or edited later
+            message['guild_id'] = guild_id
+            self.messages[int(message['id'])] = message
+        return message
+
+    def guild_payload(self, guild_id: int, full: bool = False) -> dict:
+        """A guild as GET /guilds/{id} returns it, or with full as the gateway's GUILD_CREATE sends it."""
+        guild = self.guilds[guild_id]
+        payload = {k: v for k, v in guild.items() if k not in ('roles', 'members')}
+        payload['roles'] = list(guild['roles'].values())
+        payload['member_count'] = len(guild['members'])
+        if full:
+            channels = [c for c in self.channels.values() if c['guild_id'] == str(guild_id)]
+            payload.update(
+                channels=[c for c in channels if c['type'] != CHANNEL_THREAD],
+                threads=[c for c in channels if c['type'] == CHANNEL_THREAD],
+                members=list(guild['members'].values()), large=len(guild['members']) > 250,
+                joined_at=_now_iso(), voice_states=[], presences=[],
+                stage_instances=[], guild_scheduled_events=[], soundboard_sounds=[],
+            )
+        return payload
+
+    def channel_guild(self, channel_id) -> Optional[dict]:
+        channel = self.channels.get(int(channel_id))
+        return channel and self.guilds.get(int(channel['guild_id']))
+
+    # ============== RATE LIMITS ==============
+
+    def _take(self, bucket: tuple, limit: int, window: float) -> tuple:
+        """Spend one request from bucket: (allowed, remaining, seconds until reset)."""
+        now = time.monotonic()
+        state = self._buckets.get(bucket)
+        if state is None or now >= state[0]:
+            # [reset time, requests left]
+            state = self._buckets[bucket] = [now + window, limit]
+        if state[1] <= 0:
+            return False, 0, state[0] - now
+        state[1] -= 1
+        return True, state[1], state[0] - now
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        resource = request.match_info.route.resource
+        if resource is None:
+            return _error(404, '404: Not Found')
+        route = f"{request.method} {resource.canonical[len(API_PREFIX):]}"
+        self.requests[route] += 1
+        info = request.match_info
+        interaction_route = route.split(' ', 1)[1].startswith(('/interactions/', '/webhooks/'))
+        if not interaction_route and not request.headers.get('Authorization', '').startswith('Bot '):
+            return _error(401, '401: Unauthorized')
+
+        headers = {'Via': '1.1 google'}
+        if self.global_limit and not interaction_route:
+            allowed, _, reset_after = self._take(('global',), self.global_limit, 1.0)
+            if not allowed:
+                return self._too_many(route, reset_after, headers, is_global=True)
+        if self.route_limit:
+            # Interaction webhooks are limited per token, like each interaction's callback
+            major = (info.get('channel_id') or info.get('guild_id') or info.get('interaction_id')
+                     or (info.get('webhook_id'), info.get('token')))
+            bucket_hash = hashlib.md5(route.encode()).hexdigest()[:16]
+            allowed, remaining, reset_after = self._take((route, major), self.route_limit, self.route_window)
+            headers.update({
+                'X-RateLimit-Bucket': bucket_hash,
+                'X-RateLimit-Limit': str(self.route_limit),
+                'X-RateLimit-Remaining': str(remaining),
+                'X-RateLimit-Reset': f"{time.time() + reset_after:.3f}",
+                'X-RateLimit-Reset-After': f"{reset_after:.3f}",
+            })
+            if not allowed:
+                return self._too_many(route, reset_after, headers, is_global=False)
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    def _too_many(self, route: str, retry_after: float, headers: dict, is_global: bool) -> web.Response:
+        self.rate_limited[route] += 1
+        headers = dict(headers, **{'Retry-After': str(max(1, round(retry_after))),
+                                   'X-RateLimit-Scope': 'global' if is_global else 'user'})
+        if is_global:
+            headers['X-RateLimit-Global'] = 'true'
+        return _json({'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3),
+                                  'global': is_global}, status=429, headers=headers)
+
+    # ============== ROUTES ==============
+
+    async def _body(self, request: web.Request):
+        """JSON body, or payload_json of a multipart upload (its files are dropped)."""
+        if not request.can_read_body:
+            return {}
+        if request.content_type.startswith('multipart/'):
+            form = await request.post()
+            return json.loads(form.get('payload_json') or '{}')
+        return await request.json()
+
+    async def get_me(self, request):
+        return _json(self.user)
+
+    async def get_application(self, request):
+        return _json({
+            'id': str(self.application_id), 'name': self.user['username'], 'icon': None, 'description': '',
+            'rpc_origins': [], 'bot_public': True, 'bot_require_code_grant': False, 'owner': self.user,
+            'summary': '', 'verify_key': '0' * 64, 'flags': 0, 'team': None, 'interactions_endpoint_url': None,
+        })
+
+    async def put_commands(self, request):
+        guild_id = request.match_info.get('guild_id')
+        commands = []
+        for command in await self._body(request):
+            command = dict(command, id=str(self.next_id()), application_id=str(self.application_id), version='1')
+            if guild_id:
+                command['guild_id'] = guild_id
+            commands.append(command)
+        self.commands[int(guild_id) if guild_id else None] = commands
+        return _json(commands)
+
+    async def get_my_guilds(self, request):
+        return _json([
+            {'id': g['id'], 'name': g['name'], 'icon': None, 'owner': False, 'permissions': str(ALL_PERMISSIONS),
+             'features': []} for g in self.guilds.values()
+        ])
+
+    def _guild(self, request) -> Optional[dict]:
+        return self.guilds.get(int(request.match_info['guild_id']))
+
+    async def get_guild(self, request):
+        guild = self._guild(request)
+        if not guild:
+            return _error(404, 'Unknown Guild', 10004)
+        return _json(self.guild_payload(int(guild['id'])))
+
+    async def get_guild_channels(self, request):
+        guild_id = request.match_info['guild_id']
+        return _json([
+            c for c in self.channels.values() if c['guild_id'] == guild_id and c['type'] != CHANNEL_THREAD
+        ])
+
+    async def post_guild_channel(self, request):
+        guild = self._guild(request)
+        if not guild:
+            return _error(404, 'Unknown Guild', 10004)
+        return _json(self._add_channel(int(guild['id']), await self._body(request)), status=201)
+
+    async def get_roles(self, request):
+        guild = self._guild(request)
+        return _json(list(guild['roles'].values())) if guild else _error(404, 'Unknown Guild', 10004)
+
+    async def post_role(self, request):
+        guild = self._guild(request)
+        if not guild:
+            return _error(404, 'Unknown Guild', 10004)
+        return _json(self._add_role(guild, await self._body(request)))
+
+    async def patch_role(self, request):
+        guild = self._guild(request)
+        role = guild and guild['roles'].get(int(request.match_info['role_id']))
+        if not role:
+            return _error(404, 'Unknown Role', 10011)
+        role.update({k: v for k, v in (await self._body(request)).items() if k in role})
+        return _json(role)
+
+    async def delete_role(self, request):
+        guild = self._guild(request)
+        if not guild or not guild['roles'].pop(int(request.match_info['role_id']), None):
+            return _error(404, 'Unknown Role', 10011)
+        return web.Response(status=204)
+
+    async def get_members(self, request):
+        guild = self._guild(request)
+        if not guild:
+            return _error(404, 'Unknown Guild', 10004)
+        limit = min(int(request.query.get('limit', 1)), 1000)
+        after = int(request.query.get('after', 0))
+        members = sorted((uid, m) for uid, m in guild['members'].items() if uid > after)
+        return _json([m for _, m in members[:limit]])
+
+    async def get_member(self, request):
+        guild = self._guild(request)
+        member = guild and guild['members'].get(int(request.match_info['user_id']))
+        return _json(member) if member else _error(404, 'Unknown Member', 10007)
+
+    async def put_member_role(self, request):
+        guild = self._guild(request)
+        member = guild and guild['members'].get(int(request.match_info['user_id']))
+        role_id = request.match_info['role_id']
+        if not member or int(role_id) not in guild['roles']:
+            return _error(404, 'Unknown Member' if not member else 'Unknown Role', 10007 if not member else 10011)
+        if role_id not in member['roles']:
+            member['roles'].append(role_id)
+        return web.Response(status=204)
+
+    async def delete_member_role(self, request):
+        guild = self._guild(request)
+        member = guild and guild['members'].get(int(request.match_info['user_id']))
+        if not member:
+            return _error(404, 'Unknown Member', 10007)
+        if request.match_info['role_id'] in member['roles']:
+            member['roles'].remove(request.match_info['role_id'])
+        return web.Response(status=204)
+
+    def _channel(self, request) -> Optional[dict]:
+        return self.channels.get(int(request.match_info['channel_id']))
+
+    async def get_channel(self, request):
+        channel = self._channel(request)
+        return _json(channel) if channel else _error(404, 'Unknown Channel', 10003)
+
+    async def patch_channel(self, request):
+        channel = self._channel(request)
+        if not channel:
+            return _error(404, 'Unknown Channel', 10003)
+        body = await self._body(request)
+        channel.update({k: v for k, v in body.items() if k in channel})
+        if 'thread_metadata' in channel:
+            channel['thread_metadata'].update({k: body[k] for k in ('archived', 'locked') if k in body})
+        return _json(channel)
+
+    async def delete_channel(self, request):
+        channel = self.channels.pop(int(request.match_info['channel_id']), None)
+        return _json(channel) if channel else _error(404, 'Unknown Channel', 10003)
+
+    async def post_message(self, request):
+        channel = self._channel(request)
+        if not channel:
+            return _error(404, 'Unknown Channel', 10003)
+        message = self._message(channel['id'], await self._body(request), channel['guild_id'])
+        channel['last_message_id'] = message['id']
+        return _json(message)
+
+    def _find_message(self, request) -> Optional[dict]:
+        message = self.messages.get(int(request.match_info['message_id']))
+        if message and message['channel_id'] == request.match_info['channel_id']:
+            return message
+        return None
+
+    async def get_message(self, request):
+        message = self._find_message(request)
+        return _json(message) if message else _error(404, 'Unknown Message', 10008)
+
+    async def patch_message(self, request):
+        message = self._find_message(request)
+        if not message:
+            return _error(404, 'Unknown Message', 10008)
+        body = await self._body(request)
+        message.update({k: v for k, v in body.items() if k in ('content', 'embeds', 'components', 'flags')})
+        message['edited_timestamp'] = _now_iso()
+        return _json(message)
+
+    async def delete_message(self, request):
+        message = self._find_message(request)
+        if not message:
+            return _error(404, 'Unknown Message', 10008)
+        del self.messages[int(message['id'])]
+        return web.Response(status=204)
+
+    async def post_message_thread(self, request):
+        message = self._find_message(request)
+        if not message:
+            return _error(404, 'Unknown Message', 10008)
+        # A thread started from a message shares its ID
+        thread = self._add_thread(self._channel(request), (await self._body(request)).get('name', 'thread'),
+                                  thread_id=int(message['id']))
+        return _json(thread, status=201)
+
+    async def post_thread(self, request):
+        channel = self._channel(request)
+        if not channel:
+            return _error(404, 'Unknown Channel', 10003)
+        return _json(self._add_thread(channel, (await self._body(request)).get('name', 'thread')),
+                                 status=201)
+
+    async def post_interaction_callback(self, request):
+        interaction_id = int(request.match_info['interaction_id'])
+        token = request.match_info['token']
+        now = time.time()
+        timing = self.interactions.get(token)
+        if timing is None:
+            timing = self.interactions[token] = InteractionTiming(snowflake_time(interaction_id).timestamp())
+        if timing.acked is not None:
+            return _error(400, 'Interaction has already been acknowledged.', 40060)
+        if now - timing.created > INTERACTION_DEADLINE:
+            timing.expired = True
+            return _error(404, 'Unknown interaction', 10062)
+        timing.acked = timing.done = now
+
+        body = await self._body(request)
+        callback_type = body.get('type')
+        data = body.get('data') or {}
+        flags = data.get('flags') or 0
+        payload = {'interaction': {
+            'id': str(interaction_id), 'type': 2,
+            'response_message_loading': callback_type == 5,
+            'response_message_ephemeral': bool(flags & 64),
+        }}
+        if callback_type in MESSAGE_CALLBACKS:
+            message = self._message('0', data, webhook_id=str(self.application_id))
+            payload['interaction']['response_message_id'] = message['id']
+            payload['resource'] = {'type': callback_type, 'message': message}
+        elif callback_type == CALLBACK_MODAL:
+            self.modals[token] = data
+        return _json(payload)
+
+    def _followed_up(self, token: str) -> Optional[web.Response]:
+        timing = self.interactions.get(token)
+        if timing is None or timing.acked is None:
+            return _error(404, 'Unknown Webhook', 10015)
+        timing.done = time.time()
+        return None
+
+    async def post_followup(self, request):
+        error = self._followed_up(request.match_info['token'])
+        if error:
+            return error
+        message = self._message('0', await self._body(request), webhook_id=request.match_info['webhook_id'])
+        if request.query.get('wait', 'false').lower() in ('true', '1'):
+            return _json(message)
+        return web.Response(status=204)
+
+    async def webhook_message(self, request):
+        error = self._followed_up(request.match_info['token'])
+        if error:
+            return error
+        message = self._message('0', {}, webhook_id=request.match_info['webhook_id'])
+        if request.method == 'DELETE':
+            return web.Response(status=204)
+        if request.method == 'PATCH':
+            message.update({k: v for k, v in (await self._body(request)).items() if k in ('content', 'embeds', 'components')})
+        return _json(message)
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        routes = [
+            ('GET', '/users/@me', self.get_me),
+            ('GET', '/users/@me/guilds', self.get_my_guilds),
+            ('GET', '/oauth2/applications/@me', self.get_application),
+            ('PUT', '/applications/{application_id}/commands', self.put_commands),
+            ('PUT', '/applications/{application_id}/guilds/{guild_id}/commands', self.put_commands),
+            ('GET', '/guilds/{guild_id}', self.get_guild),
+            ('GET', '/guilds/{guild_id}/channels', self.get_guild_channels),
+            ('POST', '/guilds/{guild_id}/channels', self.post_guild_channel),
+            ('GET', '/guilds/{guild_id}/roles', self.get_roles),
+            ('POST', '/guilds/{guild_id}/roles', self.post_role),
+            ('PATCH', '/guilds/{guild_id}/roles/{role_id}', self.patch_role),
+            ('DELETE', '/guilds/{guild_id}/roles/{role_id}', self.delete_role),
+            ('GET', '/guilds/{guild_id}/members', self.get_members),
+            ('GET', '/guilds/{guild_id}/members/{user_id}', self.get_member),
+            ('PUT', '/guilds/{guild_id}/members/{user_id}/roles/{role_id}', self.put_member_role),
+            ('DELETE', '/guilds/{guild_id}/members/{user_id}/roles/{role_id}', self.delete_member_role),
+            ('GET', '/channels/{channel_id}', self.get_channel),
+            ('PATCH', '/channels/{channel_id}', self.patch_channel),
+            ('DELETE', '/channels/{channel_id}', self.delete_channel),
+            ('POST', '/channels/{channel_id}/messages', self.post_message),
+            ('GET', '/channels/{channel_id}/messages/{message_id}', self.get_message),
+            ('PATCH', '/channels/{channel_id}/messages/{message_id}', self.patch_message),
+            ('DELETE', '/channels/{channel_id}/messages/{message_id}', self.delete_message),
+            ('POST', '/channels/{channel_id}/messages/{message_id}/threads', self.post_message_thread),
+            ('POST', '/channels/{channel_id}/threads', self.post_thread),
+            ('POST', '/interactions/{interaction_id}/{token}/callback', self.post_interaction_callback),
+            ('POST', '/webhooks/{webhook_id}/{token}', self.post_followup),
+            ('GET', '/webhooks/{webhook_id}/{token}/messages/{message_id}', self.webhook_message),
+            ('PATCH', '/webhooks/{webhook_id}/{token}/messages/{message_id}', self.webhook_message),
+            ('DELETE', '/webhooks/{webhook_id}/{token}/messages/{message_id}', self.webhook_message),
+        ]
+        for method, path, handler in routes:
+            app.router.add_route(method, API_PREFIX + path, handler)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve on host:port (0 picks a free port). Returns the base URL for DISCORD_API_BASE."""
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        port = self.runner.addresses[0][1]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def print_summary(self):
+        print(f"{'route':<62}{'requests':>10}{'429s':>7}")
+        for route, count in self.requests.most_common():
+            print(f"{route:<62}{count:>10}{self.rate_limited[route]:>7}")
+
+
+async def serve(args):
+    api = FakeDiscordAPI(args.guilds, args.members, args.latency_ms, args.jitter_ms, args.route_limit,
+                         args.route_window, args.global_limit, args.seed)
+    base = await api.start(args.host, args.port)
+    print(f"Stand-in Discord API at {base} ({len(api.guilds)} guilds, {args.members} members each)")
+    print(f"Run the worker against it with DISCORD_API_BASE={base}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+        api.print_summary()
+
+
+def add_api_arguments(parser: argparse.ArgumentParser):
+    """Options shared with the load scripts that start their own stand-in API."""
+    parser.add_argument('--members', type=int, default=1000, help="members per guild")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="random extra latency, up to this much")
+    parser.add_argument('--route-limit', type=int, default=5, help="requests per route and major ID per window")
+    parser.add_argument('--route-window', type=float, default=1.0, help="seconds per route rate limit window")
+    parser.add_argument('--global-limit', type=int, default=50, help="requests per second outside interactions")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fake_api', description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--guilds', type=int, default=1)
+    add_api_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
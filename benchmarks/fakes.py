@@ -0,0 +1,429 @@
+"""In-process stand-ins for the discord.py objects the cogs touch.
+
+Every call that would hit Discord's REST API goes through FakeREST, which adds
+the configured latency, enforces per-route and global rate limits the way
+discord.py does (by waiting for the bucket to reset) and counts calls per
+route. Nothing here talks to the network.
+"""
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from bot.job_queue import JobConsumer
+from bot.main import GameDevBot
+
+# First snowflake handed out; IDs only need to be unique and look like Discord's
+FIRST_ID = 1_000_000_000_000_000
+
+
+class FakeREST:
+    """Simulated REST API: latency, rate limit buckets and per-route call counts.
+
+    route_limit requests per route_window seconds are allowed per route and major
+    ID (channel or guild), and global_limit per second overall; 0 disables a limit.
+    A request over a limit waits for its bucket to reset and is counted as limited.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, route_limit: int = 0,
+                 route_window: float = 1.0, global_limit: int = 0, seed: int = 1):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.route_limit = route_limit
+        self.route_window = route_window
+        self.global_limit = global_limit
+        self.calls = Counter()
+        self.limited = Counter()
+        self.waited = 0.0
+        self._buckets: Dict[tuple, list] = {}
+        self._rng = random.Random(seed)
+
+    async def request(self, method: str, route: str, major: int = None):
+        key = f"{method} {route}"
+        self.calls[key] += 1
+        if self.global_limit:
+            await self._take(('global',), self.global_limit, 1.0, key)
+        if self.route_limit:
+            await self._take((key, major), self.route_limit, self.route_window, key)
+        # Always yield, like a real request would
+        await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+
+    async def _take(self, bucket: tuple, limit: int, window: float, key: str):
+        while True:
+            now = time.monotonic()
+            state = self._buckets.get(bucket)
+            if state is None or now >= state[0]:
+                # [reset time, requests left]
+                state = self._buckets[bucket] = [now + window, limit]
+            if state[1] > 0:
+                state[1] -= 1
+                return
+            self.limited[key] += 1
+            self.waited += state[0] - now
+            await asyncio.sleep(state[0] - now)
+
+    def totals(self) -> tuple:
+        """(calls, rate limited calls) so far."""
+        return sum(self.calls.values()), sum(self.limited.values())
+
+
+class FakeRole:
+    def __init__(self, guild: 'FakeGuild', role_id: int, name: str):
+        self.guild = guild
+        self.id = role_id
+        self.name = name
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+    @property
+    def members(self) -> List['FakeMember']:
+        return [m for m in self.guild.members if self in m.roles]
+
+
+class FakeMember:
+    def __init__(self, guild: 'FakeGuild', user_id: int, name: str, roles: List[FakeRole] = None, bot: bool = False):
+        self.guild = guild
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.roles = list(roles or [])
+        self.bot = bot
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    async def add_roles(self, *roles: FakeRole, reason: str = None, atomic: bool = True):
+        # discord.py's atomic default sends one request per role
+        for role in roles:
+            await self.guild.rest.request('PUT', '/guilds/{id}/members/{id}/roles/{id}', self.guild.id)
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles: FakeRole, reason: str = None, atomic: bool = True):
+        for role in roles:
+            await self.guild.rest.request('DELETE', '/guilds/{id}/members/{id}/roles/{id}', self.guild.id)
+            if role in self.roles:
+                self.roles.remove(role)
+
+
+class FakeMessage:
+    def __init__(self, channel, message_id: int, content: str = None, embeds: list = None):
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+        self.embeds = embeds or []
+
+    @property
+    def guild(self):
+        return self.channel.guild
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild.id}/{self.channel.id}/{self.id}"
+
+    async def edit(self, content: str = None, embed=None, embeds: list = None, view=None, **kwargs) -> 'FakeMessage':
+        await self.guild.rest.request('PATCH', '/channels/{id}/messages/{id}', self.channel.id)
+        if content is not None:
+            self.content = content
+        if embed is not None or embeds is not None:
+            self.embeds = [embed] if embed is not None else embeds
+        return self
+
+    async def delete(self, **kwargs):
+        await self.guild.rest.request('DELETE', '/channels/{id}/messages/{id}', self.channel.id)
+
+    async def create_thread(self, name: str, **kwargs) -> 'FakeThread':
+        await self.guild.rest.request('POST', '/channels/{id}/messages/{id}/threads', self.channel.id)
+        thread = FakeThread(self.guild, self.id, name, self.channel)
+        self.guild.threads[thread.id] = thread
+        return thread
+
+
+class _Messageable:
+    """send() and partial messages, shared by text channels and threads."""
+
+    guild: 'FakeGuild'
+    id: int
+    name: str
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild.id}/{self.id}"
+
+    async def send(self, content: str = None, embed=None, embeds: list = None, **kwargs) -> FakeMessage:
+        await self.guild.rest.request('POST', '/channels/{id}/messages', self.id)
+        return FakeMessage(self, self.guild.next_id(), content, [embed] if embed is not None else embeds)
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        return FakeMessage(self, message_id)
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        await self.guild.rest.request('GET', '/channels/{id}/messages/{id}', self.id)
+        return FakeMessage(self, message_id)
+
+    async def edit(self, **kwargs):
+        await self.guild.rest.request('PATCH', '/channels/{id}', self.id)
+
+    async def delete(self, **kwargs):
+        await self.guild.rest.request('DELETE', '/channels/{id}', self.id)
+        self.guild.remove_channel(self.id)
+
+
+class FakeTextChannel(_Messageable):
+    def __init__(self, guild: 'FakeGuild', channel_id: int, name: str, category: 'FakeCategoryChannel' = None,
+                 topic: str = None):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.category = category
+        self.topic = topic
+
+
+class FakeVoiceChannel(FakeTextChannel):
+    pass
+
+
+class FakeThread(_Messageable):
+    def __init__(self, guild: 'FakeGuild', thread_id: int, name: str, parent: FakeTextChannel):
+        self.guild = guild
+        self.id = thread_id
+        self.name = name
+        self.parent = parent
+
+
+class FakeCategoryChannel:
+    def __init__(self, guild: 'FakeGuild', channel_id: int, name: str):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    @property
+    def channels(self) -> list:
+        return [c for c in self.guild.channels if getattr(c, 'category', None) is self]
+
+    async def create_text_channel(self, name: str, **kwargs) -> FakeTextChannel:
+        return await self.guild.create_text_channel(name, category=self, **kwargs)
+
+    async def create_voice_channel(self, name: str, **kwargs) -> FakeVoiceChannel:
+        return await self.guild.create_voice_channel(name, category=self, **kwargs)
+
+    async def delete(self, **kwargs):
+        await self.guild.rest.request('DELETE', '/channels/{id}', self.id)
+        self.guild.remove_channel(self.id)
+
+
+class FakeGuild:
+    def __init__(self, rest: FakeREST, guild_id: int, name: str, ids):
+        self.rest = rest
+        self.id = guild_id
+        self.name = name
+        self.shard_id = 0
+        self.filesize_limit = 25 * 1024 * 1024
+        self._ids = ids
+        self._members: Dict[int, FakeMember] = {}
+        self._roles: Dict[int, FakeRole] = {}
+        self._channels: Dict[int, object] = {}
+        self.threads: Dict[int, FakeThread] = {}
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._members.values())
+
+    @property
+    def roles(self) -> List[FakeRole]:
+        return list(self._roles.values())
+
+    @property
+    def channels(self) -> list:
+        return list(self._channels.values())
+
+    @property
+    def text_channels(self) -> List[FakeTextChannel]:
+        return [c for c in self._channels.values() if type(c) is FakeTextChannel]
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self._members.get(user_id)
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+    def get_channel_or_thread(self, channel_id: int):
+        return self._channels.get(channel_id) or self.threads.get(channel_id)
+
+    def add_member(self, name: str, roles: List[FakeRole] = None, bot: bool = False) -> FakeMember:
+        """Cache a member, as the gateway would on join; no REST call."""
+        member = FakeMember(self, self.next_id(), name, roles, bot)
+        self._members[member.id] = member
+        return member
+
+    def add_role(self, name: str) -> FakeRole:
+        role = FakeRole(self, self.next_id(), name)
+        self._roles[role.id] = role
+        return role
+
+    def add_text_channel(self, name: str, category: FakeCategoryChannel = None) -> FakeTextChannel:
+        channel = FakeTextChannel(self, self.next_id(), name, category)
+        self._channels[channel.id] = channel
+        return channel
+
+    def remove_channel(self, channel_id: int):
+        self._channels.pop(channel_id, None)
+
+    async def create_role(self, name: str, **kwargs) -> FakeRole:
+        await self.rest.request('POST', '/guilds/{id}/roles', self.id)
+        return self.add_role(name)
+
+    async def create_category(self, name: str, **kwargs) -> FakeCategoryChannel:
+        await self.rest.request('POST', '/guilds/{id}/channels', self.id)
+        category = FakeCategoryChannel(self, self.next_id(), name)
+        self._channels[category.id] = category
+        return category
+
+    async def create_text_channel(self, name: str, category: FakeCategoryChannel = None, topic: str = None,
+                                  **kwargs) -> FakeTextChannel:
+        await self.rest.request('POST', '/guilds/{id}/channels', self.id)
+        channel = FakeTextChannel(self, self.next_id(), name, category, topic)
+        self._channels[channel.id] = channel
+        return channel
+
+    async def create_voice_channel(self, name: str, category: FakeCategoryChannel = None,
+                                   **kwargs) -> FakeVoiceChannel:
+        await self.rest.request('POST', '/guilds/{id}/channels', self.id)
+        channel = FakeVoiceChannel(self, self.next_id(), name, category)
+        self._channels[channel.id] = channel
+        return channel
+
+
+class FakeAttachment:
+    """An uploaded file; url is a local path the benchmark's download reads."""
+
+    def __init__(self, filename: str, url: str, size: int = 0):
+        self.filename = filename
+        self.url = url
+        self.size = size
+
+
+class FakeResponse:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _callback(self):
+        if self._done:
+            raise RuntimeError("This interaction has already been responded to before")
+        self._done = True
+        await self._interaction.guild.rest.request('POST', '/interactions/{id}/{token}/callback')
+
+    async def defer(self, **kwargs):
+        await self._callback()
+
+    async def send_message(self, content: str = None, **kwargs):
+        await self._callback()
+
+    async def edit_message(self, **kwargs):
+        await self._callback()
+
+    async def send_modal(self, modal):
+        await self._callback()
+
+
+class FakeFollowup:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self._interaction = interaction
+        self.sent: List[str] = []
+
+    async def send(self, content: str = None, embed=None, **kwargs) -> FakeMessage:
+        guild = self._interaction.guild
+        await guild.rest.request('POST', '/webhooks/{id}/{token}')
+        self.sent.append(content if content is not None else (embed.title if embed else ''))
+        return FakeMessage(self._interaction.channel, guild.next_id(), content, [embed] if embed else [])
+
+
+class FakeInteraction:
+    """A slash command invocation by user in channel. followup.sent keeps what was sent."""
+
+    def __init__(self, guild: FakeGuild, user: FakeMember, channel: FakeTextChannel):
+        self.id = guild.next_id()
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+class FakeBot:
+    """
+    Just enough of GameDevBot for the cogs: the guild cache, partial messageables
+    and a job consumer. It never becomes ready, so cog loops wait forever and only
+    the jobs a benchmark drains itself run. Role syncs use GameDevBot's own methods.
+    """
+
+    shard_count = None
+    shard_id = None
+
+    def __init__(self, rest: FakeREST):
+        self.rest = rest
+        self._ids = itertools.count(FIRST_ID)
+        self._guilds: Dict[int, FakeGuild] = {}
+        self._ready = asyncio.Event()
+        self.jobs = JobConsumer()
+
+    sync_all_game_roles = GameDevBot.sync_all_game_roles
+    sync_guild_game_roles = GameDevBot.sync_guild_game_roles
+    sync_member_game_roles = GameDevBot.sync_member_game_roles
+
+    def add_guild(self, name: str) -> FakeGuild:
+        guild = FakeGuild(self.rest, next(self._ids), name, self._ids)
+        self._guilds[guild.id] = guild
+        return guild
+
+    @property
+    def guilds(self) -> List[FakeGuild]:
+        return list(self._guilds.values())
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        for guild in self._guilds.values():
+            channel = guild.get_channel_or_thread(channel_id)
+            if channel:
+                return channel
+        return None
+
+    def get_partial_messageable(self, channel_id: int):
+        # Real partial messageables need no cache; the benchmark's channels are all cached
+        return self.get_channel(channel_id)
+
+    def is_ready(self) -> bool:
+        return False
+
+    async def wait_until_ready(self):
+        await self._ready.wait()
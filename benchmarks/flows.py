@@ -0,0 +1,301 @@
+"""Throughput and latency of whole command flows against a fake Discord.
+
+Builds a guild of --members members in benchmarks.fakes, creates --games games
+through /game new, seeds --tasks tasks and then drives the cogs' own handlers:
+role syncs, board renders, /task new, /template sync and /task import. Every
+REST call goes through a simulated API with optional latency and rate limits.
+
+    python -m benchmarks.flows --members 1000 --games 50 --tasks 20000 --save flows.json
+    python -m benchmarks.flows --baseline flows.json
+
+With --baseline, a flow whose p95 latency or throughput is more than --tolerance
+worse, or which makes more REST calls than the baseline, is a regression and the
+run exits with status 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from bot import database
+from bot.config import MEMBER_ROLES
+from bot.database import init_db, refresh_task_stats, upsert_server_config, upsert_template_channel
+from bot import jobs
+from bot.cogs.games import GamesCog
+from bot.cogs.tasks import TasksCog
+from bot.cogs.templates import TemplatesCog
+
+from .fakes import FakeAttachment, FakeBot, FakeInteraction, FakeREST
+
+STATUSES = ('todo', 'progress', 'review', 'done', 'cancelled')
+WORDS = ('inventory', 'shader', 'menu', 'boss', 'dialogue', 'netcode', 'physics', 'music', 'tutorial', 'save')
+# Share of members holding one member role; the rest have none
+MEMBER_ROLE_SHARE = 0.6
+# Template channel added before /template sync, so it has one channel per game to create
+SYNC_CHANNEL = 'benchmark-sync'
+
+
+class Flows:
+    """The fake world and the cogs under test, plus the results collected so far."""
+
+    def __init__(self, args, tmp: str):
+        self.args = args
+        self.tmp = tmp
+        self.rng = random.Random(args.seed)
+        self.rest = FakeREST(args.latency_ms, args.jitter_ms, args.route_limit, args.route_window,
+                             args.global_limit, args.seed)
+        self.bot = FakeBot(self.rest)
+        self.guild = self.bot.add_guild('Benchmark Studio')
+        member_roles = [self.guild.add_role(name) for name in MEMBER_ROLES]
+        self.admin = self.guild.add_member('admin')
+        self.members = [
+            self.guild.add_member(f"member{i}", [self.rng.choice(member_roles)]
+                                  if self.rng.random() < MEMBER_ROLE_SHARE else [])
+            for i in range(args.members)
+        ]
+        self.command_channel = self.guild.add_text_channel('bot-commands')
+        self.games = []
+        self.results = {}
+
+    def interaction(self) -> FakeInteraction:
+        return FakeInteraction(self.guild, self.admin, self.command_channel)
+
+    def record(self, name: str, samples: list, ops: int, seconds: float, rest_before: tuple):
+        calls, limited = self.rest.totals()
+        p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+        self.results[name] = {
+            'ops': ops,
+            'seconds': round(seconds, 3),
+            'ops_per_s': round(ops / seconds, 2) if seconds else 0.0,
+            'p50_ms': round(statistics.median(samples), 2),
+            'p95_ms': round(p95, 2),
+            'rest_calls': calls - rest_before[0],
+            'rate_limited': limited - rest_before[1],
+        }
+
+    async def timed(self, name: str, calls: list, ops: int = None):
+        """Run each call in turn; latency is per call and throughput is ops per second overall."""
+        rest_before = self.rest.totals()
+        samples = []
+        started = time.perf_counter()
+        for call in calls:
+            call_started = time.perf_counter()
+            await call()
+            samples.append((time.perf_counter() - call_started) * 1000)
+        self.record(name, samples, ops or len(calls), time.perf_counter() - started, rest_before)
+
+    async def drain(self):
+        await self.bot.jobs.run(stop_when_empty=True)
+
+    # ============== SETUP ==============
+
+    async def setup(self):
+        await init_db()
+        await upsert_server_config(self.guild.id, '{}', setup_completed=True)
+        self.games_cog = GamesCog(self.bot)
+        self.templates_cog = TemplatesCog(self.bot)
+        self.tasks_cog = TasksCog(self.bot)
+        # Attachments are local files; everything after the download is the real import
+        self.tasks_cog._download_attachment = self._read_attachment
+        jobs.register_shared_jobs(self.bot.jobs, jobs.GatewayContext(self.bot))
+
+    async def _read_attachment(self, url: str, fp):
+        with open(url, 'rb') as f:
+            shutil.copyfileobj(f, fp)
+
+    def seed_tasks(self):
+        """Bulk-insert tasks into the games' task channels, as multi_guild.seed does."""
+        conn = sqlite3.connect(database.DATABASE_PATH)
+        now = int(time.time())
+        with conn:
+            channels = dict(conn.execute(
+                """SELECT g.acronym, c.channel_id FROM games g
+                   JOIN game_channels c ON c.game_id = g.id AND c.name = 'tasks'
+                   WHERE g.guild_id = ?""",
+                (self.guild.id,)
+            ).fetchall())
+            rows = []
+            for _ in range(self.args.tasks):
+                acronym = self.rng.choice(self.games)
+                created = now - self.rng.randint(0, 120 * 86400)
+                rows.append((
+                    self.guild.id, acronym, ' '.join(self.rng.sample(WORDS, 3)), 'seeded task',
+                    self.rng.choice(self.members).id, channels[acronym], self.rng.choice(STATUSES),
+                    now + self.rng.randint(-5, 10) * 86400 if self.rng.random() < 0.5 else None,
+                    created, self.rng.randint(created, now),
+                ))
+            conn.executemany(
+                """INSERT INTO tasks (guild_id, game_acronym, title, description, assignee_id,
+                   target_channel_id, status, deadline_ts, created_ts, updated_ts)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            conn.execute(
+                """INSERT INTO task_assignees (task_id, user_id, is_primary)
+                   SELECT id, assignee_id, 1 FROM tasks"""
+            )
+        conn.close()
+        self.task_channels = channels
+
+    # ============== FLOWS ==============
+
+    async def game_new(self):
+        def create(i):
+            acronym = f"G{i:03d}"
+            self.games.append(acronym)
+            return lambda: self.games_cog.game_new.callback(self.games_cog, self.interaction(), f"Game {i}", acronym)
+        await self.timed('game_new', [create(i) for i in range(self.args.games)])
+
+    async def role_sync(self, name: str):
+        async def sync():
+            await self.bot.sync_all_game_roles()
+            await self.drain()
+        await self.timed(name, [sync], ops=len(self.guild.members))
+
+    async def task_boards(self):
+        """Post a board for every game with /task setup (not timed)."""
+        for acronym in self.games:
+            await self.tasks_cog.task_setup.callback(self.tasks_cog, self.interaction(), acronym)
+
+    async def update_dashboard(self):
+        await self.timed('update_dashboard', [
+            lambda acronym=acronym: self.tasks_cog.update_dashboard(self.guild.id, acronym, self.bot)
+            for acronym in self.games
+        ])
+
+    async def task_new(self):
+        def create(i):
+            acronym = self.rng.choice(self.games)
+            channel = self.guild.get_channel(self.task_channels[acronym])
+            assignee, other = self.rng.sample(self.members, 2)
+            return lambda: self.tasks_cog.task_new.callback(
+                self.tasks_cog, self.interaction(), f"Benchmark task {i}", 'created by the benchmark',
+                channel, assignee, additional_assignees=str(other.id), priority='Medium'
+            )
+        await self.timed('task_new', [create(i) for i in range(self.args.new_tasks)])
+
+    async def template_sync(self):
+        await upsert_template_channel(self.guild.id, SYNC_CHANNEL, 'general', description="Created by the benchmark")
+
+        async def sync():
+            await self.templates_cog.template_sync.callback(self.templates_cog, self.interaction())
+            await self.drain()
+        await self.timed('template_sync', [sync], ops=len(self.games))
+
+    async def task_import(self):
+        path = os.path.join(self.tmp, 'import.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([{
+                'title': f"Imported task {i}",
+                'description': 'imported by the benchmark',
+                'assignee_id': str(self.rng.choice(self.members).id),
+                'target_channel_id': str(self.rng.choice(list(self.task_channels.values()))),
+                'priority': 'Low',
+            } for i in range(self.args.import_rows)], f)
+
+        async def run_import():
+            file = FakeAttachment('import.json', path, os.path.getsize(path))
+            await self.tasks_cog.task_import.callback(self.tasks_cog, self.interaction(), file)
+            await self.drain()
+        await self.timed('task_import', [run_import], ops=self.args.import_rows)
+
+    async def run(self):
+        await self.setup()
+        await self.game_new()
+        await self.role_sync('sync_all_game_roles (cold)')
+        await self.role_sync('sync_all_game_roles (warm)')
+        started = time.perf_counter()
+        self.seed_tasks()
+        await refresh_task_stats()
+        await self.task_boards()
+        print(f"Seeded {self.args.tasks} tasks and {len(self.games)} boards in {time.perf_counter() - started:.1f}s")
+        await self.update_dashboard()
+        await self.task_new()
+        await self.template_sync()
+        await self.task_import()
+
+
+def print_results(results: dict):
+    print(f"{'flow':<28}{'ops':>7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'REST':>8}{'429s':>7}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['ops']:>7}{r['ops_per_s']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['rest_calls']:>8}{r['rate_limited']:>7}")
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Flows slower, lower-throughput or chattier than the baseline, as messages."""
+    found = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if not current:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            found.append(f"{name}: p95 {base['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current['ops_per_s'] < base['ops_per_s'] * (1 - tolerance):
+            found.append(f"{name}: throughput {base['ops_per_s']:.1f} -> {current['ops_per_s']:.1f} ops/s")
+        if current['rest_calls'] > base['rest_calls']:
+            found.append(f"{name}: REST calls {base['rest_calls']} -> {current['rest_calls']}")
+    return found
+
+
+SCALE_ARGS = ('members', 'games', 'tasks', 'new_tasks', 'import_rows', 'latency_ms', 'jitter_ms',
+              'route_limit', 'route_window', 'global_limit', 'seed')
+
+
+async def run(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        flows = Flows(args, tmp)
+        await flows.run()
+    print_results(flows.results)
+
+    scale = {name: getattr(args, name) for name in SCALE_ARGS}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'scale': scale, 'flows': flows.results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('scale') != scale:
+        print(f"{args.baseline} was recorded at a different scale; rerun it with the same options to compare")
+        return 2
+    found = regressions(flows.results, baseline['flows'], args.tolerance)
+    for message in found:
+        print(f"REGRESSION {message}")
+    if not found:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if found else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.flows', description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=1000)
+    parser.add_argument('--games', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=20000, help="seeded tasks")
+    parser.add_argument('--new-tasks', type=int, default=200, help="/task new calls")
+    parser.add_argument('--import-rows', type=int, default=1000, help="tasks in the /task import file")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="simulated REST latency per call")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="random extra latency, up to this much")
+    parser.add_argument('--route-limit', type=int, default=0, help="requests per route and channel/guild per window")
+    parser.add_argument('--route-window', type=float, default=5.0, help="seconds per route rate limit window")
+    parser.add_argument('--global-limit', type=int, default=0, help="requests per second overall")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results saved with --save")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown before a flow counts as regressed (default: %(default)s)")
+    sys.exit(asyncio.run(run(parser.parse_args(argv))))
+
+
+if __name__ == '__main__':
+    main()
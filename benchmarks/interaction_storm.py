@@ -0,0 +1,380 @@
+"""End-to-end interaction storm against the stand-in Discord API.
+
+Starts benchmarks.fake_api in-process, points discord.py at it and logs the
+real GameDevBot in, so commands run through the bot's cogs, discord.py's HTTP
+client and its rate limit handling. The gateway is played in-process: the
+stand-in's guild is delivered as GUILD_CREATE and each interaction as
+INTERACTION_CREATE. After creating --games games with /game new, --interactions
+interactions arrive at --rate per second: a mix of /task new, /task list and
+/game list, and Start, Update ETA (with its modal), Submit for Review and
+Approve & Close clicks on tasks the storm created. Reports time to acknowledge
+and to finish per command, interactions that missed Discord's 3 second
+deadline, and requests and 429s per route.
+
+    python -m benchmarks.interaction_storm --interactions 500 --rate 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord.utils import time_snowflake
+
+from bot import database
+from bot.database import get_all_games, get_all_tasks, upsert_server_config
+from bot.discord_api import use_api_base
+from bot.main import GameDevBot
+from bot.models import Task
+
+from .fake_api import ALL_PERMISSIONS, CHANNEL_TEXT, INTERACTION_DEADLINE, FakeDiscordAPI, add_api_arguments
+
+# Application command option types
+OPTION_SUBCOMMAND, OPTION_STRING, OPTION_USER, OPTION_CHANNEL = 1, 3, 6, 7
+# Interaction types and message component types
+INTERACTION_COMMAND, INTERACTION_COMPONENT, INTERACTION_MODAL = 2, 3, 5
+COMPONENT_ACTION_ROW, COMPONENT_BUTTON, COMPONENT_LABEL = 1, 2, 18
+# Relative frequency of each command in the storm. Buttons are clicked on the
+# control panel of a random open task the storm created; the Update ETA click
+# is followed by a submit of the modal it opens
+COMMAND_MIX = {'task new': 2, 'task list': 2, 'game list': 1,
+               'button start': 1, 'button eta': 1, 'button review': 1, 'button approve': 1}
+# Buttons only the task's team may use; the others are clicked by the guild owner, a lead
+TEAM_BUTTONS = ('start', 'eta')
+ETA_VALUE = 'Friday'
+
+
+class Storm:
+    """The stand-in API, a bot logged in to it and the interactions sent so far."""
+
+    def __init__(self, args, api: FakeDiscordAPI):
+        self.args = args
+        self.api = api
+        self.rng = random.Random(args.seed)
+        self.guild_id = next(iter(api.guilds))
+        guild = api.guilds[self.guild_id]
+        self.user_id = int(guild['owner_id'])
+        self.member_ids = [uid for uid, m in guild['members'].items() if not m['user']['bot'] and uid != self.user_id]
+        self.channel = next(c for c in api.channels.values() if c['name'] == 'bot-commands')
+        self.bot: GameDevBot = None
+        self._sent = 0
+        # Interaction ID -> (command, future set when the command finishes)
+        self.pending: Dict[int, tuple] = {}
+        self.errors: Dict[str, int] = {}
+        # Open tasks buttons are clicked on, reloaded once more /task new commands finished
+        self.tasks: List[Task] = []
+        self.closed = set()
+        self._tasks_created = 0
+        self._tasks_loaded = 0
+        # (class, attribute, original) patched to see component and modal callbacks finish
+        self._patched: List[tuple] = []
+
+    async def start(self):
+        use_api_base(await self.api.start())
+        self.bot = GameDevBot()
+        self.bot.add_listener(self.on_app_command_completion)
+        self.bot.tree.on_error = self.on_tree_error
+        self.track_views()
+        await self.bot.login('load-test-token')
+        await upsert_server_config(self.guild_id, '{}', setup_completed=True)
+        self.deliver_guild()
+
+    async def stop(self):
+        if self.bot:
+            await self.bot.close()
+        for cls, name, original in self._patched:
+            setattr(cls, name, original)
+        await self.api.stop()
+
+    def deliver_guild(self):
+        """Hand the bot the stand-in's current guild, as the gateway's GUILD_CREATE would."""
+        self.bot._connection.parse_guild_create(self.api.guild_payload(self.guild_id, full=True))
+
+    # ============== INTERACTIONS ==============
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self._finish(interaction.id)
+
+    async def on_tree_error(self, interaction: discord.Interaction, error: Exception):
+        self._record_error(interaction.id, getattr(error, 'original', error))
+        self._finish(interaction.id)
+
+    def track_views(self):
+        """Finish button and modal interactions when their callback returns.
+
+        on_app_command_completion only fires for slash commands, so the per-interaction
+        entry points of views and modals are wrapped, as bot.metrics.instrument_views does.
+        """
+        view_task, modal_task = discord.ui.View._scheduled_task, discord.ui.Modal._scheduled_task
+        view_error, modal_error = discord.ui.View.on_error, discord.ui.Modal.on_error
+        storm = self
+
+        async def tracked_view_task(self, item, interaction):
+            try:
+                return await view_task(self, item, interaction)
+            finally:
+                storm._finish(interaction.id)
+
+        async def tracked_modal_task(self, interaction, *args):
+            try:
+                return await modal_task(self, interaction, *args)
+            finally:
+                storm._finish(interaction.id)
+
+        async def tracked_view_error(self, interaction, error, item):
+            storm._record_error(interaction.id, error)
+            await view_error(self, interaction, error, item)
+
+        async def tracked_modal_error(self, interaction, error):
+            storm._record_error(interaction.id, error)
+            await modal_error(self, interaction, error)
+
+        for cls, name, original, patched in (
+            (discord.ui.View, '_scheduled_task', view_task, tracked_view_task),
+            (discord.ui.Modal, '_scheduled_task', modal_task, tracked_modal_task),
+            (discord.ui.View, 'on_error', view_error, tracked_view_error),
+            (discord.ui.Modal, 'on_error', modal_error, tracked_modal_error),
+        ):
+            setattr(cls, name, patched)
+            self._patched.append((cls, name, original))
+
+    def _record_error(self, interaction_id: int, error: Exception):
+        key = f"{self.pending[interaction_id][0]}: {type(error).__name__}" if interaction_id in self.pending \
+            else type(error).__name__
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def _finish(self, interaction_id: int):
+        entry = self.pending.get(interaction_id)
+        if entry and not entry[1].done():
+            entry[1].set_result(None)
+            if entry[0] == 'task new':
+                self._tasks_created += 1
+
+    def _command_id(self, name: str) -> str:
+        for commands in self.api.commands.values():
+            for command in commands:
+                if command['name'] == name:
+                    return command['id']
+        raise ValueError(f"/{name} was not synced to the stand-in API")
+
+    def deliver(self, command: str, interaction_type: int, data: dict, user_id: int = None,
+                channel: dict = None, message: dict = None) -> Tuple[str, asyncio.Future]:
+        """Deliver an INTERACTION_CREATE from user_id (the guild owner by default) in channel.
+
+        Returns the interaction token and a future set when the bot finished handling it.
+        """
+        user_id = user_id or self.user_id
+        channel = channel or self.channel
+        self._sent += 1
+        interaction_id = time_snowflake(datetime.now(timezone.utc)) + (self._sent & 0x3FFFFF)
+        # Only the owner gets every permission; the stand-in's members hold no roles that grant any
+        permissions = str(ALL_PERMISSIONS) if user_id == self.user_id else '0'
+        member = dict(self.api.guilds[self.guild_id]['members'][user_id], permissions=permissions)
+        token = f"storm-{interaction_id}"
+        payload = {
+            'id': str(interaction_id), 'application_id': str(self.api.application_id), 'type': interaction_type,
+            'token': token, 'version': 1, 'guild_id': str(self.guild_id),
+            'channel_id': channel['id'], 'channel': dict(channel, permissions=permissions),
+            'member': member, 'app_permissions': str(ALL_PERMISSIONS), 'locale': 'en-US', 'guild_locale': 'en-US',
+            'entitlements': [], 'authorizing_integration_owners': {'0': str(self.guild_id)}, 'context': 0,
+            'attachment_size_limit': 25 * 1024 * 1024, 'data': data,
+        }
+        if message:
+            payload['message'] = message
+        future = asyncio.get_running_loop().create_future()
+        self.pending[interaction_id] = (command, future)
+        self.bot._connection.parse_interaction_create(payload)
+        return token, future
+
+    def send(self, command: str, options: list = None, resolved: dict = None) -> asyncio.Future:
+        """Deliver an INTERACTION_CREATE for a slash subcommand such as 'task new'."""
+        name, subcommand = command.split(' ')
+        return self.deliver(command, INTERACTION_COMMAND, {
+            'id': self._command_id(name), 'name': name, 'type': 1,
+            'options': [{'type': OPTION_SUBCOMMAND, 'name': subcommand, 'options': options or []}],
+            'resolved': resolved or {},
+        })[1]
+
+    def click(self, command: str, task: Task) -> Tuple[str, asyncio.Future]:
+        """Click a button such as 'button start' on the task's control panel in its thread."""
+        button = command.split(' ')[1]
+        user_id = task.assignee_id if button in TEAM_BUTTONS else self.user_id
+        return self.deliver(
+            command, INTERACTION_COMPONENT,
+            {'custom_id': f"task_{button}:{task.id}", 'component_type': COMPONENT_BUTTON},
+            user_id, self.api.channels[task.thread_id], self.api.messages.get(task.control_message_id)
+        )
+
+    async def update_eta(self, task: Task):
+        """Click Update ETA, then submit the modal it opened once the click was handled."""
+        token, clicked = self.click('button eta', task)
+        await clicked
+        modal = self.api.modals.get(token)
+        if modal is None:
+            # The click was refused (e.g. the task is gone), so there is nothing to submit
+            return
+        await self.deliver(
+            'modal eta', INTERACTION_MODAL,
+            {'custom_id': modal['custom_id'], 'components': _submitted(modal['components'], ETA_VALUE)},
+            task.assignee_id, self.api.channels[task.thread_id], self.api.messages.get(task.control_message_id)
+        )[1]
+
+    async def open_task(self) -> Optional[Task]:
+        """A random open task created by the storm, or None before the first one exists."""
+        if self._tasks_loaded != self._tasks_created:
+            self._tasks_loaded = self._tasks_created
+            self.tasks = [
+                t for t in await get_all_tasks(self.guild_id)
+                if t.thread_id and t.control_message_id and t.status not in ('done', 'cancelled')
+                and t.id not in self.closed
+            ]
+        return self.rng.choice(self.tasks) if self.tasks else None
+
+    def task_new(self, i: int) -> asyncio.Future:
+        acronym, channel = self.rng.choice(self.task_channels)
+        assignee = self.api.guilds[self.guild_id]['members'][self.rng.choice(self.member_ids)]
+        resolved = {
+            'channels': {channel['id']: {'id': channel['id'], 'name': channel['name'], 'type': CHANNEL_TEXT,
+                                         'parent_id': channel['parent_id'], 'permissions': str(ALL_PERMISSIONS)}},
+            'members': {assignee['user']['id']: dict({k: v for k, v in assignee.items() if k != 'user'},
+                                                     permissions='0')},
+            'users': {assignee['user']['id']: assignee['user']},
+        }
+        return self.send('task new', [
+            {'type': OPTION_STRING, 'name': 'title', 'value': f"Storm task {i}"},
+            {'type': OPTION_STRING, 'name': 'description', 'value': 'created by the interaction storm'},
+            {'type': OPTION_CHANNEL, 'name': 'target_channel', 'value': channel['id']},
+            {'type': OPTION_USER, 'name': 'assignee', 'value': assignee['user']['id']},
+            {'type': OPTION_STRING, 'name': 'game', 'value': acronym},
+        ], resolved)
+
+    # ============== PHASES ==============
+
+    async def create_games(self):
+        for i in range(self.args.games):
+            await self.send('game new', [
+                {'type': OPTION_STRING, 'name': 'name', 'value': f"Storm Game {i}"},
+                {'type': OPTION_STRING, 'name': 'acronym', 'value': f"S{i:03d}"},
+            ])
+        # The gateway would have sent CHANNEL_CREATE and GUILD_ROLE_CREATE for these
+        self.deliver_guild()
+        self.task_channels = []
+        for game in await get_all_games(self.guild_id):
+            suffix = f"-{game.acronym.lower()}-tasks"
+            channel = next((c for c in self.api.channels.values() if c['name'].endswith(suffix)), None)
+            if channel:
+                self.task_channels.append((game.acronym, channel))
+        if not self.task_channels:
+            raise RuntimeError(f"/game new did not create any games: {self.errors}")
+
+    async def storm(self) -> float:
+        commands = self.rng.choices(list(COMMAND_MIX), weights=list(COMMAND_MIX.values()), k=self.args.interactions)
+        futures = []
+        started = time.perf_counter()
+        for i, command in enumerate(commands):
+            task = await self.open_task() if command.startswith('button ') else None
+            if command == 'task new' or (command.startswith('button ') and not task):
+                futures.append(self.task_new(i))
+            elif command == 'button eta':
+                futures.append(asyncio.ensure_future(self.update_eta(task)))
+            elif command.startswith('button '):
+                if command == 'button approve':
+                    # Approving as a lead closes the task; later clicks go to other tasks
+                    self.closed.add(task.id)
+                    self.tasks.remove(task)
+                futures.append(self.click(command, task)[1])
+            else:
+                futures.append(self.send(command))
+            if self.args.rate:
+                await asyncio.sleep(1 / self.args.rate)
+        _, unfinished = await asyncio.wait(futures, timeout=self.args.timeout)
+        if unfinished:
+            print(f"{len(unfinished)} interactions did not finish within {self.args.timeout}s")
+        return time.perf_counter() - started
+
+
+def _submitted(components: list, value: str) -> list:
+    """A modal's components as its submit carries them back, every text input filled with value."""
+    submitted = []
+    for component in components:
+        if component['type'] == COMPONENT_ACTION_ROW:
+            submitted.append({'type': COMPONENT_ACTION_ROW, 'components': _submitted(component['components'], value)})
+        elif component['type'] == COMPONENT_LABEL:
+            submitted.append({'type': COMPONENT_LABEL, 'component': _submitted([component['component']], value)[0]})
+        else:
+            submitted.append({'type': component['type'], 'custom_id': component['custom_id'], 'value': value})
+    return submitted
+
+
+def _percentiles(samples: list) -> tuple:
+    if not samples:
+        return 0.0, 0.0, 0.0
+    p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+    return statistics.median(samples), p95, max(samples)
+
+
+def print_report(storm: Storm, seconds: float):
+    by_command: Dict[str, list] = {}
+    for interaction_id, (command, _) in storm.pending.items():
+        if command == 'game new':
+            continue
+        timing = storm.api.interactions.get(f"storm-{interaction_id}")
+        by_command.setdefault(command, []).append(timing)
+    # ETA clicks are followed by a modal submit, so more interactions arrive than were drawn
+    sent = sum(len(timings) for timings in by_command.values())
+    print(f"{sent} interactions sent at {storm.args.rate or 'max'}/s finished in {seconds:.1f}s "
+          f"({sent / seconds:.1f}/s)")
+    print(f"{'command':<16}{'count':>7}{'late':>6}{'ack p50':>10}{'ack p95':>10}{'ack max':>10}"
+          f"{'done p50':>10}{'done p95':>10}")
+    for command, timings in by_command.items():
+        acked = [t for t in timings if t and t.acked is not None]
+        late = len(timings) - len(acked)
+        ack = _percentiles([(t.acked - t.created) * 1000 for t in acked])
+        done = _percentiles([(t.done - t.created) * 1000 for t in acked])
+        print(f"{command:<16}{len(timings):>7}{late:>6}{ack[0]:>10.0f}{ack[1]:>10.0f}{ack[2]:>10.0f}"
+              f"{done[0]:>10.0f}{done[1]:>10.0f}")
+    print(f"(milliseconds from interaction creation; late = not acknowledged within {INTERACTION_DEADLINE:.0f}s)")
+    for error, count in sorted(storm.errors.items()):
+        print(f"error {error}: {count}")
+    print()
+    storm.api.print_summary()
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, 'storm.db')
+        api = FakeDiscordAPI(1, args.members, args.latency_ms, args.jitter_ms, args.route_limit,
+                             args.route_window, args.global_limit, args.seed)
+        storm = Storm(args, api)
+        try:
+            await storm.start()
+            started = time.perf_counter()
+            await storm.create_games()
+            print(f"Created {args.games} games in {time.perf_counter() - started:.1f}s")
+            # Only the storm's requests are reported
+            api.requests.clear()
+            api.rate_limited.clear()
+            seconds = await storm.storm()
+        finally:
+            await storm.stop()
+    print_report(storm, seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.interaction_storm',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('--interactions', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=100, help="interactions per second (0: all at once)")
+    parser.add_argument('--games', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120, help="seconds to wait for the storm to finish")
+    add_api_arguments(parser)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
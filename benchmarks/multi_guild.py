@@ -0,0 +1,126 @@
+"""Guild-scoped query latency with many guilds sharing one database.
+
+Seeds a throwaway database with --guilds guilds (each with a few games and
+tasks), then times the queries boards, reminders, stats and search run for a
+single guild. Every one of them should stay flat as --guilds grows.
+
+    python -m benchmarks.multi_guild --guilds 200 --tasks 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from bot import database
+from bot.database import (
+    init_db,
+    get_board_tasks,
+    get_game_task_counts,
+    get_task_counts,
+    get_tasks_due_soon,
+    get_stagnant_tasks,
+    get_tasks_by_assignee_multi,
+    get_task_stats,
+    refresh_task_stats,
+    search_tasks,
+    suggest_tasks,
+)
+
+STATUSES = ('todo', 'progress', 'review', 'done', 'cancelled')
+WORDS = ('inventory', 'shader', 'menu', 'boss', 'dialogue', 'netcode', 'physics', 'music', 'tutorial', 'save')
+
+
+def seed(path: str, guilds: int, games: int, tasks: int, seed_value: int):
+    """Bulk-insert guilds with synchronous sqlite3; the triggers keep counts and search current."""
+    rng = random.Random(seed_value)
+    now = int(time.time())
+    conn = sqlite3.connect(path)
+    with conn:
+        for guild_id in range(1, guilds + 1):
+            acronyms = [f"G{n}" for n in range(games)]
+            conn.executemany(
+                "INSERT INTO games (guild_id, name, acronym, category_id) VALUES (?, ?, ?, ?)",
+                [(guild_id, f"Game {a}", a, guild_id * 100 + i) for i, a in enumerate(acronyms)]
+            )
+            rows = []
+            for _ in range(tasks):
+                created = now - rng.randint(0, 120 * 86400)
+                rows.append((
+                    guild_id, rng.choice(acronyms),
+                    ' '.join(rng.sample(WORDS, 3)), 'seeded task',
+                    rng.randint(1, 50), guild_id * 1000, rng.choice(STATUSES),
+                    now + rng.randint(-5, 10) * 86400 if rng.random() < 0.5 else None,
+                    created, rng.randint(created, now),
+                ))
+            conn.executemany(
+                """INSERT INTO tasks (guild_id, game_acronym, title, description, assignee_id,
+                   target_channel_id, status, deadline_ts, created_ts, updated_ts)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+        conn.execute(
+            """INSERT INTO task_assignees (task_id, user_id, is_primary)
+               SELECT id, assignee_id, 1 FROM tasks"""
+        )
+        conn.execute(
+            """INSERT INTO task_history (task_id, user_id, action, old_value, new_value, ts)
+               SELECT id, assignee_id, 'status_change', 'todo', status, updated_ts
+               FROM tasks WHERE status != 'todo'"""
+        )
+    conn.close()
+
+
+async def timed(runs: int, guilds: int, call) -> list:
+    """Milliseconds per call, each against a random guild."""
+    samples = []
+    for _ in range(runs):
+        guild_id = random.randint(1, guilds)
+        started = time.perf_counter()
+        await call(guild_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        await init_db()
+        started = time.perf_counter()
+        seed(database.DATABASE_PATH, args.guilds, args.games, args.tasks, args.seed)
+        await refresh_task_stats()
+        print(f"Seeded {args.guilds} guilds x {args.tasks} tasks in {time.perf_counter() - started:.1f}s")
+
+        benchmarks = {
+            'board (4 columns)': lambda g: get_board_tasks(g, 'G0', STATUSES[:4], 10),
+            'game counts': lambda g: get_game_task_counts(g, 'G0'),
+            'guild counts': lambda g: get_task_counts(g),
+            'due soon': lambda g: get_tasks_due_soon(g, 24, limit=25),
+            'stagnant': lambda g: get_stagnant_tasks(g, 3, limit=25),
+            'my tasks': lambda g: get_tasks_by_assignee_multi(g, 7),
+            'stats (30 days)': lambda g: get_task_stats(g, None, int(time.time()) // 86400 - 30),
+            'search': lambda g: search_tasks(g, 'shader menu'),
+            'autocomplete': lambda g: suggest_tasks(g, ''),
+        }
+        print(f"{'query':<20}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, call in benchmarks.items():
+            samples = await timed(args.runs, args.guilds, call)
+            p95 = statistics.quantiles(samples, n=20)[-1]
+            print(f"{name:<20}{statistics.median(samples):>10.2f}{p95:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.multi_guild', description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=200)
+    parser.add_argument('--games', type=int, default=3, help="games per guild")
+    parser.add_argument('--tasks', type=int, default=500, help="tasks per guild")
+    parser.add_argument('--runs', type=int, default=200, help="calls per query")
+    parser.add_argument('--seed', type=int, default=1)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
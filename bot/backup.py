@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from .config import DATABASE_PATH, BACKUP_DIR, BACKUP_KEEP
+from .models import BackupSnapshot
+from .utils import format_size
+
+# Pages copied per backup step; the live database is only locked while a step runs
+BACKUP_PAGES_PER_STEP = 1024
+# Pause between steps so writers can get in
+BACKUP_STEP_PAUSE = 0.005
+# A write from another connection restarts the copy; after this many restarts
+# the remaining copy is done in a single step
+BACKUP_MAX_RESTARTS = 3
+# Buffer size while compressing, decompressing and hashing
+COPY_CHUNK_BYTES = 1024 * 1024
+
+SNAPSHOT_PREFIX = 'bot-'
+# Marks snapshots taken on request; they rotate separately from scheduled ones so
+# on-demand backups never push the scheduled history out
+MANUAL_TAG = 'manual-'
+SNAPSHOT_SUFFIX = '.db.gz'
+CHECKSUM_SUFFIX = '.sha256'
+SNAPSHOT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+# Scheduled and manual backups never run at the same time
+_backup_lock = asyncio.Lock()
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_database(src_path: str, dst_path: str):
+    """Copy a live database with the online backup API, a few pages per step."""
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    try:
+        restarts = 0
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > BACKUP_MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            last_remaining = remaining
+
+        dst = sqlite3.connect(dst_path)
+        try:
+            try:
+                src.backup(dst, pages=BACKUP_PAGES_PER_STEP, progress=progress, sleep=BACKUP_STEP_PAUSE)
+            except _TooManyRestarts:
+                # Steady writes keep invalidating the copy; finish it in one step instead
+                src.backup(dst)
+            result = dst.execute("PRAGMA quick_check").fetchone()[0]
+            if result != 'ok':
+                raise ValueError(f"Snapshot failed integrity check: {result}")
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+class _HashingWriter:
+    """Binary file wrapper that hashes everything written through it."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.hash = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.hash.update(data)
+        return self.fp.write(data)
+
+    def flush(self):
+        self.fp.flush()
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        while chunk := fp.read(COPY_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_snapshot_name(path: str) -> tuple:
+    """(created_at, manual) from a snapshot's file name; ValueError if it is not one."""
+    stamp = os.path.basename(path)[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]
+    manual = stamp.startswith(MANUAL_TAG)
+    if manual:
+        stamp = stamp[len(MANUAL_TAG):]
+    return datetime.strptime(stamp, SNAPSHOT_TIME_FORMAT).replace(tzinfo=timezone.utc), manual
+
+
+def take_snapshot(db_path: str = None, backup_dir: str = None, keep: int = None,
+                  manual: bool = False) -> BackupSnapshot:
+    """
+    Write a compressed, checksummed snapshot of the database and rotate old ones.
+
+    Blocking; run it in a worker thread. The copy is checked with quick_check
+    before it is compressed, and files only get their final names once complete.
+    Only snapshots of the same kind (manual or scheduled) are rotated.
+    """
+    db_path = db_path or DATABASE_PATH
+    backup_dir = backup_dir or BACKUP_DIR
+    keep = BACKUP_KEEP if keep is None else keep
+    os.makedirs(backup_dir, exist_ok=True)
+
+    created_at = datetime.now(timezone.utc)
+    tag = MANUAL_TAG if manual else ''
+    name = f"{SNAPSHOT_PREFIX}{tag}{created_at.strftime(SNAPSHOT_TIME_FORMAT)}{SNAPSHOT_SUFFIX}"
+    path = os.path.join(backup_dir, name)
+    raw_path = path + '.partial.db'
+    gz_path = path + '.partial'
+
+    try:
+        _copy_database(db_path, raw_path)
+        db_size = os.path.getsize(raw_path)
+        with open(gz_path, 'wb') as out:
+            writer = _HashingWriter(out)
+            with open(raw_path, 'rb') as src, gzip.GzipFile(filename=name[:-3], mode='wb', fileobj=writer,
+                                                            compresslevel=6) as gz:
+                while chunk := src.read(COPY_CHUNK_BYTES):
+                    gz.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        sha256 = writer.hash.hexdigest()
+        os.replace(gz_path, path)
+        with open(path + CHECKSUM_SUFFIX, 'w') as fp:
+            # sha256sum format, so `sha256sum -c` works on the backup directory
+            fp.write(f"{sha256}  {name}\n")
+    finally:
+        for leftover in (raw_path, gz_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    rotate_snapshots(backup_dir, keep, manual)
+    return BackupSnapshot(
+        path=path, created_at=created_at, size=os.path.getsize(path), sha256=sha256, db_size=db_size,
+        manual=manual
+    )
+
+
+def list_snapshots(backup_dir: str = None) -> List[BackupSnapshot]:
+    """Snapshots in backup_dir, newest first."""
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        path = os.path.join(backup_dir, name)
+        try:
+            created_at, manual = _parse_snapshot_name(path)
+        except ValueError:
+            continue
+        sha256 = ''
+        if os.path.exists(path + CHECKSUM_SUFFIX):
+            with open(path + CHECKSUM_SUFFIX) as fp:
+                sha256 = fp.read().split(' ', 1)[0].strip()
+        snapshots.append(BackupSnapshot(
+            path=path, created_at=created_at, size=os.path.getsize(path), sha256=sha256, manual=manual
+        ))
+    snapshots.sort(key=lambda snapshot: snapshot.created_at, reverse=True)
+    return snapshots
+
+
+def rotate_snapshots(backup_dir: str = None, keep: int = None, manual: bool = False) -> int:
+    """Delete all but the newest `keep` manual or scheduled snapshots. Returns how many were removed."""
+    keep = BACKUP_KEEP if keep is None else keep
+    removed = 0
+    snapshots = [snapshot for snapshot in list_snapshots(backup_dir) if snapshot.manual == manual]
+    for snapshot in snapshots[max(keep, 1):]:
+        for path in (snapshot.path, snapshot.path + CHECKSUM_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        removed += 1
+    return removed
+
+
+def verify_snapshot(path: str) -> str:
+    """Check a snapshot against its .sha256 file. Returns the digest; raises ValueError on mismatch."""
+    checksum_path = path + CHECKSUM_SUFFIX
+    if not os.path.exists(checksum_path):
+        raise ValueError(f"No checksum file for {path}")
+    with open(checksum_path) as fp:
+        expected = fp.read().split(' ', 1)[0].strip()
+    actual = _file_sha256(path)
+    if actual != expected:
+        raise ValueError(f"Checksum mismatch for {path}: expected {expected}, got {actual}")
+    return actual
+
+
+def restore_snapshot(path: str, db_path: str = None) -> str:
+    """
+    Replace the database with a snapshot. The bot must be stopped first.
+
+    The snapshot is verified and decompressed next to the database, checked
+    with quick_check and only then swapped in. The previous database (and any
+    journal/WAL files, which belong to it) is kept with a .pre-restore suffix.
+    Returns the path the old database was moved to, or '' if there was none.
+    """
+    db_path = db_path or DATABASE_PATH
+    verify_snapshot(path)
+
+    tmp_path = db_path + '.restore'
+    try:
+        with gzip.open(path, 'rb') as src, open(tmp_path, 'wb') as out:
+            while chunk := src.read(COPY_CHUNK_BYTES):
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        conn = sqlite3.connect(tmp_path)
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            conn.close()
+        if result != 'ok':
+            raise ValueError(f"Snapshot failed integrity check: {result}")
+
+        previous = ''
+        for suffix in ('', '-journal', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.replace(db_path + suffix, db_path + '.pre-restore' + suffix)
+                if not suffix:
+                    previous = db_path + '.pre-restore'
+        os.replace(tmp_path, db_path)
+        return previous
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def create_backup(db_path: str = None, backup_dir: str = None, keep: int = None,
+                        manual: bool = False) -> BackupSnapshot:
+    """Take a snapshot off the event loop; concurrent calls queue behind each other."""
+    async with _backup_lock:
+        return await asyncio.to_thread(take_snapshot, db_path, backup_dir, keep, manual)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bot.backup', description="Manage database snapshots")
+    parser.add_argument('--db', default=DATABASE_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--dir', default=BACKUP_DIR, help="snapshot directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help="take a snapshot now")
+    create.add_argument('--manual', action='store_true',
+                        help="rotate it with /admin backup snapshots instead of scheduled ones")
+    commands.add_parser('list', help="list snapshots, newest first")
+    verify = commands.add_parser('verify', help="check a snapshot's checksum")
+    verify.add_argument('snapshot')
+    restore = commands.add_parser('restore', help="replace the database with a snapshot (stop the bot first)")
+    restore.add_argument('snapshot')
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        started = time.monotonic()
+        snapshot = take_snapshot(args.db, args.dir, manual=args.manual)
+        print(f"Wrote {snapshot.path} ({format_size(snapshot.size)}, "
+              f"{format_size(snapshot.db_size)} uncompressed) in {time.monotonic() - started:.1f}s")
+        print(f"sha256 {snapshot.sha256}")
+    elif args.command == 'list':
+        snapshots = list_snapshots(args.dir)
+        if not snapshots:
+            print(f"No snapshots in {args.dir}")
+        for snapshot in snapshots:
+            kind = 'manual' if snapshot.manual else 'scheduled'
+            print(f"{os.path.basename(snapshot.path):<32}  {kind:<9}  {format_size(snapshot.size):>10}  "
+                  f"{snapshot.sha256[:16]}")
+    elif args.command == 'verify':
+        try:
+            print(f"OK {verify_snapshot(args.snapshot)}")
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+    elif args.command == 'restore':
+        try:
+            previous = restore_snapshot(args.snapshot, args.db)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+        print(f"Restored {args.db} from {args.snapshot}")
+        if previous:
+            print(f"Previous database kept at {previous}")
+
+
+if __name__ == '__main__':
+    main()
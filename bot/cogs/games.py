@@ -27,6 +27,7 @@ from ..database import (
     get_game_roles,
     get_all_groups,
     get_group,
+    JOB_PRIORITY_NORMAL,
 )
 from ..utils import (
     generate_acronym,
@@ -57,7 +58,7 @@ class GamesCog(commands.Cog):
         await interaction.response.defer()
         
         guild = interaction.guild
-        existing_acronyms = await get_all_acronyms()
+        existing_acronyms = await get_all_acronyms(guild.id)
         
         if acronym:
             if acronym.lower() in {a.lower() for a in existing_acronyms}:
@@ -69,12 +70,12 @@ class GamesCog(commands.Cog):
             base_acronym = generate_acronym(name)
             acronym = resolve_acronym_conflict(base_acronym, existing_acronyms)
         
-        template_channels = await get_all_template_channels()
-        groups = await get_groups_dict()
+        template_channels = await get_all_template_channels(guild.id)
+        groups = await get_groups_dict(guild.id)
         
         try:
             category = await guild.create_category(name=name)
-            game = await create_game(name, acronym, category.id)
+            game = await create_game(guild.id, name, acronym, category.id)
             role_color = discord.Color(random.choice(ROLE_COLORS))
             
             created_roles = []
@@ -109,7 +110,7 @@ class GamesCog(commands.Cog):
                     is_voice=template_ch.is_voice
                 )
             
-            await self.bot.sync_all_game_roles()
+            await self.bot.sync_guild_game_roles(guild, JOB_PRIORITY_NORMAL)
             
             embed = discord.Embed(
                 title=f"Created: {name}",
@@ -131,7 +132,7 @@ class GamesCog(commands.Cog):
     async def game_delete(self, interaction: discord.Interaction, acronym: str):
         await interaction.response.defer()
         
-        game = await get_game_by_acronym(acronym)
+        game = await get_game_by_acronym(interaction.guild.id, acronym)
         if not game:
             await interaction.followup.send(f"Game `{acronym}` not found.")
             return
@@ -174,7 +175,7 @@ class GamesCog(commands.Cog):
     
     @game_group.command(name="list", description="List all games")
     async def game_list(self, interaction: discord.Interaction):
-        games = await get_all_games()
+        games = await get_all_games(interaction.guild.id)
         
         if not games:
             await interaction.response.send_message("No games created yet.")
@@ -209,14 +210,14 @@ class GamesCog(commands.Cog):
         group: str,
         is_voice: bool = False
     ):
-        game = await get_game_by_acronym(acronym)
+        game = await get_game_by_acronym(interaction.guild.id, acronym)
         if not game:
             await interaction.response.send_message(f"Game `{acronym}` not found.")
             return
         
-        group_obj = await get_group(group)
+        group_obj = await get_group(interaction.guild.id, group)
         if not group_obj:
-            groups = await get_all_groups()
+            groups = await get_all_groups(interaction.guild.id)
             group_names = ", ".join(g.name for g in groups)
             await interaction.response.send_message(f"Group `{group}` not found. Available: {group_names}")
             return
@@ -229,7 +230,7 @@ class GamesCog(commands.Cog):
         
         await interaction.response.defer()
         
-        groups = await get_groups_dict()
+        groups = await get_groups_dict(interaction.guild.id)
         emoji = groups.get(group, "")
         channel_name = format_channel_name(emoji, game.acronym, name)
         
@@ -266,7 +267,7 @@ class GamesCog(commands.Cog):
         acronym: str,
         name: str
     ):
-        game = await get_game_by_acronym(acronym)
+        game = await get_game_by_acronym(interaction.guild.id, acronym)
         if not game:
             await interaction.response.send_message(f"Game `{acronym}` not found.")
             return
@@ -364,7 +365,7 @@ class GamesCog(commands.Cog):
     @game_addchannel.autocomplete("acronym")
     @game_removechannel.autocomplete("acronym")
     async def acronym_autocomplete(self, interaction: discord.Interaction, current: str):
-        games = await get_all_games()
+        games = await get_all_games(interaction.guild.id)
         return [
             app_commands.Choice(name=f"{g.acronym} - {g.name}", value=g.acronym)
             for g in games
@@ -373,7 +374,7 @@ class GamesCog(commands.Cog):
     
     @game_addchannel.autocomplete("group")
     async def group_autocomplete(self, interaction: discord.Interaction, current: str):
-        groups = await get_all_groups()
+        groups = await get_all_groups(interaction.guild.id)
         return [
             app_commands.Choice(name=f"{g.emoji} {g.name}", value=g.name)
             for g in groups
@@ -386,7 +387,7 @@ class GamesCog(commands.Cog):
         if not acronym:
             return []
         
-        game = await get_game_by_acronym(acronym)
+        game = await get_game_by_acronym(interaction.guild.id, acronym)
         if not game:
             return []
         
@@ -1,11 +1,29 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+import asyncio
+import io
 import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from ..backup import create_backup, list_snapshots
+from ..job_queue import enqueue
+from ..jobs import report
+from ..models import Job
+from ..permissions import permissions, owner_only
+from ..leader import leader
+from ..query_stats import stats as query_stats, LATENCY_BOUNDS_MS
+from ..profiling import run_profile, PROFILE_MAX_SECONDS
+from ..sharding import runs_shard_zero
+from ..config import BACKUP_INTERVAL_HOURS
+
 from ..database import (
     get_server_config,
+    get_guild_settings,
     upsert_server_config,
     get_all_template_channels,
     upsert_template_channel,
@@ -13,13 +31,30 @@ from ..database import (
     migrate_tasks_to_multi_assignee,
     get_all_tasks,
     get_task_assignees,
+    get_task_counts,
     get_all_games,
-    get_non_custom_game_channels,
-    get_groups_dict,
-    add_game_channel,
+    get_job_counts,
+    get_jobs,
+    retry_job,
+    JOB_TEMPLATE_SYNC,
+    JOB_MIGRATE_ASSIGNEES,
+    JOB_STATUSES,
+    JOB_PRIORITY_HIGH,
 )
-from ..utils import format_channel_name
+from ..utils import format_size
+
+
+# Jobs listed by /admin jobs
+JOB_LIST_LIMIT = 10
+
+# Functions listed by /admin dbstats
+DBSTATS_LIMIT = 15
+
+# Raw profiles larger than this are not attached (Discord's upload limit)
+PROFILE_ATTACH_MAX_BYTES = 8 * 1024 * 1024
 
+# Template channels added by quick setup in per-game mode
+TASK_TEMPLATE_NAMES = ("task-board", "task-questions", "task-leads")
 
 DEFAULT_CONFIG = {
     'channel_mode': 'per_game',
@@ -128,7 +163,7 @@ class CreateChannelModal(discord.ui.Modal, title='Create New Template Channel'):
         name = str(self.channel_name).lower().replace(' ', '-')
         group = str(self.channel_group).lower()
         description = str(self.channel_description) if self.channel_description else None
-        await upsert_template_channel(name, group, False, description)
+        await upsert_template_channel(self.wizard_view.guild_id, name, group, False, description)
         self.wizard_view.config[self.config_key] = name
         await self.wizard_view.advance_step(interaction)
 
@@ -197,49 +232,19 @@ class QuickSetupModeView(discord.ui.View):
     async def per_game_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
 
-        await upsert_template_channel("task-board", "general", False, "Task management dashboard")
-        await upsert_template_channel("task-questions", "general", False, "Questions about tasks")
-        await upsert_template_channel("task-leads", "general", False, "Lead notifications")
-
-        games = await get_all_games()
-        added_count = 0
-        errors = []
+        await upsert_template_channel(self.guild_id, "task-board", "general", False, "Task management dashboard")
+        await upsert_template_channel(self.guild_id, "task-questions", "general", False, "Questions about tasks")
+        await upsert_template_channel(self.guild_id, "task-leads", "general", False, "Lead notifications")
 
+        # Creating channels in every game is slow; it is queued and reported in this channel
+        games = await get_all_games(self.guild_id)
+        job_id = None
         if games:
-            template_channels = await get_all_template_channels()
-            task_templates = [ch for ch in template_channels if ch.name in ("task-board", "task-questions", "task-leads")]
-            groups = await get_groups_dict()
-
-            for game in games:
-                category = interaction.guild.get_channel(game.category_id)
-                if not category:
-                    errors.append(f"Category not found for {game.name}")
-                    continue
-
-                game_channels = await get_non_custom_game_channels(game.id)
-                game_channel_names = {ch.name for ch in game_channels}
-
-                for template_ch in task_templates:
-                    if template_ch.name not in game_channel_names:
-                        emoji = groups.get(template_ch.group_name, "")
-                        channel_name = format_channel_name(emoji, game.acronym, template_ch.name)
-
-                        try:
-                            new_channel = await category.create_text_channel(
-                                name=channel_name,
-                                topic=template_ch.description
-                            )
-                            await add_game_channel(
-                                game_id=game.id,
-                                channel_id=new_channel.id,
-                                name=template_ch.name,
-                                group_name=template_ch.group_name,
-                                is_custom=False,
-                                is_voice=False
-                            )
-                            added_count += 1
-                        except discord.HTTPException as e:
-                            errors.append(f"Failed to create {channel_name}: {e}")
+            job_id = await enqueue(
+                JOB_TEMPLATE_SYNC, self.guild_id,
+                {'names': list(TASK_TEMPLATE_NAMES), 'remove': False, 'channel_id': interaction.channel_id},
+                priority=JOB_PRIORITY_HIGH
+            )
 
         config = self.existing_config.copy() if self.existing_config else DEFAULT_CONFIG.copy()
         config['channel_mode'] = 'per_game'
@@ -247,15 +252,18 @@ class QuickSetupModeView(discord.ui.View):
         config['questions_channel_template'] = 'task-questions'
         config['leads_channel_template'] = 'task-leads'
 
-        sync_msg = f"Added {added_count} channels to {len(games)} game(s)." if games else "No existing games to sync."
-        if errors:
-            sync_msg += f"\n⚠️ {len(errors)} error(s)"
+        if not games:
+            sync_msg = "No existing games to sync."
+        elif job_id is None:
+            sync_msg = f"A sync to {len(games)} game(s) is already queued."
+        else:
+            sync_msg = f"Adding them to {len(games)} game(s) in the background (job #{job_id}); results will be posted in this channel."
 
         embed = discord.Embed(
             title="⚡ Template Channels Created!",
             description=(
                 f"Added to template: `task-board`, `task-questions`, `task-leads`\n\n"
-                f"**Sync results:** {sync_msg}\n\n"
+                f"**Game channels:** {sync_msg}\n\n"
                 "Now let's configure lead roles and approval settings..."
             ),
             color=discord.Color.green()
@@ -324,11 +332,11 @@ class SetupWizardView(discord.ui.View):
         self.template_channels = []
 
     async def start(self, interaction: discord.Interaction):
-        self.template_channels = await get_all_template_channels()
+        self.template_channels = await get_all_template_channels(self.guild_id)
         await self.show_step(interaction)
 
     async def start_from_step(self, interaction: discord.Interaction):
-        self.template_channels = await get_all_template_channels()
+        self.template_channels = await get_all_template_channels(self.guild_id)
         await self.show_step_followup(interaction)
 
     async def show_step(self, interaction: discord.Interaction):
@@ -450,7 +458,7 @@ class SetupWizardView(discord.ui.View):
 
     async def advance_step(self, interaction: discord.Interaction):
         self.step += 1
-        self.template_channels = await get_all_template_channels()
+        self.template_channels = await get_all_template_channels(self.guild_id)
         await self.show_step(interaction)
 
     async def show_step_followup(self, interaction: discord.Interaction):
@@ -505,6 +513,12 @@ class SetupWizardView(discord.ui.View):
 class AdminCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        bot.jobs.register(JOB_MIGRATE_ASSIGNEES, self.run_migrate_job)
+        if BACKUP_INTERVAL_HOURS > 0:
+            self.backup_loop.start()
+
+    def cog_unload(self):
+        self.backup_loop.cancel()
 
     admin_group = app_commands.Group(name="admin", description="Server administration and setup")
 
@@ -537,9 +551,9 @@ class AdminCog(commands.Cog):
 
     @admin_group.command(name="status", description="Show current setup configuration")
     async def admin_status(self, interaction: discord.Interaction):
-        config = await get_server_config(interaction.guild.id)
+        settings = await get_guild_settings(interaction.guild.id)
 
-        if not config or not config.setup_completed:
+        if not settings.setup_completed:
             embed = discord.Embed(
                 title="\u26a0\ufe0f Setup Not Completed",
                 description="Run `/admin setup` to configure the task system.",
@@ -548,34 +562,37 @@ class AdminCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        try:
-            cfg = json.loads(config.config_json)
-        except json.JSONDecodeError:
-            cfg = DEFAULT_CONFIG
-
         embed = discord.Embed(title="\u2699\ufe0f Server Configuration", color=discord.Color.blue())
-        mode = "Per-Game" if cfg.get('channel_mode') == 'per_game' else "Global"
+        mode = "Global" if settings.is_global else "Per-Game"
         embed.add_field(name="Channel Mode", value=mode, inline=True)
 
-        if cfg.get('channel_mode') == 'per_game':
+        if not settings.is_global:
             embed.add_field(
                 name="Templates",
-                value=f"Board: `{cfg.get('board_channel_template', 'tasks')}`\nQuestions: `{cfg.get('questions_channel_template', 'questions')}`\nLeads: `{cfg.get('leads_channel_template', 'leads')}`",
+                value=f"Board: `{settings.board_channel_template}`\nQuestions: `{settings.questions_channel_template}`\nLeads: `{settings.leads_channel_template}`",
                 inline=True
             )
         else:
             embed.add_field(
                 name="Channels",
-                value=f"Board: <#{cfg.get('global_board_channel_id')}>\nQuestions: <#{cfg.get('global_questions_channel_id')}>\nLeads: <#{cfg.get('global_leads_channel_id')}>",
+                value=f"Board: <#{settings.global_board_channel_id}>\nQuestions: <#{settings.global_questions_channel_id}>\nLeads: <#{settings.global_leads_channel_id}>",
                 inline=True
             )
 
-        lead_ids = cfg.get('lead_role_ids', [])
+        lead_ids = settings.lead_role_ids
         lead_mentions = ' '.join(f"<@&{rid}>" for rid in lead_ids) if lead_ids else "Not set"
         embed.add_field(name="Lead Roles", value=lead_mentions, inline=False)
 
         approval_modes = {'auto': "Auto", 'all': "All Must Approve", 'majority': "Majority", 'any': "Any Can Close"}
-        embed.add_field(name="Approval Mode", value=approval_modes.get(cfg.get('approval_mode', 'auto'), 'Auto'), inline=True)
+        embed.add_field(name="Approval Mode", value=approval_modes.get(settings.approval_mode, 'Auto'), inline=True)
+
+        counts = await get_task_counts(interaction.guild.id)
+        statuses = [('todo', 'To Do'), ('progress', 'In Progress'), ('review', 'In Review'), ('done', 'Done'), ('cancelled', 'Cancelled')]
+        embed.add_field(
+            name="Tasks",
+            value="\n".join(f"{label}: {counts.get(status, 0)}" for status, label in statuses),
+            inline=True
+        )
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -583,7 +600,22 @@ class AdminCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def admin_migrate(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        stats = await migrate_tasks_to_multi_assignee()
+        try:
+            job_id = await enqueue(
+                JOB_MIGRATE_ASSIGNEES, interaction.guild.id, {'channel_id': interaction.channel_id},
+                priority=JOB_PRIORITY_HIGH, throttle=True
+            )
+        except ValueError as e:
+            await interaction.followup.send(str(e))
+            return
+        if job_id is None:
+            await interaction.followup.send("A migration is already queued.")
+            return
+        await interaction.followup.send(f"Migration queued (job #{job_id}). Results will be posted in this channel.")
+
+    async def run_migrate_job(self, job: Job):
+        stats = await migrate_tasks_to_multi_assignee(job.guild_id)
+        permissions.clear()
 
         if stats["total"] == 0:
             embed = discord.Embed(title="\U0001f4ed No Tasks Found", description="No existing tasks to migrate.", color=discord.Color.yellow())
@@ -595,7 +627,128 @@ class AdminCog(commands.Cog):
                 description=f"**Migrated:** {stats['migrated']} tasks\n**Skipped:** {stats['skipped']} tasks\n**Total:** {stats['total']} tasks",
                 color=discord.Color.green()
             )
-        await interaction.followup.send(embed=embed)
+        await report(self.bot, job, embed=embed)
+
+    @admin_group.command(name="jobs", description="Show queued, running and failed background jobs")
+    @app_commands.describe(
+        status="Only jobs with this status",
+        retry="ID of a dead job to queue again"
+    )
+    @app_commands.choices(status=[app_commands.Choice(name=s.title(), value=s) for s in JOB_STATUSES])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def admin_jobs(self, interaction: discord.Interaction, status: str = None, retry: int = None):
+        guild_id = interaction.guild.id
+        if retry is not None:
+            if not await retry_job(guild_id, retry):
+                await interaction.response.send_message(f"Job #{retry} is not a dead job in this server.", ephemeral=True)
+                return
+            await interaction.response.send_message(f"Job #{retry} queued again.", ephemeral=True)
+            return
+
+        counts = await get_job_counts(guild_id)
+        recent = await get_jobs(guild_id, [status] if status else ('pending', 'running', 'dead'), JOB_LIST_LIMIT)
+
+        now = int(time.time())
+        lines = []
+        for job in recent:
+            line = f"`#{job.id}` **{job.kind}** {job.status} \u00b7 attempt {job.attempts}/{job.max_attempts}"
+            if job.status == 'pending' and job.run_after_ts > now:
+                line += f" \u00b7 retry <t:{job.run_after_ts}:R>"
+            if job.error:
+                line += f"\n\u2003{job.error[:120]}"
+            lines.append(line)
+        heading = f"**{status.title() if status else 'Unfinished'}** (newest first)"
+        embed = discord.Embed(
+            title="\u2699\ufe0f Background Jobs",
+            description=heading + "\n" + ("\n".join(lines) or "None"),
+            color=discord.Color.blue()
+        )
+        for job_status in JOB_STATUSES:
+            embed.add_field(name=job_status.title(), value=str(counts.get(job_status, 0)), inline=True)
+        embed.set_footer(text="Retry a dead job with /admin jobs retry:<id>")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @admin_group.command(name="dbstats", description="Show the database calls that take the most time (bot owner only)")
+    @app_commands.describe(
+        sort="Order by total time (default), call count, rows returned or p95 latency",
+        reset="Clear the statistics after showing them"
+    )
+    @app_commands.choices(sort=[
+        app_commands.Choice(name="Total time", value="total"),
+        app_commands.Choice(name="Calls", value="calls"),
+        app_commands.Choice(name="Rows", value="rows"),
+        app_commands.Choice(name="p95 latency", value="p95"),
+    ])
+    @owner_only()
+    async def admin_dbstats(self, interaction: discord.Interaction, sort: str = "total", reset: bool = False):
+        # Statistics are per process and cover every server it serves
+        top = query_stats.top(sort, DBSTATS_LIMIT)
+
+        def pct(entry, q):
+            bound = entry.percentile_ms(q)
+            return str(bound) if bound is not None else f">{LATENCY_BOUNDS_MS[-1]}"
+
+        lines = [f"{'function':<28}{'calls':>7}{'total':>8}{'avg':>6}{'p50':>6}{'p95':>6}{'rows':>8}"]
+        for name, entry in top:
+            total_ms = entry.total * 1000
+            lines.append(
+                f"{name[:27]:<28}{entry.calls:>7}{total_ms:>8.0f}{total_ms / entry.calls:>6.1f}"
+                f"{pct(entry, 0.5):>6}{pct(entry, 0.95):>6}{entry.rows:>8}"
+            )
+
+        calls = sum(e.calls for e in query_stats.functions.values())
+        errors = sum(e.errors for e in query_stats.functions.values())
+        embed = discord.Embed(
+            title="\U0001f5c4\ufe0f Database Calls",
+            description="```\n" + "\n".join(lines) + "\n```" if top else "No database calls recorded yet.",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Calls", value=str(calls), inline=True)
+        embed.add_field(name="Errors", value=str(errors), inline=True)
+        embed.add_field(name="Since", value=f"<t:{int(query_stats.since)}:R>", inline=True)
+        embed.set_footer(text="Times in ms; percentiles are bucket upper bounds")
+        if reset:
+            query_stats.reset()
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @admin_group.command(name="profile", description="Profile the bot process for a few seconds (bot owner only)")
+    @app_commands.describe(
+        seconds=f"How long to profile (1-{PROFILE_MAX_SECONDS})",
+        mode="cpu: where time goes (cProfile); alloc: where memory goes (tracemalloc)"
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="CPU", value="cpu"),
+        app_commands.Choice(name="Allocations", value="alloc"),
+    ])
+    @owner_only()
+    async def admin_profile(self, interaction: discord.Interaction,
+                            seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = 10, mode: str = "cpu"):
+        # Profiles this process only, i.e. whichever replica or shard took the interaction
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            report = await run_profile(mode, seconds)
+        except ValueError as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+
+        preview = report.summary
+        if len(preview) > 3900:
+            preview = preview[:3900] + "\n..."
+        embed = discord.Embed(
+            title=f"\u23f1\ufe0f {'CPU' if mode == 'cpu' else 'Allocation'} Profile ({report.seconds:.0f}s)",
+            description=f"```\n{preview}\n```",
+            color=discord.Color.blue()
+        )
+        files = [discord.File(io.BytesIO(report.summary.encode()), filename=f"{report.raw_filename}.txt")]
+        if len(report.raw) <= PROFILE_ATTACH_MAX_BYTES:
+            files.append(discord.File(io.BytesIO(report.raw), filename=report.raw_filename))
+            if mode == 'cpu':
+                embed.set_footer(text="Open the .prof with python -m pstats or snakeviz")
+            else:
+                embed.set_footer(text="Load the snapshot with tracemalloc.Snapshot.load()")
+        else:
+            embed.set_footer(text=f"Raw profile not attached ({format_size(len(report.raw))})")
+        await interaction.followup.send(embed=embed, files=files, ephemeral=True)
 
     @admin_group.command(name="channels", description="List channels with their IDs (for imports)")
     @app_commands.describe(category_id="Optional category ID to filter")
@@ -652,6 +805,60 @@ class AdminCog(commands.Cog):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @admin_group.command(name="backup", description="Take a database snapshot now (bot owner only)")
+    @owner_only()
+    async def admin_backup(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        started = time.monotonic()
+        try:
+            snapshot = await create_backup(manual=True)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            await interaction.followup.send(f"Backup failed: {e}")
+            return
+
+        embed = discord.Embed(title="\U0001f4be Backup Complete", color=discord.Color.green())
+        embed.add_field(name="Snapshot", value=f"`{os.path.basename(snapshot.path)}`", inline=False)
+        embed.add_field(
+            name="Size",
+            value=f"{format_size(snapshot.size)} ({format_size(snapshot.db_size)} uncompressed)",
+            inline=True
+        )
+        embed.add_field(name="Took", value=f"{time.monotonic() - started:.1f}s", inline=True)
+        embed.add_field(name="SHA-256", value=f"`{snapshot.sha256}`", inline=False)
+
+        snapshots = list_snapshots()
+        manual = sum(1 for s in snapshots if s.manual)
+        embed.set_footer(text=f"{manual} manual and {len(snapshots) - manual} scheduled snapshots kept")
+        await interaction.followup.send(embed=embed)
+
+    # ============== BACKGROUND TASKS ==============
+
+    @tasks.loop(hours=1)
+    async def backup_loop(self):
+        """Take a scheduled snapshot once the newest one is BACKUP_INTERVAL_HOURS old.
+
+        The loop's first run is at startup, so going by the snapshots on disk keeps
+        restarts and crash loops from rotating out older snapshots with fresh copies.
+        Old ones are rotated out by create_backup.
+        """
+        if not (runs_shard_zero(self.bot) and leader.is_leader):
+            return
+        snapshots = await asyncio.to_thread(list_snapshots)
+        last = next((s for s in snapshots if not s.manual), None)
+        if last and datetime.now(timezone.utc) - last.created_at < timedelta(hours=BACKUP_INTERVAL_HOURS):
+            return
+        try:
+            snapshot = await create_backup()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"Scheduled backup failed: {e}")
+            return
+        print(f"Backup written to {snapshot.path} ({format_size(snapshot.size)})")
+
+    @backup_loop.before_loop
+    async def before_backup_loop(self):
+        await self.bot.wait_until_ready()
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AdminCog(bot))
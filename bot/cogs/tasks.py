@@ -1,3 +1,10 @@
+import asyncio
+import itertools
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
@@ -6,25 +13,25 @@ import json
 import xml.etree.ElementTree as ET
 from typing import Optional, List
 
-from ..config import GUILD_ID
+from ..config import ARCHIVE_AFTER_DAYS
+from ..metrics import cache_lookup
+from ..utils import parse_deadline, format_duration, histogram_percentile
 from ..database import (
     get_all_games,
     get_game_by_acronym,
     create_task,
     get_task,
     get_task_by_thread_id,
-    get_tasks_by_game,
+    get_board_tasks,
+    get_game_task_counts,
     get_tasks_by_assignee,
     get_tasks_by_status,
-    get_tasks_due_soon,
-    get_stagnant_tasks,
     update_task_thread,
     update_task_status,
     update_task_eta,
     update_task_assignee,
     update_task_priority,
     update_task_header_message,
-    add_task_history,
     get_task_board,
     upsert_task_board,
     delete_task,
@@ -37,12 +44,36 @@ from ..database import (
     set_task_assignee_approval,
     get_task_approval_status,
     reset_task_approvals,
-    is_user_task_assignee,
     get_tasks_by_assignee_multi,
-    get_server_config,
-    is_setup_completed,
+    get_guild_settings,
+    get_existing_task_ids,
+    iter_task_export_rows,
+    search_tasks,
+    suggest_tasks,
+    refresh_task_stats,
+    get_task_stats,
+    get_assignee_load,
+    archive_closed_tasks,
+    incremental_vacuum,
+    STATS_BUCKETS,
+    get_pending_renders,
+    complete_render,
+    defer_render,
+    RENDER_CONTROL,
+    RENDER_HEADER,
+    RENDER_BOARD,
+    parse_board_ref,
+    JOB_REMINDERS,
+    JOB_TASK_IMPORT,
+    JOB_PRIORITY_HIGH,
+    JOB_PRIORITY_LOW,
 )
-from ..models import Task
+from ..models import Task, OutboxEntry, GuildSettings, Job
+from ..permissions import permissions
+from ..job_queue import enqueue
+from ..leader import leader
+from ..sharding import local_shards, runs_shard_zero
+from ..task_io import IMPORT_EXTENSIONS, EXPORT_FORMATS, read_task_rows, write_task_export
 
 
 # Status display mapping
@@ -70,6 +101,41 @@ STATUS_EMOJI = {
     'cancelled': '\u274c'      # x mark
 }
 
+# Reply when a compare-and-swap update loses to a concurrent change
+CONFLICT_MESSAGE = "This task was just updated by someone else. Please try again."
+
+# Outbox retry policy for failed Discord edits: doubling backoff, capped so a
+# render is applied within this long of Discord recovering from an outage
+RENDER_RETRY_SECONDS = 15
+RENDER_RETRY_MAX_SECONDS = 900
+
+# Number of messages whose last rendered payload is remembered
+RENDER_CACHE_SIZE = 4096
+
+# /task import: parallel channels, in-memory spool size before spilling to disk
+IMPORT_CONCURRENCY = 4
+IMPORT_SPOOL_BYTES = 1024 * 1024
+IMPORT_CHUNK_BYTES = 64 * 1024
+IMPORT_PROGRESS_SECONDS = 5
+# Rows parsed per worker-thread hop; only the validated plan outlives a batch
+IMPORT_PARSE_BATCH = 500
+
+# /task export: in-memory spool size before spilling to disk
+EXPORT_SPOOL_BYTES = 4 * 1024 * 1024
+
+# Task board columns and how many tasks each lists
+BOARD_STATUSES = ('todo', 'progress', 'review', 'done')
+BOARD_TASKS_PER_STATUS = 10
+
+# /task stats periods in days (None = all time)
+STATS_PERIODS = {'7d': 7, '30d': 30, '90d': 90, '1y': 365, 'all': None}
+
+# /task search results per page
+SEARCH_PAGE_SIZE = 10
+
+# Most reminders of each kind sent to one guild per reminder run
+REMINDERS_PER_GUILD = 25
+
 PRIORITY_EMOJI = {
     'Critical': '\U0001f534',  # red circle
     'High': '\U0001f7e0',      # orange circle
@@ -112,6 +178,54 @@ ROLE_TASK_STYLE = {
 }
 
 
+def find_leads_channel(guild: discord.Guild, settings: GuildSettings, acronym: str) -> Optional[discord.TextChannel]:
+    """The leads channel for a game: the global one, or the game's copy of the leads template."""
+    if settings.is_global:
+        return guild.get_channel(settings.global_leads_channel_id) if settings.global_leads_channel_id else None
+
+    channel_id = settings.leads_channel_ids.get(acronym)
+    channel = guild.get_channel(channel_id) if channel_id else None
+    if channel is None:
+        suffix = f"-{acronym.lower()}-{settings.leads_channel_template}"
+        channel = discord.utils.find(lambda c: c.name.endswith(suffix), guild.text_channels) or discord.utils.find(
+            lambda c: 'lead' in c.name.lower() and acronym.lower() in c.name.lower(),
+            guild.text_channels
+        )
+        if channel:
+            settings.leads_channel_ids[acronym] = channel.id
+    return channel
+
+
+class RenderCache:
+    """Last rendered embed payload per message, in LRU order.
+
+    Entries are keyed by (task id, task version, assignee ids). A render whose
+    key matches the cached one is skipped without rebuilding the embed, and a
+    rebuilt payload identical to the cached one is not sent to Discord. Changes
+    that do not touch the task row (e.g. a member's roles) show up on the next
+    task update.
+    """
+
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, message_id: int) -> Optional[tuple]:
+        entry = self._entries.get(message_id)
+        if entry is not None:
+            self._entries.move_to_end(message_id)
+        return entry
+
+    def store(self, message_id: int, key: tuple, payload: dict):
+        self._entries[message_id] = (key, payload)
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, message_id: int):
+        self._entries.pop(message_id, None)
+
+
 class AddMemberModal(discord.ui.Modal, title='Add Team Member'):
     user_id_input = discord.ui.TextInput(
         label='User ID',
@@ -142,20 +256,18 @@ class AddMemberModal(discord.ui.Modal, title='Add Team Member'):
             await interaction.response.send_message("User not found in this server.", ephemeral=True)
             return
 
-        await add_task_assignee(self.task_id, user_id)
-        await add_task_history(self.task_id, interaction.user.id, 'add_assignee', None, str(user_id))
-
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
+        async with self.cog.task_lock(self.task_id):
+            await add_task_assignee(self.task_id, user_id, actor_id=interaction.user.id)
+        permissions.invalidate_task(self.task_id)
+        # Acknowledge before any other REST work so the 3 second deadline is met
+        await interaction.response.send_message(f"Added {member.mention} to the team.", ephemeral=True)
+        await self.cog.flush_renders()
 
         if task.thread_id:
             thread = interaction.guild.get_channel(task.thread_id)
             if thread:
                 await thread.send(f"{member.mention} You have been added to this task!")
 
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
-        await interaction.response.send_message(f"Added {member.mention} to the team.", ephemeral=True)
-
 
 class ManageTeamView(discord.ui.View):
     def __init__(self, task_id: int, cog: 'TasksCog'):
@@ -215,17 +327,15 @@ class ManageTeamView(discord.ui.View):
 
     @discord.ui.button(label='Remove Primary', style=discord.ButtonStyle.secondary, emoji='\u274c')
     async def remove_primary(self, interaction: discord.Interaction, button: discord.ui.Button):
-        primary = await get_task_primary_assignee(self.task_id)
+        async with self.cog.task_lock(self.task_id):
+            primary = await get_task_primary_assignee(self.task_id)
+            if primary:
+                await clear_task_primary_assignee(self.task_id, actor_id=interaction.user.id)
         if not primary:
             await interaction.response.send_message("No primary owner set.", ephemeral=True)
             return
-
-        await clear_task_primary_assignee(self.task_id)
-        task = await get_task(self.task_id)
-        await add_task_history(self.task_id, interaction.user.id, 'remove_primary', str(primary.user_id), None)
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
         await interaction.response.send_message("Primary owner removed. Team approval rules now apply.", ephemeral=True)
+        await self.cog.flush_renders()
 
 
 class RemoveMemberSelect(discord.ui.Select):
@@ -236,16 +346,14 @@ class RemoveMemberSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         user_id = int(self.values[0])
-        await remove_task_assignee(self.task_id, user_id)
-        task = await get_task(self.task_id)
-        await add_task_history(self.task_id, interaction.user.id, 'remove_assignee', str(user_id), None)
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
+        async with self.cog.task_lock(self.task_id):
+            await remove_task_assignee(self.task_id, user_id, actor_id=interaction.user.id)
+        permissions.invalidate_task(self.task_id)
 
         member = interaction.guild.get_member(user_id)
         name = member.mention if member else f"User {user_id}"
         await interaction.response.send_message(f"Removed {name} from the team.", ephemeral=True)
+        await self.cog.flush_renders()
 
 
 class SetPrimarySelect(discord.ui.Select):
@@ -256,19 +364,13 @@ class SetPrimarySelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         user_id = int(self.values[0])
-        old_primary = await get_task_primary_assignee(self.task_id)
-        await set_task_primary_assignee(self.task_id, user_id)
-        task = await get_task(self.task_id)
-        
-        old_val = str(old_primary.user_id) if old_primary else None
-        await add_task_history(self.task_id, interaction.user.id, 'set_primary', old_val, str(user_id))
-        
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
+        async with self.cog.task_lock(self.task_id):
+            await set_task_primary_assignee(self.task_id, user_id, actor_id=interaction.user.id)
 
         member = interaction.guild.get_member(user_id)
         name = member.mention if member else f"User {user_id}"
         await interaction.response.send_message(f"Set {name} as primary owner.", ephemeral=True)
+        await self.cog.flush_renders()
 
 
 class HeaderView(discord.ui.View):
@@ -284,10 +386,7 @@ class HeaderView(discord.ui.View):
                 item.custom_id = f"{item.custom_id}:{task_id}"
 
     async def check_lead(self, interaction: discord.Interaction) -> bool:
-        if interaction.user.guild_permissions.administrator:
-            return True
-        lead_roles = [r for r in interaction.user.roles if 'lead' in r.name.lower() or 'admin' in r.name.lower()]
-        if not lead_roles:
+        if not await permissions.is_lead(interaction.user):
             await interaction.response.send_message("Only Leads/Admins can use this button.", ephemeral=True)
             return False
         return True
@@ -327,24 +426,25 @@ class HeaderView(discord.ui.View):
         if not await self.check_lead(interaction):
             return
         
-        task = await get_task(self.task_id)
-        if not task:
-            await interaction.response.send_message("Task not found.", ephemeral=True)
-            return
-
-        if task.status == 'done':
-            await interaction.response.send_message("Task is already completed.", ephemeral=True)
+        # Replies wait until the lock is released so no REST call runs under it
+        async with self.cog.task_lock(self.task_id):
+            task = await get_task(self.task_id)
+            if not task:
+                error = "Task not found."
+            elif task.status == 'done':
+                error = "Task is already completed."
+            elif not await update_task_status(self.task_id, 'cancelled', actor_id=interaction.user.id,
+                                              expected_version=task.version):
+                error = CONFLICT_MESSAGE
+            else:
+                error = None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
-
-        old_status = task.status
-        await update_task_status(self.task_id, 'cancelled')
-        await add_task_history(self.task_id, interaction.user.id, 'status_change', old_status, 'cancelled')
+        await interaction.response.send_message("Task cancelled.", ephemeral=True)
 
         # Update embeds
-        task.status = 'cancelled'
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
+        await self.cog.flush_renders()
 
         # Archive thread
         if task.thread_id:
@@ -353,8 +453,6 @@ class HeaderView(discord.ui.View):
                 await thread.send(f"\u274c Task cancelled by {interaction.user.mention}")
                 await thread.edit(archived=True, locked=True)
 
-        await interaction.response.send_message("Task cancelled.", ephemeral=True)
-
 
 class PrioritySelectView(discord.ui.View):
     def __init__(self, task_id: int, cog: 'TasksCog'):
@@ -372,22 +470,21 @@ class PrioritySelectView(discord.ui.View):
         ]
     )
     async def priority_select(self, interaction: discord.Interaction, select: discord.ui.Select):
-        task = await get_task(self.task_id)
-        if not task:
-            await interaction.response.send_message("Task not found.", ephemeral=True)
-            return
-
-        old_priority = task.priority
         new_priority = select.values[0]
-        await update_task_priority(self.task_id, new_priority)
-        await add_task_history(self.task_id, interaction.user.id, 'priority_change', old_priority, new_priority)
-
-        task.priority = new_priority
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
-
+        async with self.cog.task_lock(self.task_id):
+            task = await get_task(self.task_id)
+            if not task:
+                error = "Task not found."
+            elif not await update_task_priority(self.task_id, new_priority, actor_id=interaction.user.id,
+                                                expected_version=task.version):
+                error = CONFLICT_MESSAGE
+            else:
+                error = None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
         await interaction.response.send_message(f"Priority updated to: {new_priority}", ephemeral=True)
+        await self.cog.flush_renders()
 
 
 class ETAModal(discord.ui.Modal, title='Update ETA'):
@@ -404,19 +501,22 @@ class ETAModal(discord.ui.Modal, title='Update ETA'):
         self.cog = cog
 
     async def on_submit(self, interaction: discord.Interaction):
-        task = await get_task(self.task_id)
-        if not task:
-            await interaction.response.send_message("Task not found.", ephemeral=True)
+        async with self.cog.task_lock(self.task_id):
+            task = await get_task(self.task_id)
+            if not task:
+                error = "Task not found."
+            elif not await update_task_eta(self.task_id, str(self.eta_input), actor_id=interaction.user.id,
+                                           expected_version=task.version):
+                error = CONFLICT_MESSAGE
+            else:
+                error = None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
-
-        old_eta = task.eta
-        await update_task_eta(self.task_id, str(self.eta_input))
-        await add_task_history(self.task_id, interaction.user.id, 'eta_update', old_eta, str(self.eta_input))
+        await interaction.response.send_message(f"ETA updated to: {self.eta_input}", ephemeral=True)
 
         # Update control panel
-        task.eta = str(self.eta_input)
-        await self.cog.update_control_panel(interaction, task)
-        await interaction.response.send_message(f"ETA updated to: {self.eta_input}", ephemeral=True)
+        await self.cog.flush_renders()
 
 
 class TaskView(discord.ui.View):
@@ -437,29 +537,21 @@ class TaskView(discord.ui.View):
         return True
 
     async def check_assignee(self, interaction: discord.Interaction) -> bool:
-        is_assignee = await is_user_task_assignee(self.task_id, interaction.user.id)
-        if not is_assignee:
+        access = await permissions.access(interaction.user, self.task_id)
+        if not access.is_assignee:
             await interaction.response.send_message("Only team members can use this button.", ephemeral=True)
             return False
         return True
 
     async def check_assignee_or_lead(self, interaction: discord.Interaction) -> bool:
-        is_assignee = await is_user_task_assignee(self.task_id, interaction.user.id)
-        if is_assignee:
-            return True
-        if interaction.user.guild_permissions.administrator:
-            return True
-        lead_roles = [r for r in interaction.user.roles if 'lead' in r.name.lower() or 'admin' in r.name.lower()]
-        if lead_roles:
+        access = await permissions.access(interaction.user, self.task_id)
+        if access.allowed:
             return True
         await interaction.response.send_message("Only team members or leads can use this button.", ephemeral=True)
         return False
 
     async def check_lead(self, interaction: discord.Interaction) -> bool:
-        if interaction.user.guild_permissions.administrator:
-            return True
-        lead_roles = [r for r in interaction.user.roles if 'lead' in r.name.lower() or 'admin' in r.name.lower()]
-        if not lead_roles:
+        if not await permissions.is_lead(interaction.user):
             await interaction.response.send_message("Only Leads/Admins can use this button.", ephemeral=True)
             return False
         return True
@@ -469,36 +561,40 @@ class TaskView(discord.ui.View):
         if not await self.check_assignee(interaction):
             return
 
-        task = await get_task(self.task_id)
-        if task.status != 'todo':
-            await interaction.response.send_message("Task must be in 'To Do' status to start.", ephemeral=True)
+        async with self.cog.task_lock(self.task_id):
+            task = await get_task(self.task_id)
+            if task.status != 'todo':
+                error = "Task must be in 'To Do' status to start."
+            elif not await update_task_status(self.task_id, 'progress', actor_id=interaction.user.id,
+                                              expected_version=task.version):
+                error = CONFLICT_MESSAGE
+            else:
+                error = None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
-
-        await update_task_status(self.task_id, 'progress')
-        await add_task_history(self.task_id, interaction.user.id, 'status_change', 'todo', 'progress')
-        
-        task.status = 'progress'
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
         await interaction.response.send_message("Task started!", ephemeral=True)
+        await self.cog.flush_renders()
 
     @discord.ui.button(label='Pause', style=discord.ButtonStyle.secondary, emoji='\u23f8\ufe0f', custom_id='task_pause')
     async def pause_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not await self.check_assignee(interaction):
             return
 
-        task = await get_task(self.task_id)
-        if task.status != 'progress':
-            await interaction.response.send_message("Task must be 'In Progress' to pause.", ephemeral=True)
+        async with self.cog.task_lock(self.task_id):
+            task = await get_task(self.task_id)
+            if task.status != 'progress':
+                error = "Task must be 'In Progress' to pause."
+            elif not await update_task_status(self.task_id, 'todo', actor_id=interaction.user.id,
+                                              expected_version=task.version):
+                error = CONFLICT_MESSAGE
+            else:
+                error = None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
-
-        await update_task_status(self.task_id, 'todo')
-        await add_task_history(self.task_id, interaction.user.id, 'status_change', 'progress', 'todo')
-
-        task.status = 'todo'
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
         await interaction.response.send_message("Task paused.", ephemeral=True)
+        await self.cog.flush_renders()
 
     @discord.ui.button(label='Update ETA', style=discord.ButtonStyle.primary, emoji='\U0001f4c5', custom_id='task_eta')
     async def eta_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -515,24 +611,18 @@ class TaskView(discord.ui.View):
 
         task = await get_task(self.task_id)
         
-        # Find leads channel for this game
-        game = await get_game_by_acronym(task.game_acronym)
-        if game:
-            guild = interaction.guild
-            leads_channel = discord.utils.find(
-                lambda c: 'lead' in c.name.lower() and task.game_acronym.lower() in c.name.lower(),
-                guild.text_channels
+        guild = interaction.guild
+        leads_channel = find_leads_channel(guild, await get_guild_settings(guild.id), task.game_acronym)
+        if leads_channel:
+            thread = guild.get_channel(task.thread_id)
+            thread_link = thread.jump_url if thread else "Thread not found"
+            await leads_channel.send(
+                f"\u2753 **Question on Task:** {task.title}\n"
+                f"From: {interaction.user.mention}\n"
+                f"Thread: {thread_link}"
             )
-            if leads_channel:
-                thread = guild.get_channel(task.thread_id)
-                thread_link = thread.jump_url if thread else "Thread not found"
-                await leads_channel.send(
-                    f"\u2753 **Question on Task:** {task.title}\n"
-                    f"From: {interaction.user.mention}\n"
-                    f"Thread: {thread_link}"
-                )
-                await interaction.response.send_message("Lead has been notified!", ephemeral=True)
-                return
+            await interaction.response.send_message("Lead has been notified!", ephemeral=True)
+            return
 
         await interaction.response.send_message("Could not find leads channel. Please contact a lead directly.", ephemeral=True)
 
@@ -541,94 +631,80 @@ class TaskView(discord.ui.View):
         if not await self.check_assignee_or_lead(interaction):
             return
 
-        task = await get_task(self.task_id)
-        if task.status not in ['todo', 'progress']:
-            await interaction.response.send_message("Task cannot be submitted for review in current status.", ephemeral=True)
+        async with self.cog.task_lock(self.task_id):
+            task = await get_task(self.task_id)
+            if task.status not in ['todo', 'progress']:
+                error = "Task cannot be submitted for review in current status."
+            elif not await update_task_status(self.task_id, 'review', actor_id=interaction.user.id,
+                                              expected_version=task.version):
+                error = CONFLICT_MESSAGE
+            else:
+                error = None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
 
-        old_status = task.status
-        await update_task_status(self.task_id, 'review')
-        await add_task_history(self.task_id, interaction.user.id, 'status_change', old_status, 'review')
-
-        task.status = 'review'
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
+        await interaction.response.send_message("Task submitted for review! Lead has been notified.", ephemeral=True)
+        await self.cog.flush_renders()
 
         # Notify leads
-        game = await get_game_by_acronym(task.game_acronym)
-        if game:
-            guild = interaction.guild
-            leads_channel = discord.utils.find(
-                lambda c: 'lead' in c.name.lower() and task.game_acronym.lower() in c.name.lower(),
-                guild.text_channels
+        guild = interaction.guild
+        leads_channel = find_leads_channel(guild, await get_guild_settings(guild.id), task.game_acronym)
+        if leads_channel:
+            thread = guild.get_channel(task.thread_id)
+            thread_link = thread.jump_url if thread else "Thread not found"
+            await leads_channel.send(
+                f"\U0001f4e5 **Task Submitted for Review:** {task.title}\n"
+                f"By: {interaction.user.mention}\n"
+                f"Thread: {thread_link}"
             )
-            if leads_channel:
-                thread = guild.get_channel(task.thread_id)
-                thread_link = thread.jump_url if thread else "Thread not found"
-                await leads_channel.send(
-                    f"\U0001f4e5 **Task Submitted for Review:** {task.title}\n"
-                    f"By: {interaction.user.mention}\n"
-                    f"Thread: {thread_link}"
-                )
-
-        await interaction.response.send_message("Task submitted for review! Lead has been notified.", ephemeral=True)
 
     @discord.ui.button(label='Approve & Close', style=discord.ButtonStyle.danger, emoji='\U0001f3c1', custom_id='task_approve')
     async def approve_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not await self.check_assignee_or_lead(interaction):
             return
 
+        # Serialize approvals so concurrent clicks close the task once; the reply,
+        # embed edits and thread archive run after the lock is released
+        async with self.cog.task_lock(self.task_id):
+            message, closed = await self._approve(interaction)
+        await interaction.response.send_message(message, ephemeral=True)
+        if not closed:
+            return
+        await self.cog.flush_renders()
+
+        thread = interaction.channel
+        if isinstance(thread, discord.Thread):
+            await thread.edit(archived=True, locked=True)
+
+    async def _approve(self, interaction: discord.Interaction) -> tuple:
+        """Record the approval and close the task if it is enough. Returns (reply, closed)."""
         task = await get_task(self.task_id)
         if task.status not in ['todo', 'progress', 'review']:
-            await interaction.response.send_message("Task is already completed.", ephemeral=True)
-            return
+            return "Task is already completed.", False
 
         approval_status = await get_task_approval_status(self.task_id)
-        is_lead = interaction.user.guild_permissions.administrator or any(
-            'lead' in r.name.lower() or 'admin' in r.name.lower() 
-            for r in interaction.user.roles
-        )
+        settings = await get_guild_settings(interaction.guild.id)
 
-        if is_lead:
-            await self._complete_task(interaction, task)
-            return
+        if (await permissions.access(interaction.user, self.task_id)).is_lead:
+            return await self._complete_task(interaction, task)
 
         if approval_status['primary'] and approval_status['primary'].user_id == interaction.user.id:
-            await self._complete_task(interaction, task)
-            return
+            return await self._complete_task(interaction, task)
 
         if approval_status['primary']:
-            await interaction.response.send_message(
-                f"Only the primary owner (<@{approval_status['primary'].user_id}>) can close this task.",
-                ephemeral=True
-            )
-            return
+            return f"Only the primary owner (<@{approval_status['primary'].user_id}>) can close this task.", False
 
         await set_task_assignee_approval(self.task_id, interaction.user.id, True)
         approval_status = await get_task_approval_status(self.task_id)
 
-        config = await get_server_config(interaction.guild.id)
-        approval_mode = 'auto'
-        if config and config.config_json:
-            try:
-                cfg = json.loads(config.config_json)
-                approval_mode = cfg.get('approval_mode', 'auto')
-            except json.JSONDecodeError:
-                pass
-
         total = approval_status['total']
         approved = approval_status['approved']
-        required = self._calculate_required_approvals(total, approval_mode)
+        required = self._calculate_required_approvals(total, settings.approval_mode)
 
         if approved >= required:
-            await self._complete_task(interaction, task)
-        else:
-            await self.cog.update_control_panel(interaction, task)
-            await interaction.response.send_message(
-                f"Your approval recorded! ({approved}/{required} needed to close)",
-                ephemeral=True
-            )
+            return await self._complete_task(interaction, task)
+        return f"Your approval recorded! ({approved}/{required} needed to close)", False
 
     def _calculate_required_approvals(self, total: int, mode: str) -> int:
         if mode == 'any':
@@ -641,30 +717,72 @@ class TaskView(discord.ui.View):
             return 2
         return (total // 2) + 1
 
-    async def _complete_task(self, interaction: discord.Interaction, task: Task):
-        old_status = task.status
-        await update_task_status(self.task_id, 'done')
-        await add_task_history(self.task_id, interaction.user.id, 'status_change', old_status, 'done')
-
-        task.status = 'done'
-        await self.cog.update_control_panel(interaction, task)
-        await self.cog.update_header_message(interaction, task)
-        await self.cog.update_dashboard(task.game_acronym, interaction.client)
+    async def _complete_task(self, interaction: discord.Interaction, task: Task) -> tuple:
+        if not await update_task_status(self.task_id, 'done', actor_id=interaction.user.id,
+                                        expected_version=task.version):
+            return CONFLICT_MESSAGE, False
+        return "Task approved and closed!", True
 
-        thread = interaction.channel
-        if isinstance(thread, discord.Thread):
-            await thread.edit(archived=True, locked=True)
 
-        await interaction.response.send_message("Task approved and closed!", ephemeral=True)
+class SearchResultsView(discord.ui.View):
+    def __init__(self, cog: 'TasksCog', guild_id: int, query: str, game: str = None, status: str = None,
+                 include_archive: bool = False):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.guild_id = guild_id
+        self.query = query
+        self.game = game
+        self.status = status
+        self.include_archive = include_archive
+        self.page = 0
+
+    async def render(self) -> Optional[discord.Embed]:
+        """Fetch the current page (plus one row to detect a next page) and build its embed."""
+        tasks = await search_tasks(
+            self.guild_id, self.query, self.game, self.status,
+            limit=SEARCH_PAGE_SIZE + 1, offset=self.page * SEARCH_PAGE_SIZE,
+            include_archive=self.include_archive
+        )
+        if not tasks:
+            return None
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = len(tasks) <= SEARCH_PAGE_SIZE
+        return self.cog.create_search_embed(self.query, tasks[:SEARCH_PAGE_SIZE], self.page)
+
+    @discord.ui.button(label='Previous', style=discord.ButtonStyle.secondary, emoji='\u25c0\ufe0f')
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.secondary, emoji='\u25b6\ufe0f')
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        embed = await self.render()
+        if embed is None:
+            # Results shrank since the last page was shown
+            self.page -= 1
+            embed = await self.render()
+        await interaction.response.edit_message(embed=embed, view=self)
 
 
 class TasksCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._render_lock = asyncio.Lock()
+        self._render_requested = False
+        self._task_locks = weakref.WeakValueDictionary()
+        self._render_cache = RenderCache()
+        # Guild the next reminder run starts with, so no guild is always served last
+        self._reminder_offset = 0
         self.reminder_loop.start()
+        self.outbox_loop.start()
+        self.archive_loop.start()
+        bot.jobs.register(JOB_TASK_IMPORT, self.run_import_job)
 
     def cog_unload(self):
         self.reminder_loop.cancel()
+        self.outbox_loop.cancel()
+        self.archive_loop.cancel()
 
     task_group = app_commands.Group(name="task", description="Task management")
 
@@ -836,8 +954,8 @@ class TasksCog(commands.Cog):
     ):
         await interaction.response.defer()
 
-        setup_complete = await is_setup_completed(interaction.guild.id)
-        if not setup_complete:
+        settings = await get_guild_settings(interaction.guild.id)
+        if not settings.setup_completed:
             await interaction.followup.send(
                 "\u26a0\ufe0f **Setup not complete.** Some features may not work correctly.\n"
                 "Run `/setup` to configure the task system.\n\n"
@@ -846,13 +964,13 @@ class TasksCog(commands.Cog):
             )
 
         if game:
-            game_obj = await get_game_by_acronym(game)
+            game_obj = await get_game_by_acronym(interaction.guild.id, game)
             if not game_obj:
                 await interaction.followup.send(f"Game `{game}` not found.")
                 return
             game_acronym = game_obj.acronym
         else:
-            games = await get_all_games()
+            games = await get_all_games(interaction.guild.id)
             game_acronym = None
             for g in games:
                 if g.acronym.lower() in target_channel.name.lower():
@@ -862,14 +980,21 @@ class TasksCog(commands.Cog):
                 await interaction.followup.send("Could not detect game. Please specify with `game` parameter.")
                 return
 
+        deadline_ts = parse_deadline(deadline)
+        if deadline and deadline_ts is None:
+            await interaction.followup.send(f"Could not read deadline `{deadline}`. Use a date like 2026-05-20.")
+            return
+
         task = await create_task(
+            guild_id=interaction.guild.id,
             game_acronym=game_acronym,
             title=title,
             description=description,
             assignee_id=assignee.id,
             target_channel_id=target_channel.id,
             deadline=deadline,
-            priority=priority
+            priority=priority,
+            deadline_ts=deadline_ts
         )
 
         all_assignees = [assignee]
@@ -888,32 +1013,12 @@ class TasksCog(commands.Cog):
                 except ValueError:
                     pass
 
-        game_obj = await get_game_by_acronym(game_acronym)
+        game_obj = await get_game_by_acronym(interaction.guild.id, game_acronym)
         game_name = game_obj.name if game_obj else game_acronym
 
-        header_embed = self.create_header_embed(task, all_assignees, game_name)
-        header_view = HeaderView(task.id, self)
-        header_msg = await target_channel.send(embed=header_embed, view=header_view)
-
-        thread = await header_msg.create_thread(name=f"Task: {title[:50]}")
-
-        control_embed = self.create_control_embed(task, all_assignees, game_name)
-        view = TaskView(task.id, self)
-        control_msg = await thread.send(embed=control_embed, view=view)
-
-        await update_task_thread(task.id, thread.id, control_msg.id)
-        await update_task_header_message(task.id, header_msg.id)
-        
-        task.thread_id = thread.id
-        task.header_message_id = header_msg.id
-
-        header_embed = self.create_header_embed(task, all_assignees, game_name)
-        await header_msg.edit(embed=header_embed, view=header_view)
-
-        mentions = ' '.join(m.mention for m in all_assignees)
-        await thread.send(f"{mentions} You have been assigned this task!")
+        thread = await self.publish_task(task, target_channel, all_assignees, game_name)
 
-        await self.update_dashboard(game_acronym, self.bot)
+        await self.flush_renders()
 
         assignee_list = ', '.join(m.mention for m in all_assignees)
         await interaction.followup.send(
@@ -922,6 +1027,35 @@ class TasksCog(commands.Cog):
             f"Deadline: {deadline or 'None'}"
         )
 
+    async def publish_task(self, task: Task, channel: discord.TextChannel, members: list, game_name: str,
+                           notify: bool = True) -> discord.Thread:
+        """Post the header, thread and control panel of a new task and notify its team unless notify is False.
+
+        The sent payloads prime the render cache, so renders queued while the task
+        was being created do not edit the fresh messages a second time.
+        """
+        header_embed = self.create_header_embed(task, members, game_name)
+        header_msg = await channel.send(embed=header_embed, view=HeaderView(task.id, self))
+
+        thread = await header_msg.create_thread(name=f"Task: {task.title[:50]}")
+
+        control_embed = self.create_control_embed(task, members, game_name)
+        control_msg = await thread.send(embed=control_embed, view=TaskView(task.id, self))
+
+        self._render_cache.store(header_msg.id, None, {'embed': header_embed.to_dict(), 'view': True})
+        self._render_cache.store(control_msg.id, None, {'embed': control_embed.to_dict(), 'view': True})
+
+        await update_task_thread(task.id, thread.id, control_msg.id)
+        await update_task_header_message(task.id, header_msg.id)
+        task.thread_id = thread.id
+        task.control_message_id = control_msg.id
+        task.header_message_id = header_msg.id
+
+        if notify:
+            mentions = ' '.join(m.mention for m in members)
+            await thread.send(f"{mentions} You have been assigned this task!")
+        return thread
+
     def _get_role_style(self, members=None) -> dict:
         if not members:
             return ROLE_TASK_STYLE['default']
@@ -1000,26 +1134,68 @@ class TasksCog(commands.Cog):
 
         return embed
 
-    async def update_control_panel(self, interaction: discord.Interaction, task: Task):
-        if not task.control_message_id or not task.thread_id:
+    def _resolve_members(self, task: Task, user_ids: List[int]) -> List[discord.Member]:
+        """Resolve assignee IDs through the cached guild of the task's target channel."""
+        channel = self.bot.get_channel(task.target_channel_id)
+        if not channel:
+            return []
+        members = [channel.guild.get_member(uid) for uid in user_ids]
+        return [m for m in members if m]
+
+    async def _edit_rendered(self, channel_id: int, message_id: int, key: tuple, build):
+        """Edit a message with a freshly built payload unless it is unchanged.
+
+        build() returns (embed, view). The edit goes through a PartialMessage so no
+        fetch is needed; payloads identical to the last edit are skipped.
+        """
+        cached = self._render_cache.get(message_id)
+        hit = bool(cached) and cached[0] == key
+        cache_lookup('render', hit)
+        if hit:
             return
 
+        embed, view = build()
+        payload = {'embed': embed.to_dict(), 'view': view is not None}
+        unchanged = bool(cached) and cached[1] == payload
+        cache_lookup('render_payload', unchanged)
+        if unchanged:
+            self._render_cache.store(message_id, key, payload)
+            return
+
+        message = self.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
         try:
-            thread = interaction.guild.get_channel(task.thread_id)
-            if thread:
-                msg = await thread.fetch_message(task.control_message_id)
-                assignees_data = await get_task_assignees(task.id)
-                assignees = [interaction.guild.get_member(a.user_id) for a in assignees_data]
-                assignees = [m for m in assignees if m]
-                game_obj = await get_game_by_acronym(task.game_acronym)
-                game_name = game_obj.name if game_obj else None
-                embed = self.create_control_embed(task, assignees if assignees else None, game_name)
-                view = TaskView(task.id, self) if task.status not in ('done', 'cancelled') else None
-                await msg.edit(embed=embed, view=view)
-        except discord.NotFound:
-            pass
+            await message.edit(embed=embed, view=view)
         except discord.HTTPException:
-            pass
+            self._render_cache.discard(message_id)
+            raise
+        self._render_cache.store(message_id, key, payload)
+
+    async def update_control_panel(self, task: Task):
+        """Re-render the control panel in the task thread.
+
+        Raises discord.HTTPException so the outbox worker can retry failed edits.
+        """
+        if not task.control_message_id or not task.thread_id:
+            return
+
+        assignee_ids = [a.user_id for a in await get_task_assignees(task.id)]
+        key = (task.id, task.version, tuple(assignee_ids))
+        # Skip the game lookup entirely when nothing the panel depends on changed
+        if (self._render_cache.get(task.control_message_id) or (None,))[0] == key:
+            # Misses are counted by _edit_rendered
+            cache_lookup('render', True)
+            return
+
+        game_obj = await get_game_by_acronym(task.guild_id, task.game_acronym)
+        game_name = game_obj.name if game_obj else None
+
+        def build():
+            assignees = self._resolve_members(task, assignee_ids)
+            embed = self.create_control_embed(task, assignees if assignees else None, game_name)
+            view = TaskView(task.id, self) if task.status not in ('done', 'cancelled') else None
+            return embed, view
+
+        await self._edit_rendered(task.thread_id, task.control_message_id, key, build)
 
     def create_header_embed(self, task: Task, assignees=None, game_name: str = None) -> discord.Embed:
         status = task.status or 'todo'
@@ -1052,24 +1228,86 @@ class TasksCog(commands.Cog):
 
         return embed
 
-    async def update_header_message(self, interaction: discord.Interaction, task: Task):
+    async def update_header_message(self, task: Task):
+        """Re-render the header message in the target channel.
+
+        Raises discord.HTTPException so the outbox worker can retry failed edits.
+        """
         if not task.header_message_id or not task.target_channel_id:
             return
 
-        try:
-            channel = interaction.guild.get_channel(task.target_channel_id)
-            if channel:
-                msg = await channel.fetch_message(task.header_message_id)
-                assignees_data = await get_task_assignees(task.id)
-                assignees = [interaction.guild.get_member(a.user_id) for a in assignees_data]
-                assignees = [m for m in assignees if m]
-                embed = self.create_header_embed(task, assignees if assignees else None)
-                view = HeaderView(task.id, self) if task.status not in ('done', 'cancelled') else None
-                await msg.edit(embed=embed, view=view)
-        except discord.NotFound:
-            pass
-        except discord.HTTPException:
-            pass
+        assignee_ids = [a.user_id for a in await get_task_assignees(task.id)]
+        key = (task.id, task.version, tuple(assignee_ids))
+
+        def build():
+            assignees = self._resolve_members(task, assignee_ids)
+            embed = self.create_header_embed(task, assignees if assignees else None)
+            view = HeaderView(task.id, self) if task.status not in ('done', 'cancelled') else None
+            return embed, view
+
+        await self._edit_rendered(task.target_channel_id, task.header_message_id, key, build)
+
+    # ============== RENDER OUTBOX ==============
+
+    def task_lock(self, task_id: int) -> asyncio.Lock:
+        """Per-task lock serializing read-check-write handlers within this process."""
+        lock = self._task_locks.get(task_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._task_locks[task_id] = lock
+        return lock
+
+    async def flush_renders(self):
+        """Apply pending embed renders queued by task state changes.
+
+        Each entry renders from the current DB state, so several changes to the
+        same message collapse into a single edit. Callers that queue up behind a
+        drain which started after their request return without draining again.
+        Failed edits stay queued and are retried with capped backoff by outbox_loop,
+        including after a restart, until they are applied. Only a deleted message
+        or task completes an entry without an edit.
+        """
+        self._render_requested = True
+        async with self._render_lock:
+            if not self._render_requested:
+                return
+            self._render_requested = False
+            for entry in await get_pending_renders(shards=local_shards(self.bot)):
+                try:
+                    await self._apply_render(entry)
+                except discord.NotFound:
+                    pass  # Message or channel is gone, nothing left to render
+                except discord.HTTPException:
+                    # Outages and rate limit runs end; entries retrying show in bot_queue_depth
+                    delay = RENDER_RETRY_SECONDS * 2 ** min(entry.attempts, 10)
+                    await defer_render(entry, min(delay, RENDER_RETRY_MAX_SECONDS))
+                    continue
+                await complete_render(entry)
+
+    async def _apply_render(self, entry: OutboxEntry):
+        if entry.target == RENDER_BOARD:
+            guild_id, game_acronym = parse_board_ref(entry.ref)
+            await self.update_dashboard(guild_id, game_acronym, self.bot)
+            return
+
+        task = await get_task(int(entry.ref))
+        if not task:
+            return
+        if entry.target == RENDER_CONTROL:
+            await self.update_control_panel(task)
+        elif entry.target == RENDER_HEADER:
+            await self.update_header_message(task)
+
+    @tasks.loop(seconds=30)
+    async def outbox_loop(self):
+        """Retry failed renders and replay anything left pending by a restart."""
+        if not leader.is_leader:
+            return
+        await self.flush_renders()
+
+    @outbox_loop.before_loop
+    async def before_outbox_loop(self):
+        await self.bot.wait_until_ready()
 
     # ============== TASK BOARD ==============
 
@@ -1081,47 +1319,15 @@ class TasksCog(commands.Cog):
     async def task_board(self, interaction: discord.Interaction, game: str, refresh: bool = False):
         await interaction.response.defer()
 
-        game_obj = await get_game_by_acronym(game)
+        game_obj = await get_game_by_acronym(interaction.guild.id, game)
         if not game_obj:
             await interaction.followup.send(f"Game `{game}` not found.")
             return
 
-        tasks = await get_tasks_by_game(game)
-
-        # Group by status
-        by_status = {
-            'todo': [],
-            'progress': [],
-            'review': [],
-            'done': []
-        }
-        for t in tasks:
-            if t.status in by_status:
-                by_status[t.status].append(t)
-
-        # Create embeds
-        embeds = []
-        for status, status_tasks in by_status.items():
-            embed = discord.Embed(
-                title=f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY.get(status, status)}",
-                color=STATUS_COLORS.get(status, discord.Color.greyple())
-            )
-            
-            if status_tasks:
-                desc_lines = []
-                for t in status_tasks[:10]:  # Limit to 10 per status
-                    thread_link = f"<#{t.thread_id}>" if t.thread_id else ""
-                    assignee = f"<@{t.assignee_id}>"
-                    deadline_str = f" (Due: {str(t.deadline)[:10]})" if t.deadline else ""
-                    desc_lines.append(f"**{t.title}** - {assignee}{deadline_str}\n{thread_link}")
-                embed.description = "\n".join(desc_lines)
-            else:
-                embed.description = "*No tasks*"
-            
-            embeds.append(embed)
+        embeds = await self.build_board_embeds(interaction.guild.id, game_obj.acronym)
 
         # Check if board exists
-        existing_board = await get_task_board(game)
+        existing_board = await get_task_board(interaction.guild.id, game_obj.acronym)
         
         if existing_board and not refresh:
             # Try to edit existing messages
@@ -1144,7 +1350,7 @@ class TasksCog(commands.Cog):
             msg = await interaction.channel.send(embed=embed)
             msg_ids.append(msg.id)
 
-        await upsert_task_board(game, interaction.channel.id, json.dumps(msg_ids))
+        await upsert_task_board(interaction.guild.id, game_obj.acronym, interaction.channel.id, json.dumps(msg_ids))
         await interaction.followup.send("Task board created!")
 
     @task_group.command(name="setup", description="Set up a task board channel for a game")
@@ -1162,7 +1368,7 @@ class TasksCog(commands.Cog):
         """Set up or update the task board channel for a game."""
         await interaction.response.defer()
 
-        game_obj = await get_game_by_acronym(game)
+        game_obj = await get_game_by_acronym(interaction.guild.id, game)
         if not game_obj:
             await interaction.followup.send(f"Game `{game}` not found.")
             return
@@ -1170,7 +1376,7 @@ class TasksCog(commands.Cog):
         target_channel = channel or interaction.channel
 
         # Check if board already exists
-        existing_board = await get_task_board(game)
+        existing_board = await get_task_board(interaction.guild.id, game_obj.acronym)
         if existing_board:
             # Delete old board messages if possible
             try:
@@ -1186,20 +1392,6 @@ class TasksCog(commands.Cog):
             except (json.JSONDecodeError, discord.HTTPException):
                 pass
 
-        # Get tasks for this game
-        tasks = await get_tasks_by_game(game)
-
-        # Group by status
-        by_status = {
-            'todo': [],
-            'progress': [],
-            'review': [],
-            'done': []
-        }
-        for t in tasks:
-            if t.status in by_status:
-                by_status[t.status].append(t)
-
         # Create header embed
         header_embed = discord.Embed(
             title=f"\U0001f4cb Task Board: {game_obj.name}",
@@ -1210,91 +1402,74 @@ class TasksCog(commands.Cog):
 
         # Create status embeds
         msg_ids = []
-        for status in ['todo', 'progress', 'review', 'done']:
-            embed = discord.Embed(
-                title=f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY.get(status, status)}",
-                color=STATUS_COLORS.get(status, discord.Color.greyple())
-            )
-            
-            status_tasks = by_status[status]
-            if status_tasks:
-                desc_lines = []
-                for t in status_tasks[:10]:
-                    thread_link = f"<#{t.thread_id}>" if t.thread_id else ""
-                    assignee = f"<@{t.assignee_id}>"
-                    priority_str = f" [{t.priority}]" if t.priority else ""
-                    deadline_str = f" (Due: {str(t.deadline)[:10]})" if t.deadline else ""
-                    desc_lines.append(f"**{t.title}**{priority_str} - {assignee}{deadline_str}\n{thread_link}")
-                embed.description = "\n".join(desc_lines)
-            else:
-                embed.description = "*No tasks*"
-            
+        for embed in await self.build_board_embeds(interaction.guild.id, game_obj.acronym):
             msg = await target_channel.send(embed=embed)
             msg_ids.append(msg.id)
 
-        await upsert_task_board(game, target_channel.id, json.dumps(msg_ids))
+        await upsert_task_board(interaction.guild.id, game_obj.acronym, target_channel.id, json.dumps(msg_ids))
         await interaction.followup.send(f"Task board set up in {target_channel.mention}!")
 
-    async def update_dashboard(self, game_acronym: str, bot: commands.Bot):
-        """Update the dashboard for a game."""
-        board = await get_task_board(game_acronym)
-        if not board:
-            return
+    async def update_dashboard(self, guild_id: int, game_acronym: str, bot: commands.Bot):
+        """Update the dashboard for a game.
 
-        guild = bot.get_guild(int(GUILD_ID)) if GUILD_ID else None
+        Raises discord.HTTPException (other than NotFound) so the outbox worker can retry.
+        """
+        guild = bot.get_guild(guild_id)
         if not guild:
             return
 
+        board = await get_task_board(guild_id, game_acronym)
+        if not board:
+            return
+
         channel = guild.get_channel(board.channel_id)
         if not channel:
             return
 
-        tasks = await get_tasks_by_game(game_acronym)
-
-        # Group by status
-        by_status = {
-            'todo': [],
-            'progress': [],
-            'review': [],
-            'done': []
-        }
-        for t in tasks:
-            if t.status in by_status:
-                by_status[t.status].append(t)
+        embeds = await self.build_board_embeds(guild_id, game_acronym)
 
         # Update embeds
         try:
             msg_ids = json.loads(board.message_ids)
-            statuses = ['todo', 'progress', 'review', 'done']
-            
-            for i, status in enumerate(statuses):
-                if i >= len(msg_ids):
-                    break
-                    
-                embed = discord.Embed(
-                    title=f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY.get(status, status)}",
-                    color=STATUS_COLORS.get(status, discord.Color.greyple())
-                )
-                
-                status_tasks = by_status[status]
-                if status_tasks:
-                    desc_lines = []
-                    for t in status_tasks[:10]:
-                        thread_link = f"<#{t.thread_id}>" if t.thread_id else ""
-                        assignee = f"<@{t.assignee_id}>"
-                        deadline_str = f" (Due: {str(t.deadline)[:10]})" if t.deadline else ""
-                        desc_lines.append(f"**{t.title}** - {assignee}{deadline_str}\n{thread_link}")
-                    embed.description = "\n".join(desc_lines)
-                else:
-                    embed.description = "*No tasks*"
+        except json.JSONDecodeError:
+            return
 
-                try:
-                    msg = await channel.fetch_message(msg_ids[i])
-                    await msg.edit(embed=embed)
-                except discord.NotFound:
-                    pass
-        except (json.JSONDecodeError, discord.HTTPException):
-            pass
+        for msg_id, embed in zip(msg_ids, embeds):
+            try:
+                await channel.get_partial_message(msg_id).edit(embed=embed)
+            except discord.NotFound:
+                pass
+
+    async def build_board_embeds(self, guild_id: int, game_acronym: str) -> List[discord.Embed]:
+        """One embed per board column, built from the materialized counts and the newest tasks."""
+        counts = await get_game_task_counts(guild_id, game_acronym)
+        board_tasks = await get_board_tasks(guild_id, game_acronym, BOARD_STATUSES, BOARD_TASKS_PER_STATUS)
+
+        embeds = []
+        for status in BOARD_STATUSES:
+            total = counts.get(status, 0)
+            embed = discord.Embed(
+                title=f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY.get(status, status)} ({total})",
+                color=STATUS_COLORS.get(status, discord.Color.greyple())
+            )
+
+            status_tasks = board_tasks[status]
+            if status_tasks:
+                desc_lines = []
+                for t in status_tasks:
+                    thread_link = f"<#{t.thread_id}>" if t.thread_id else ""
+                    assignee = f"<@{t.assignee_id}>"
+                    priority_str = f" [{t.priority}]" if t.priority else ""
+                    deadline_str = f" (Due: {str(t.deadline)[:10]})" if t.deadline else ""
+                    desc_lines.append(f"**{t.title}**{priority_str} - {assignee}{deadline_str}\n{thread_link}")
+                if total > len(status_tasks):
+                    desc_lines.append(f"*+{total - len(status_tasks)} more*")
+                embed.description = "\n".join(desc_lines)
+            else:
+                embed.description = "*No tasks*"
+
+            embeds.append(embed)
+        return embeds
 
     # ============== TASK LIST ==============
 
@@ -1302,7 +1477,7 @@ class TasksCog(commands.Cog):
     @app_commands.describe(user="User to list tasks for (defaults to you)")
     async def task_list(self, interaction: discord.Interaction, user: discord.Member = None):
         target = user or interaction.user
-        tasks = await get_tasks_by_assignee_multi(target.id)
+        tasks = await get_tasks_by_assignee_multi(interaction.guild.id, target.id)
 
         if not tasks:
             await interaction.response.send_message(
@@ -1337,13 +1512,11 @@ class TasksCog(commands.Cog):
     async def task_delete(self, interaction: discord.Interaction, task_id: int):
         await interaction.response.defer(ephemeral=True)
 
-        task = await get_task(task_id)
+        task = await get_task(task_id, interaction.guild.id)
         if not task:
             await interaction.followup.send(f"Task #{task_id} not found.")
             return
 
-        game_acronym = task.game_acronym
-
         # Delete thread if exists
         if task.thread_id:
             try:
@@ -1365,9 +1538,10 @@ class TasksCog(commands.Cog):
 
         # Delete from database
         await delete_task(task_id)
+        permissions.invalidate_task(task_id)
 
         # Update dashboard
-        await self.update_dashboard(game_acronym, self.bot)
+        await self.flush_renders()
 
         await interaction.followup.send(f"Task #{task_id} ({task.title}) deleted.")
 
@@ -1386,52 +1560,59 @@ class TasksCog(commands.Cog):
                 await interaction.followup.send("Run inside a task thread or provide task_id.")
                 return
         else:
-            task = await get_task(task_id)
+            task = await get_task(task_id, interaction.guild.id)
             if not task:
                 await interaction.followup.send(f"Task #{task_id} not found.")
                 return
 
-        if task.status in ('done', 'cancelled'):
-            await interaction.followup.send("Task already completed or cancelled.")
+        async with self.task_lock(task.id):
+            # Re-read under the lock so we act on the latest status and version
+            task = await get_task(task.id)
+            error = await self._close_task(interaction, task)
+        # Followups wait until the lock is released so no REST call runs under it
+        if error:
+            await interaction.followup.send(error)
             return
 
-        is_assignee = await is_user_task_assignee(task.id, interaction.user.id)
-        is_lead = interaction.user.guild_permissions.administrator or any(
-            'lead' in r.name.lower() or 'admin' in r.name.lower()
-            for r in interaction.user.roles
-        )
+        await self.flush_renders()
 
-        if not is_assignee and not is_lead:
-            await interaction.followup.send("Only assignees or leads can close tasks.")
-            return
+        if task.thread_id:
+            thread = interaction.guild.get_channel(task.thread_id)
+            if thread and isinstance(thread, discord.Thread):
+                try:
+                    await thread.edit(archived=True, locked=True)
+                except discord.HTTPException:
+                    pass
+
+        await interaction.followup.send(f"Task #{task.id} ({task.title}) closed!")
+
+    async def _close_task(self, interaction: discord.Interaction, task: Task) -> Optional[str]:
+        """Record the caller's approval and close the task if it is enough. Returns the reply if it stays open."""
+        if task.status in ('done', 'cancelled'):
+            return "Task already completed or cancelled."
+
+        access = await permissions.access(interaction.user, task.id)
+        settings = await get_guild_settings(interaction.guild.id)
+
+        if not access.allowed:
+            return "Only assignees or leads can close tasks."
 
         approval_status = await get_task_approval_status(task.id)
 
-        if is_lead:
+        if access.is_lead:
             pass
         elif approval_status['primary'] and approval_status['primary'].user_id == interaction.user.id:
             pass
         elif approval_status['primary']:
-            await interaction.followup.send(
-                f"Only the primary owner (<@{approval_status['primary'].user_id}>) can close this task."
-            )
-            return
+            return f"Only the primary owner (<@{approval_status['primary'].user_id}>) can close this task."
         else:
             await set_task_assignee_approval(task.id, interaction.user.id, True)
             approval_status = await get_task_approval_status(task.id)
 
-            config = await get_server_config(interaction.guild.id)
-            approval_mode = 'auto'
-            if config and config.config_json:
-                try:
-                    cfg = json.loads(config.config_json)
-                    approval_mode = cfg.get('approval_mode', 'auto')
-                except json.JSONDecodeError:
-                    pass
-
+            approval_mode = settings.approval_mode
             total = approval_status['total']
             approved = approval_status['approved']
-            
+
             if approval_mode == 'any':
                 required = 1
             elif approval_mode == 'all':
@@ -1444,29 +1625,12 @@ class TasksCog(commands.Cog):
                 required = (total // 2) + 1
 
             if approved < required:
-                await interaction.followup.send(
-                    f"Approval recorded! ({approved}/{required} needed to close)"
-                )
-                return
-
-        old_status = task.status
-        await update_task_status(task.id, 'done')
-        await add_task_history(task.id, interaction.user.id, 'status_change', old_status, 'done')
+                return f"Approval recorded! ({approved}/{required} needed to close)"
 
-        task.status = 'done'
-        await self.update_control_panel(interaction, task)
-        await self.update_header_message(interaction, task)
-        await self.update_dashboard(task.game_acronym, self.bot)
-
-        if task.thread_id:
-            thread = interaction.guild.get_channel(task.thread_id)
-            if thread and isinstance(thread, discord.Thread):
-                try:
-                    await thread.edit(archived=True, locked=True)
-                except discord.HTTPException:
-                    pass
-
-        await interaction.followup.send(f"Task #{task.id} ({task.title}) closed!")
+        if not await update_task_status(task.id, 'done', actor_id=interaction.user.id,
+                                        expected_version=task.version):
+            return CONFLICT_MESSAGE
+        return None
 
     @task_group.command(name="manage", description="List all tasks for a game with management options")
     @app_commands.describe(game="Game acronym")
@@ -1474,14 +1638,14 @@ class TasksCog(commands.Cog):
     async def task_manage(self, interaction: discord.Interaction, game: str):
         await interaction.response.defer(ephemeral=True)
 
-        game_obj = await get_game_by_acronym(game)
+        game_obj = await get_game_by_acronym(interaction.guild.id, game)
         if not game_obj:
             await interaction.followup.send(f"Game `{game}` not found.")
             return
 
-        tasks = await get_tasks_by_game(game)
+        counts = await get_game_task_counts(interaction.guild.id, game_obj.acronym)
 
-        if not tasks:
+        if not counts:
             await interaction.followup.send(f"No tasks for {game_obj.name}.")
             return
 
@@ -1492,29 +1656,22 @@ class TasksCog(commands.Cog):
             color=discord.Color.blue()
         )
 
-        # Group by status
-        by_status = {}
-        for t in tasks:
-            if t.status not in by_status:
-                by_status[t.status] = []
-            by_status[t.status].append(t)
+        statuses = [status for status in STATUS_DISPLAY if counts.get(status)]
+        by_status = await get_board_tasks(interaction.guild.id, game_obj.acronym, statuses, 8)
 
-        for status in ['todo', 'progress', 'review', 'done', 'cancelled']:
-            if status not in by_status:
-                continue
-            
-            status_tasks = by_status[status]
+        for status in statuses:
+            total = counts[status]
             lines = []
-            for t in status_tasks[:8]:
+            for t in by_status[status]:
                 assignee = f"<@{t.assignee_id}>"
                 priority = f" [{t.priority}]" if t.priority else ""
                 lines.append(f"`#{t.id}` **{t.title}**{priority} - {assignee}")
             
-            if len(status_tasks) > 8:
-                lines.append(f"*... and {len(status_tasks) - 8} more*")
+            if total > 8:
+                lines.append(f"*... and {total - 8} more*")
             
             embed.add_field(
-                name=f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY.get(status, status)} ({len(status_tasks)})",
+                name=f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY.get(status, status)} ({total})",
                 value="\n".join(lines) or "*None*",
                 inline=False
             )
@@ -1523,7 +1680,7 @@ class TasksCog(commands.Cog):
 
     @task_manage.autocomplete("game")
     async def task_manage_autocomplete(self, interaction: discord.Interaction, current: str):
-        games = await get_all_games()
+        games = await get_all_games(interaction.guild.id)
         return [
             app_commands.Choice(name=f"{g.acronym} - {g.name}", value=g.acronym)
             for g in games
@@ -1532,211 +1689,497 @@ class TasksCog(commands.Cog):
 
     # ============== TASK IMPORT ==============
 
-    @task_group.command(name="import", description="Import tasks from JSON or XML file")
-    @app_commands.describe(file="JSON or XML file with tasks")
+    @task_group.command(name="import", description="Import tasks from JSON, NDJSON, CSV or XML file")
+    @app_commands.describe(file="JSON, NDJSON, CSV or XML file with tasks")
     @app_commands.checks.has_permissions(administrator=True)
     async def task_import(self, interaction: discord.Interaction, file: discord.Attachment):
         await interaction.response.defer()
 
-        if not file.filename.endswith(('.json', '.xml')):
-            await interaction.followup.send("File must be .json or .xml")
+        if not file.filename.endswith(IMPORT_EXTENSIONS):
+            await interaction.followup.send("File must be .json, .ndjson, .csv or .xml")
             return
 
-        content = await file.read()
-        content = content.decode('utf-8')
+        # A retry after a crash would post the tasks created so far a second time
+        try:
+            job_id = await enqueue(
+                JOB_TASK_IMPORT, interaction.guild.id,
+                {'url': file.url, 'filename': file.filename, 'channel_id': interaction.channel_id},
+                priority=JOB_PRIORITY_HIGH, max_attempts=1, throttle=True
+            )
+        except ValueError as e:
+            await interaction.followup.send(str(e))
+            return
+        if job_id is None:
+            await interaction.followup.send("This file is already queued for import.")
+            return
+        await interaction.followup.send(f"Import queued (job #{job_id}). Progress will be posted in this channel.")
 
-        tasks_data = []
+    async def run_import_job(self, job: Job):
+        """Import a queued task file, reporting progress in the channel it was uploaded to."""
+        guild = self.bot.get_guild(job.guild_id)
+        channel = guild and guild.get_channel_or_thread(job.payload['channel_id'])
+        if not channel:
+            return
 
+        # Stream the attachment to a spooled file, then parse it off the event loop a
+        # batch at a time, validating each batch before the next is parsed
+        filename = job.payload['filename']
+        games = await get_all_games(guild.id)
+        plan, errors, channel_games = [], [], {}
         try:
-            if file.filename.endswith('.json'):
-                tasks_data = json.loads(content)
-                # Handle double-encoded JSON (string containing JSON)
-                if isinstance(tasks_data, str):
-                    tasks_data = json.loads(tasks_data)
-                # Validate it's a list
-                if not isinstance(tasks_data, list):
-                    await interaction.followup.send("JSON must be an array of task objects")
-                    return
-            else:
-                root = ET.fromstring(content)
-                for task_elem in root.findall('task'):
-                    task_dict = {
-                        'title': task_elem.findtext('title', ''),
-                        'description': task_elem.findtext('description', ''),
-                        'assignee_id': task_elem.findtext('assignee_id', ''),
-                        'target_channel_id': task_elem.findtext('target_channel_id', ''),
-                        'deadline': task_elem.findtext('deadline'),
-                        'priority': task_elem.findtext('priority')
-                    }
-                    tasks_data.append(task_dict)
-        except (json.JSONDecodeError, ET.ParseError) as e:
-            await interaction.followup.send(f"Parse error: {e}")
+            with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as fp:
+                await self._download_attachment(job.payload['url'], fp)
+                fp.seek(0)
+                rows = read_task_rows(fp, filename)
+                start = 0
+                while batch := await asyncio.to_thread(list, itertools.islice(rows, IMPORT_PARSE_BATCH)):
+                    self._plan_import(guild, batch, games, plan, errors, channel_games, start)
+                    start += len(batch)
+        except aiohttp.ClientError as e:
+            await channel.send(f"Could not download `{filename}`: {e}")
+            return
+        except (ValueError, ET.ParseError) as e:
+            await channel.send(f"Parse error in `{filename}`: {e}")
             return
 
-        # Validate and create tasks
-        created = 0
-        errors = []
+        # Rows exported from this server keep their ID; re-importing them must not duplicate tasks
+        exported_ids = [entry[1]['id'] for entry in plan if entry[1].get('id') is not None]
+        existing = await get_existing_task_ids(guild.id, exported_ids) if exported_ids else set()
+        skipped = len([entry for entry in plan if entry[1].get('id') in existing])
+        if skipped:
+            plan = [entry for entry in plan if entry[1].get('id') not in existing]
+
+        total = len(plan)
+        progress = {'done': 0, 'created': 0}
+        status_msg = await channel.send(f"Importing {total} tasks from `{filename}`...")
+
+        by_channel = {}
+        for entry in plan:
+            by_channel.setdefault(entry[2].id, []).append(entry)
+        semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+
+        async def import_channel(entries):
+            # Tasks for one channel are posted in file order; channels run in parallel
+            for i, td, target, team, game, deadline_ts in entries:
+                async with semaphore:
+                    try:
+                        await self._import_task(td, target, team, game, deadline_ts)
+                        progress['created'] += 1
+                    except Exception as e:
+                        errors.append(f"Task {i+1}: {str(e)}")
+                progress['done'] += 1
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(IMPORT_PROGRESS_SECONDS)
+                try:
+                    await status_msg.edit(content=f"Importing tasks... {progress['done']}/{total}")
+                except discord.HTTPException:
+                    pass
 
-        for i, td in enumerate(tasks_data):
-            try:
-                # Validate required fields
-                if not td.get('title'):
-                    errors.append(f"Task {i+1}: missing title")
-                    continue
-                if not td.get('assignee_id'):
-                    errors.append(f"Task {i+1}: missing assignee_id")
-                    continue
-                if not td.get('target_channel_id'):
-                    errors.append(f"Task {i+1}: missing target_channel_id")
-                    continue
+        reporter = asyncio.create_task(report_progress())
+        try:
+            await asyncio.gather(*(import_channel(entries) for entries in by_channel.values()))
+        finally:
+            reporter.cancel()
+
+        # Only the boards of games that received tasks were queued for a render
+        await self.flush_renders()
+
+        result = f"Imported {progress['created']} tasks."
+        if skipped:
+            result += f"\nSkipped {skipped} tasks that already exist in this server."
+        if errors:
+            result += f"\n\nErrors ({len(errors)}):\n" + "\n".join(errors[:10])
+            if len(errors) > 10:
+                result += f"\n... and {len(errors) - 10} more"
 
+        try:
+            await status_msg.edit(content=result)
+        except discord.HTTPException:
+            await channel.send(result)
+
+    async def _download_attachment(self, url: str, fp):
+        """Copy an attachment into a file object chunk by chunk."""
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(IMPORT_CHUNK_BYTES):
+                    fp.write(chunk)
+
+    def _plan_import(self, guild: discord.Guild, tasks_data: list, games: list, plan: list, errors: list,
+                     channel_games: dict, start: int = 0):
+        """Validate a batch of imported rows against the cached guild state.
+
+        Appends to plan entries (index, row, channel, team, game, deadline_ts) with
+        the primary assignee first in team, and to errors. channel_games caches the
+        game detected for each channel across batches; start is the batch's first row index.
+        """
+        for i, td in enumerate(tasks_data, start):
+            if not isinstance(td, dict):
+                errors.append(f"Task {i+1}: not a task object")
+                continue
+            # Validate required fields
+            if not td.get('title'):
+                errors.append(f"Task {i+1}: missing title")
+                continue
+            if not td.get('assignee_id'):
+                errors.append(f"Task {i+1}: missing assignee_id")
+                continue
+            if not td.get('target_channel_id'):
+                errors.append(f"Task {i+1}: missing target_channel_id")
+                continue
+
+            try:
                 assignee_id = int(td['assignee_id'])
                 target_channel_id = int(td['target_channel_id'])
+            except (ValueError, TypeError):
+                errors.append(f"Task {i+1}: invalid assignee_id or target_channel_id")
+                continue
 
-                # Verify channel exists
-                channel = interaction.guild.get_channel(target_channel_id)
-                if not channel:
-                    errors.append(f"Task {i+1}: channel {target_channel_id} not found")
-                    continue
+            channel = guild.get_channel(target_channel_id)
+            if not channel:
+                errors.append(f"Task {i+1}: channel {target_channel_id} not found")
+                continue
+
+            member = guild.get_member(assignee_id)
+            if not member:
+                errors.append(f"Task {i+1}: member {assignee_id} not found")
+                continue
 
-                # Verify member exists
-                member = interaction.guild.get_member(assignee_id)
-                if not member:
-                    errors.append(f"Task {i+1}: member {assignee_id} not found")
+            # Detect game from channel, once per channel
+            if target_channel_id not in channel_games:
+                channel_games[target_channel_id] = next(
+                    (g for g in games if g.acronym.lower() in channel.name.lower()), None
+                )
+            game = channel_games[target_channel_id]
+            if not game:
+                errors.append(f"Task {i+1}: could not detect game from channel")
+                continue
+
+            team = [member]
+            additional_ids = td.get('additional_assignees') or []
+            if isinstance(additional_ids, str):
+                additional_ids = [x.strip() for x in additional_ids.split(',') if x.strip()]
+            for add_id in additional_ids:
+                try:
+                    add_member = guild.get_member(int(add_id))
+                except (ValueError, TypeError):
                     continue
+                if add_member and add_member not in team:
+                    team.append(add_member)
+
+            # Parsed once here; unparseable deadlines would never trigger reminders
+            deadline_ts = parse_deadline(td.get('deadline'))
+            if td.get('deadline') and deadline_ts is None:
+                errors.append(f"Task {i+1}: unrecognized deadline {td['deadline']!r}")
+                continue
 
-                # Detect game from channel
-                games = await get_all_games()
-                game_acronym = None
-                for g in games:
-                    if g.acronym.lower() in channel.name.lower():
-                        game_acronym = g.acronym
-                        break
-                
-                if not game_acronym:
-                    errors.append(f"Task {i+1}: could not detect game from channel")
+            # Exports carry status, eta and id so they can be imported back as they were
+            if td.get('status') and td['status'] not in STATUS_DISPLAY:
+                errors.append(f"Task {i+1}: unknown status {td['status']!r}")
+                continue
+            if td.get('id') is not None:
+                try:
+                    td['id'] = int(td['id'])
+                except (ValueError, TypeError):
+                    errors.append(f"Task {i+1}: invalid id {td['id']!r}")
                     continue
 
-                # Create task
-                task = await create_task(
-                    game_acronym=game_acronym,
-                    title=td['title'],
-                    description=td.get('description', ''),
-                    assignee_id=assignee_id,
-                    target_channel_id=target_channel_id,
-                    deadline=td.get('deadline'),
-                    priority=td.get('priority')
+            plan.append((i, td, channel, team, game, deadline_ts))
+
+    async def _import_task(self, td: dict, channel: discord.TextChannel, team: list, game, deadline_ts: Optional[int]):
+        task = await create_task(
+            guild_id=game.guild_id,
+            game_acronym=game.acronym,
+            title=td['title'],
+            description=td.get('description', ''),
+            assignee_id=team[0].id,
+            target_channel_id=channel.id,
+            deadline=td.get('deadline'),
+            priority=td.get('priority'),
+            deadline_ts=deadline_ts,
+            status=td.get('status') or 'todo',
+            eta=td.get('eta')
+        )
+
+        await add_task_assignee(task.id, team[0].id, is_primary=True)
+        for member in team[1:]:
+            await add_task_assignee(task.id, member.id, is_primary=False)
+
+        closed = task.status in ('done', 'cancelled')
+        thread = await self.publish_task(task, channel, team, game.name, notify=not closed)
+        if closed:
+            # Closed tasks come back the way closing leaves them
+            await thread.edit(archived=True, locked=True)
+
+    # ============== TASK STATS ==============
+
+    @task_group.command(name="stats", description="Lead time, time in status, throughput and team load")
+    @app_commands.describe(
+        game="Only tasks for this game",
+        period="Time window (default: last 30 days)"
+    )
+    @app_commands.choices(period=[
+        app_commands.Choice(name="Last 7 days", value="7d"),
+        app_commands.Choice(name="Last 30 days", value="30d"),
+        app_commands.Choice(name="Last 90 days", value="90d"),
+        app_commands.Choice(name="Last year", value="1y"),
+        app_commands.Choice(name="All time", value="all"),
+    ])
+    async def task_stats(self, interaction: discord.Interaction, game: str = None, period: str = '30d'):
+        await interaction.response.defer(ephemeral=True)
+
+        game_name = "All games"
+        if game:
+            game_obj = await get_game_by_acronym(interaction.guild.id, game)
+            if not game_obj:
+                await interaction.followup.send(f"Game `{game}` not found.")
+                return
+            game = game_obj.acronym
+            game_name = game_obj.name
+
+        # Fold in status changes since the last rollup (usually under an hour's worth)
+        await refresh_task_stats()
+
+        days = STATS_PERIODS.get(period, 30)
+        since_day = int(time.time()) // 86400 - days + 1 if days else 0
+        stats = await get_task_stats(interaction.guild.id, game, since_day)
+        load = await get_assignee_load(interaction.guild.id, game)
+
+        embed = self.create_stats_embed(game_name, days, stats, load)
+        await interaction.followup.send(embed=embed)
+
+    def create_stats_embed(self, game_name: str, days: Optional[int], stats: dict, load: list) -> discord.Embed:
+        embed = discord.Embed(
+            title=f"\U0001f4ca Task Stats: {game_name}",
+            description=f"Last {days} days" if days else "All time",
+            color=discord.Color.blue()
+        )
+
+        def percentile(counts, q):
+            bound = histogram_percentile(counts, STATS_BUCKETS, q)
+            return f"\u2264 {format_duration(bound)}" if bound else f"> {format_duration(STATS_BUCKETS[-1])}"
+
+        histograms = stats['histograms']
+        lead = histograms.get('lead')
+        if lead:
+            done = sum(lead)
+            embed.add_field(
+                name="Lead Time (created \u2192 done)",
+                value=f"{done} done \u00b7 median {percentile(lead, 0.5)} \u00b7 p90 {percentile(lead, 0.9)}"
+                      f" \u00b7 avg {format_duration(stats['seconds']['lead'] / done)}",
+                inline=False
+            )
+
+        lines = []
+        for status in ('todo', 'progress', 'review'):
+            counts = histograms.get(status)
+            if counts:
+                lines.append(
+                    f"{STATUS_EMOJI.get(status, '')} {STATUS_DISPLAY[status]}: median {percentile(counts, 0.5)}"
+                    f" \u00b7 p90 {percentile(counts, 0.9)} ({sum(counts)} exits)"
                 )
+        embed.add_field(name="Time in Status", value="\n".join(lines) or "*No status changes*", inline=False)
 
-                # Get game name for embed
-                game_obj = await get_game_by_acronym(game_acronym)
-                game_name = game_obj.name if game_obj else game_acronym
-
-                # Create header message with detailed embed and buttons
-                header_embed = self.create_header_embed(task, member, game_name)
-                header_view = HeaderView(task.id, self)
-                header_msg = await channel.send(embed=header_embed, view=header_view)
-                
-                # Create thread
-                thread = await header_msg.create_thread(name=f"Task: {task.title[:50]}")
-
-                # Create control panel in thread
-                control_embed = self.create_control_embed(task, member, game_name)
-                view = TaskView(task.id, self)
-                control_msg = await thread.send(embed=control_embed, view=view)
-
-                # Update task with thread/message IDs
-                await update_task_thread(task.id, thread.id, control_msg.id)
-                await update_task_header_message(task.id, header_msg.id)
-                
-                # Add primary assignee to task_assignees table
-                await add_task_assignee(task.id, assignee_id, is_primary=True)
-                
-                # Handle additional assignees if provided
-                additional_ids = td.get('additional_assignees', [])
-                if isinstance(additional_ids, str):
-                    additional_ids = [x.strip() for x in additional_ids.split(',') if x.strip()]
-                for add_id in additional_ids:
-                    try:
-                        add_member = interaction.guild.get_member(int(add_id))
-                        if add_member:
-                            await add_task_assignee(task.id, int(add_id), is_primary=False)
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Update task object and refresh header with thread link
-                task.thread_id = thread.id
-                task.header_message_id = header_msg.id
-                header_embed = self.create_header_embed(task, member, game_name)
-                await header_msg.edit(embed=header_embed, view=header_view)
-
-                # Notify assignee
-                await thread.send(f"{member.mention} You have been assigned this task!")
-
-                created += 1
-
-            except Exception as e:
-                errors.append(f"Task {i+1}: {str(e)}")
-
-        # Update dashboards
-        games = await get_all_games()
-        for g in games:
-            await self.update_dashboard(g.acronym, self.bot)
-
-        result = f"Imported {created} tasks."
-        if errors:
-            result += f"\n\nErrors ({len(errors)}):\n" + "\n".join(errors[:10])
-            if len(errors) > 10:
-                result += f"\n... and {len(errors) - 10} more"
+        weekly = stats['weekly'][-8:]
+        embed.add_field(
+            name="Throughput (done per week)",
+            value="\n".join(
+                f"`{time.strftime('%Y-%m-%d', time.gmtime(week_start))}` {n}" for week_start, n in weekly
+            ) or "*Nothing completed*",
+            inline=True
+        )
+
+        embed.add_field(
+            name="Open Load",
+            value="\n".join(
+                f"<@{user_id}>: {open_count} open ({in_progress} in progress, {in_review} in review)"
+                for user_id, open_count, in_progress, in_review in load
+            ) or "*No open tasks*",
+            inline=True
+        )
+
+        embed.set_footer(text="Durations are bucketed; percentiles show the bucket's upper bound")
+        return embed
+
+    # ============== TASK SEARCH ==============
+
+    @task_group.command(name="search", description="Search tasks by title, description and ETA notes")
+    @app_commands.describe(
+        query="Words to search for (the last word may be partial)",
+        game="Only tasks for this game",
+        status="Only tasks with this status",
+        archived="Also search archived tasks"
+    )
+    @app_commands.choices(
+        status=[app_commands.Choice(name=name, value=value) for value, name in STATUS_DISPLAY.items()]
+    )
+    async def task_search(self, interaction: discord.Interaction, query: str, game: str = None, status: str = None,
+                          archived: bool = False):
+        await interaction.response.defer(ephemeral=True)
+
+        view = SearchResultsView(self, interaction.guild.id, query, game, status, include_archive=archived)
+        embed = await view.render()
+        if embed is None:
+            await interaction.followup.send(f"No tasks match `{query}`.")
+            return
 
-        await interaction.followup.send(result)
+        await interaction.followup.send(embed=embed, view=view)
+
+    def create_search_embed(self, query: str, tasks: List[Task], page: int) -> discord.Embed:
+        embed = discord.Embed(
+            title=f"Search: {query[:200]}",
+            color=discord.Color.blurple()
+        )
+
+        lines = []
+        for t in tasks:
+            status = t.status or 'todo'
+            priority = f" [{t.priority}]" if t.priority else ""
+            thread = f" - <#{t.thread_id}>" if t.thread_id else ""
+            lines.append(
+                f"`#{t.id}` {STATUS_EMOJI.get(status, '')} **{t.title}**{priority} "
+                f"({t.game_acronym}){thread}"
+            )
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {page + 1}")
+        return embed
+
+    # ============== TASK EXPORT ==============
+
+    @task_group.command(name="export", description="Export tasks as JSON, NDJSON or CSV")
+    @app_commands.describe(
+        game="Only tasks for this game",
+        status="Only tasks with this status",
+        format="File format (all formats can be re-imported with /task import)",
+        history="Include each task's history",
+        archived="Also export archived tasks"
+    )
+    @app_commands.choices(
+        status=[app_commands.Choice(name=name, value=value) for value, name in STATUS_DISPLAY.items()],
+        format=[app_commands.Choice(name=fmt.upper(), value=fmt) for fmt in EXPORT_FORMATS]
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def task_export(
+        self,
+        interaction: discord.Interaction,
+        game: str = None,
+        status: str = None,
+        format: str = 'json',
+        history: bool = False,
+        archived: bool = False
+    ):
+        await interaction.response.defer()
+
+        if game:
+            game_obj = await get_game_by_acronym(interaction.guild.id, game)
+            if not game_obj:
+                await interaction.followup.send(f"Game `{game}` not found.")
+                return
+            game = game_obj.acronym
+
+        # Rows stream from SQLite into a spooled file; only large exports touch disk
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as fp:
+            rows = iter_task_export_rows(
+                interaction.guild.id, game, status, include_history=history, include_archive=archived
+            )
+            count = await write_task_export(rows, fp, format, include_history=history)
+            size = fp.tell()
+
+            if not count:
+                await interaction.followup.send("No tasks match these filters.")
+                return
+            if size > interaction.guild.filesize_limit:
+                await interaction.followup.send(
+                    f"Export is {size // 1024} KB, over this server's upload limit. "
+                    "Narrow it down with `game` or `status`."
+                )
+                return
+
+            fp.seek(0)
+            filename = f"tasks-{(game or 'all').lower()}.{format}"
+            await interaction.followup.send(
+                f"Exported {count} tasks.",
+                file=discord.File(fp, filename=filename)
+            )
 
     # ============== BACKGROUND TASKS ==============
 
     @tasks.loop(hours=1)
     async def reminder_loop(self):
-        """Check for upcoming deadlines and stagnant tasks."""
-        if not GUILD_ID:
+        """Check every guild for upcoming deadlines and stagnant tasks."""
+        if not leader.is_leader:
             return
+        # Keep the stats rollup warm so /task stats only folds in recent changes
+        await refresh_task_stats()
 
-        guild = self.bot.get_guild(int(GUILD_ID))
-        if not guild:
+        guilds = list(self.bot.guilds)
+        if not guilds:
             return
 
-        due_soon = await get_tasks_due_soon(24)
-        for task in due_soon:
-            if task.thread_id:
-                thread = guild.get_channel(task.thread_id)
-                if thread:
-                    try:
-                        assignees = await get_task_assignees(task.id)
-                        mentions = ' '.join(f"<@{a.user_id}>" for a in assignees) if assignees else f"<@{task.assignee_id}>"
-                        await thread.send(f"\u26a0\ufe0f {mentions} This task is due within 24 hours!")
-                    except discord.HTTPException:
-                        pass
-
-        stagnant = await get_stagnant_tasks(3)
-        for task in stagnant:
-            if task.thread_id:
-                thread = guild.get_channel(task.thread_id)
-                if thread:
-                    try:
-                        assignees = await get_task_assignees(task.id)
-                        mentions = ' '.join(f"<@{a.user_id}>" for a in assignees) if assignees else f"<@{task.assignee_id}>"
-                        await thread.send(f"\U0001f4ac {mentions} Update request: How is this task going?")
-                    except discord.HTTPException:
-                        pass
+        # Each run starts one guild further along and sends at most
+        # REMINDERS_PER_GUILD of each kind per guild, so a guild with a large
+        # backlog cannot starve the rest
+        start = self._reminder_offset % len(guilds)
+        self._reminder_offset = start + 1
+        for guild in guilds[start:] + guilds[:start]:
+            # One attempt: a retry would ping the reminders that already went out.
+            # The next run catches anything missed
+            await enqueue(
+                JOB_REMINDERS, guild.id, {'limit': REMINDERS_PER_GUILD},
+                priority=JOB_PRIORITY_LOW, max_attempts=1
+            )
 
     @reminder_loop.before_loop
     async def before_reminder_loop(self):
         await self.bot.wait_until_ready()
 
+    @tasks.loop(hours=24)
+    async def archive_loop(self):
+        """Archive long-closed tasks, then return the freed pages to the filesystem."""
+        if not (runs_shard_zero(self.bot) and leader.is_leader):
+            return
+        if ARCHIVE_AFTER_DAYS > 0:
+            archived = await archive_closed_tasks(ARCHIVE_AFTER_DAYS)
+            if archived:
+                print(f"Archived {archived} closed tasks")
+                await self.flush_renders()
+
+        # Small steps keep each write lock short; yield to other work in between
+        while await incremental_vacuum():
+            await asyncio.sleep(0.1)
+
+    @archive_loop.before_loop
+    async def before_archive_loop(self):
+        await self.bot.wait_until_ready()
+
+    # ============== PERMISSION CACHE ==============
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        permissions.invalidate_roles(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        permissions.invalidate_roles(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name or before.permissions != after.permissions:
+            permissions.invalidate_roles(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            permissions.invalidate_member(after.guild.id, after.id)
+
     # ============== THREAD MONITOR ==============
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         """Monitor messages in task threads."""
-        if message.author.bot:
+        if message.author.bot or not leader.is_leader:
             return
 
         if not isinstance(message.channel, discord.Thread):
@@ -1746,14 +2189,7 @@ class TasksCog(commands.Cog):
         if not task:
             return
 
-        is_assignee = await is_user_task_assignee(task.id, message.author.id)
-        is_lead = message.author.guild_permissions.administrator
-        
-        if not is_lead:
-            lead_roles = [r for r in message.author.roles if 'lead' in r.name.lower() or 'admin' in r.name.lower()]
-            is_lead = len(lead_roles) > 0
-
-        if not is_assignee and not is_lead:
+        if not (await permissions.access(message.author, task.id)).allowed:
             try:
                 await message.reply(
                     "Only the assignee and leads can discuss in this task thread.",
@@ -1766,14 +2202,25 @@ class TasksCog(commands.Cog):
     @task_new.autocomplete("game")
     @task_board.autocomplete("game")
     @task_setup.autocomplete("game")
+    @task_export.autocomplete("game")
+    @task_search.autocomplete("game")
+    @task_stats.autocomplete("game")
     async def game_autocomplete(self, interaction: discord.Interaction, current: str):
-        games = await get_all_games()
+        games = await get_all_games(interaction.guild.id)
         return [
             app_commands.Choice(name=f"{g.acronym} - {g.name}", value=g.acronym)
             for g in games
             if current.lower() in g.acronym.lower() or current.lower() in g.name.lower()
         ][:25]
 
+    @task_delete.autocomplete("task_id")
+    @task_close.autocomplete("task_id")
+    async def task_id_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=f"#{task_id} {title}"[:100], value=task_id)
+            for task_id, title in await suggest_tasks(interaction.guild.id, current)
+        ]
+
 
 async def setup(bot: commands.Bot):
     cog = TasksCog(bot)
@@ -1781,12 +2228,10 @@ async def setup(bot: commands.Bot):
     
     # Register persistent views for existing tasks
     # This is called when bot restarts to re-attach button handlers
-    from ..database import get_tasks_by_status
+    from ..database import get_open_tasks
     
-    for status in ['todo', 'progress', 'review']:
-        tasks = await get_tasks_by_status(status)
-        for task in tasks:
-            if task.thread_id:
-                bot.add_view(TaskView(task.id, cog))
-            if task.header_message_id:
-                bot.add_view(HeaderView(task.id, cog))
+    for task in await get_open_tasks():
+        if task.thread_id:
+            bot.add_view(TaskView(task.id, cog))
+        if task.header_message_id:
+            bot.add_view(HeaderView(task.id, cog))
@@ -15,14 +15,13 @@ from ..database import (
     upsert_group,
     get_all_games,
     get_game_channels,
-    get_non_custom_game_channels,
-    add_game_channel,
-    remove_game_channel as db_remove_game_channel,
     get_groups_dict,
     clear_template_channels,
     upsert_template_channel,
+    JOB_TEMPLATE_SYNC,
+    JOB_PRIORITY_HIGH,
 )
-from ..utils import format_channel_name
+from ..job_queue import enqueue
 
 
 class TemplatesCog(commands.Cog):
@@ -34,8 +33,8 @@ class TemplatesCog(commands.Cog):
     @template_group.command(name="list", description="List all template channels")
     @app_commands.checks.has_permissions(administrator=True)
     async def template_list(self, interaction: discord.Interaction):
-        channels = await get_all_template_channels()
-        groups = await get_groups_dict()
+        channels = await get_all_template_channels(interaction.guild.id)
+        groups = await get_groups_dict(interaction.guild.id)
         
         if not channels:
             await interaction.response.send_message("No template channels configured.")
@@ -79,15 +78,15 @@ class TemplatesCog(commands.Cog):
         description: str = None,
         is_voice: bool = False
     ):
-        group_obj = await get_group(group)
+        group_obj = await get_group(interaction.guild.id, group)
         if not group_obj:
-            groups = await get_all_groups()
+            groups = await get_all_groups(interaction.guild.id)
             group_names = ", ".join(g.name for g in groups)
             await interaction.response.send_message(f"Group `{group}` not found. Available: {group_names}")
             return
         
         name = name.lower().replace(" ", "-")
-        success = await add_template_channel(name, group, is_voice, description)
+        success = await add_template_channel(interaction.guild.id, name, group, is_voice, description)
         if success:
             await interaction.response.send_message(f"Added `{name}` to template in group `{group}`.")
         else:
@@ -98,7 +97,7 @@ class TemplatesCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def template_remove(self, interaction: discord.Interaction, name: str):
         name = name.lower().replace(" ", "-")
-        success = await remove_template_channel(name)
+        success = await remove_template_channel(interaction.guild.id, name)
         if success:
             await interaction.response.send_message(f"Removed `{name}` from template.")
         else:
@@ -109,78 +108,29 @@ class TemplatesCog(commands.Cog):
     async def template_sync(self, interaction: discord.Interaction):
         await interaction.response.defer()
         
-        games = await get_all_games()
+        games = await get_all_games(interaction.guild.id)
         if not games:
             await interaction.followup.send("No games to sync.")
             return
-        
-        template_channels = await get_all_template_channels()
-        template_names = {ch.name for ch in template_channels}
-        groups = await get_groups_dict()
-        
-        added_count = 0
-        removed_count = 0
-        errors = []
-        
-        for game in games:
-            category = interaction.guild.get_channel(game.category_id)
-            if not category:
-                errors.append(f"Category not found for {game.name}")
-                continue
-            
-            game_channels = await get_non_custom_game_channels(game.id)
-            game_channel_names = {ch.name for ch in game_channels}
-            
-            for template_ch in template_channels:
-                if template_ch.name not in game_channel_names:
-                    emoji = groups.get(template_ch.group_name, "")
-                    channel_name = format_channel_name(emoji, game.acronym, template_ch.name)
-                    
-                    try:
-                        if template_ch.is_voice:
-                            new_channel = await category.create_voice_channel(name=channel_name)
-                        else:
-                            new_channel = await category.create_text_channel(
-                                name=channel_name,
-                                topic=template_ch.description
-                            )
-                        
-                        await add_game_channel(
-                            game_id=game.id,
-                            channel_id=new_channel.id,
-                            name=template_ch.name,
-                            group_name=template_ch.group_name,
-                            is_custom=False,
-                            is_voice=template_ch.is_voice
-                        )
-                        added_count += 1
-                    except discord.HTTPException as e:
-                        errors.append(f"Failed to create {channel_name}: {e}")
-            
-            for game_ch in game_channels:
-                if game_ch.name not in template_names:
-                    channel = interaction.guild.get_channel(game_ch.channel_id)
-                    if channel:
-                        try:
-                            await channel.delete(reason="Template sync")
-                            removed_count += 1
-                        except discord.HTTPException as e:
-                            errors.append(f"Failed to delete {game_ch.name}: {e}")
-                    await db_remove_game_channel(game.id, game_ch.name)
-        
-        result = f"Sync complete.\nAdded: {added_count} channels\nRemoved: {removed_count} channels"
-        if errors:
-            result += f"\n\nErrors:\n" + "\n".join(errors[:10])
-            if len(errors) > 10:
-                result += f"\n... and {len(errors) - 10} more errors"
-        
-        await interaction.followup.send(result)
+
+        try:
+            job_id = await enqueue(
+                JOB_TEMPLATE_SYNC, interaction.guild.id, {'channel_id': interaction.channel_id},
+                priority=JOB_PRIORITY_HIGH, throttle=True
+            )
+        except ValueError as e:
+            await interaction.followup.send(str(e))
+            return
+        if job_id is None:
+            await interaction.followup.send("A template sync is already queued.")
+            return
+        await interaction.followup.send(f"Template sync queued (job #{job_id}). Results will be posted in this channel.")
     
     @template_group.command(name="export", description="Export template to JSON file")
     @app_commands.checks.has_permissions(administrator=True)
     async def template_export(self, interaction: discord.Interaction):
-        channels = await get_all_template_channels()
-        groups = await get_all_groups()
+        channels = await get_all_template_channels(interaction.guild.id)
+        groups = await get_all_groups(interaction.guild.id)
         
         export_data = {
             "groups": [{"name": g.name, "emoji": g.emoji} for g in groups],
@@ -237,7 +187,7 @@ class TemplatesCog(commands.Cog):
         errors = []
         
         if mode == "replace":
-            await clear_template_channels()
+            await clear_template_channels(interaction.guild.id)
         
         if "groups" in data:
             for g in data["groups"]:
@@ -245,7 +195,7 @@ class TemplatesCog(commands.Cog):
                     name = g.get("name")
                     emoji = g.get("emoji", "")
                     if name:
-                        await upsert_group(name, emoji)
+                        await upsert_group(interaction.guild.id, name, emoji)
                         groups_imported += 1
                 except Exception as e:
                     errors.append(f"Group {g}: {e}")
@@ -261,7 +211,7 @@ class TemplatesCog(commands.Cog):
                     
                     is_voice = ch.get("is_voice", False)
                     description = ch.get("description")
-                    await upsert_template_channel(name, group, is_voice, description)
+                    await upsert_template_channel(interaction.guild.id, name, group, is_voice, description)
                     channels_imported += 1
                 except Exception as e:
                     errors.append(f"Channel {ch}: {e}")
@@ -277,7 +227,7 @@ class TemplatesCog(commands.Cog):
     @template_group.command(name="groups", description="List all groups and their emojis")
     @app_commands.checks.has_permissions(administrator=True)
     async def template_groups(self, interaction: discord.Interaction):
-        groups = await get_all_groups()
+        groups = await get_all_groups(interaction.guild.id)
         
         if not groups:
             await interaction.response.send_message("No groups configured.")
@@ -293,22 +243,22 @@ class TemplatesCog(commands.Cog):
     @app_commands.describe(group="Group name", emoji="New emoji for the group")
     @app_commands.checks.has_permissions(administrator=True)
     async def template_emoji(self, interaction: discord.Interaction, group: str, emoji: str):
-        group_obj = await get_group(group)
+        group_obj = await get_group(interaction.guild.id, group)
         if not group_obj:
-            groups = await get_all_groups()
+            groups = await get_all_groups(interaction.guild.id)
             group_names = ", ".join(g.name for g in groups)
             await interaction.response.send_message(f"Group `{group}` not found. Available: {group_names}")
             return
         
         old_emoji = group_obj.emoji
-        await update_group_emoji(group, emoji)
+        await update_group_emoji(interaction.guild.id, group, emoji)
         await interaction.response.send_message(
             f"Updated `{group}` emoji: {old_emoji} -> {emoji}\nUse `/template sync` to update existing channels."
         )
     
     @template_remove.autocomplete("name")
     async def template_name_autocomplete(self, interaction: discord.Interaction, current: str):
-        channels = await get_all_template_channels()
+        channels = await get_all_template_channels(interaction.guild.id)
         return [
             app_commands.Choice(name=ch.name, value=ch.name)
             for ch in channels
@@ -318,7 +268,7 @@ class TemplatesCog(commands.Cog):
     @template_add.autocomplete("group")
     @template_emoji.autocomplete("group")
     async def group_autocomplete(self, interaction: discord.Interaction, current: str):
-        groups = await get_all_groups()
+        groups = await get_all_groups(interaction.guild.id)
         return [
             app_commands.Choice(name=f"{g.emoji} {g.name}", value=g.name)
             for g in groups
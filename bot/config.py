@@ -11,6 +11,73 @@ GUILD_ID = os.getenv("GUILD_ID")
 
 DATABASE_PATH = "data/bot.db"
 
+# Sharding (opt-in): run as an AutoShardedBot. SHARD_COUNT 0 lets Discord pick the count;
+# SHARD_IDS (e.g. "0,1") limits this process to some shards, which needs SHARD_COUNT
+SHARDED = os.getenv("SHARDED", "false").lower() in ("1", "true", "yes")
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_IDS = [int(s) for s in os.getenv("SHARD_IDS", "").split(",") if s.strip()]
+# Seconds between the startup role syncs of consecutive shards
+ROLE_SYNC_STAGGER_SECONDS = float(os.getenv("ROLE_SYNC_STAGGER_SECONDS", "5"))
+
+# Leader lease: replicas sharing the database elect one to run background loops and
+# gateway side effects. The lease lapses LEASE_TTL_SECONDS after its holder stops renewing
+# (every LEASE_RENEW_SECONDS); REPLICA_ID defaults to hostname:pid
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", "30"))
+LEASE_RENEW_SECONDS = float(os.getenv("LEASE_RENEW_SECONDS", "10"))
+REPLICA_ID = os.getenv("REPLICA_ID", "")
+# Guild settings and task teams are cached per process and reloaded after this many
+# seconds, so changes saved through another replica are picked up
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "15"))
+
+# Job queue. With JOB_WORKER, reminders, full role syncs and template syncs are run by
+# python -m bot.worker instead of the gateway process. Consumers poll every JOB_POLL_SECONDS
+# and run up to JOB_CONCURRENCY jobs at once; a claimed job is retried if its consumer goes
+# quiet for JOB_VISIBILITY_SECONDS. Failures back off exponentially from JOB_RETRY_BASE_SECONDS
+# (capped at JOB_RETRY_MAX_SECONDS) and are dead-lettered after JOB_MAX_ATTEMPTS tries.
+# Commands are refused while a server has JOB_MAX_PENDING_PER_GUILD jobs waiting.
+JOB_WORKER = os.getenv("JOB_WORKER", "false").lower() in ("1", "true", "yes")
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "1"))
+JOB_VISIBILITY_SECONDS = int(os.getenv("JOB_VISIBILITY_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETRY_MAX_SECONDS = int(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+JOB_MAX_PENDING_PER_GUILD = int(os.getenv("JOB_MAX_PENDING_PER_GUILD", "20"))
+# Finished and dead jobs are kept this many days for inspection
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+# Prometheus metrics: serve GET /metrics on METRICS_HOST:METRICS_PORT (0 disables).
+# Bind to localhost unless a scraper on another host needs it; there is no auth
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Database calls slower than this are logged with their SQL and query plans (0 disables)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+
+# Event loop watchdog: log the blocking stack when the loop stalls longer than
+# WATCHDOG_LAG_MS (0 disables). ASYNCIO_DEBUG also turns on asyncio debug mode, which
+# logs each callback slower than the threshold but slows everything down
+WATCHDOG_LAG_MS = float(os.getenv("WATCHDOG_LAG_MS", "250"))
+ASYNCIO_DEBUG = os.getenv("ASYNCIO_DEBUG", "false").lower() in ("1", "true", "yes")
+
+# Tracing: append interaction and job traces (with their database and REST spans) to
+# TRACE_FILE as OTLP/JSON lines (empty disables), keeping TRACE_SAMPLE_RATE of them
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# Base URL for Discord REST requests, e.g. http://127.0.0.1:8081/api/v10 for the stand-in API
+# in benchmarks/fake_api.py (empty uses Discord). Only REST is redirected, not the gateway
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE", "")
+
+# Online backups: snapshot directory, how many scheduled and how many manual snapshots to keep,
+# hours between scheduled runs (0 disables)
+BACKUP_DIR = os.getenv("BACKUP_DIR", "data/backups")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_INTERVAL_HOURS = int(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+
+# Done/cancelled tasks untouched for this many days are moved to the archive tables (0 disables)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
 # Member roles (server-wide, manually assigned)
 MEMBER_ROLES = ["Coder", "Artist", "Audio", "Writer", "QA"]
 
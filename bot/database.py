@@ -1,36 +1,187 @@
 import aiosqlite
-from typing import List, Optional, Set
-
-from .config import DATABASE_PATH, DEFAULT_GROUPS, DEFAULT_TEMPLATE
-from .models import Game, Group, TemplateChannel, GameChannel, GameRole, Task, TaskHistory, TaskBoard, TaskAssignee, ServerConfig
+import inspect
+import json
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from .config import CACHE_TTL_SECONDS, DATABASE_PATH, DEFAULT_GROUPS, DEFAULT_TEMPLATE
+from .metrics import cache_lookup
+from .query_stats import timed_query, traced_connect
+from .utils import parse_deadline
+from .models import Game, Group, TemplateChannel, GameChannel, GameRole, Task, TaskHistory, TaskBoard, TaskAssignee, ServerConfig, GuildSettings, OutboxEntry, Job
+
+
+# Rows written before guild partitioning carry this guild_id until claim_unassigned_rows
+# hands them to the guild the bot was running in
+UNASSIGNED_GUILD = 0
+
+# Render targets queued in render_outbox
+RENDER_CONTROL = 'control'
+RENDER_HEADER = 'header'
+RENDER_BOARD = 'board'
+RENDER_ALL = (RENDER_CONTROL, RENDER_HEADER, RENDER_BOARD)
+
+# Current time as integer epoch seconds, for the *_ts columns
+NOW_TS = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# SET clause shared by every task update: bump the CAS version and both updated_* columns
+TOUCH_TASK = f"version = version + 1, updated_at = CURRENT_TIMESTAMP, updated_ts = {NOW_TS}"
+
+# Background job kinds (see bot/job_queue.py)
+JOB_REMINDERS = 'reminders'
+JOB_ROLE_SYNC = 'role_sync'
+JOB_TEMPLATE_SYNC = 'template_sync'
+JOB_TASK_IMPORT = 'task_import'
+JOB_MIGRATE_ASSIGNEES = 'migrate_assignees'
+JOB_STATUSES = ('pending', 'running', 'done', 'dead')
+
+# Job priorities; lower values are claimed first
+JOB_PRIORITY_HIGH = 0  # someone is waiting for the result
+JOB_PRIORITY_NORMAL = 5
+JOB_PRIORITY_LOW = 10  # periodic maintenance
+
+# Rows fetched per query while exporting tasks
+EXPORT_BATCH_SIZE = 500
+
+# Above this many matches, search results are ordered by recency instead of bm25
+SEARCH_RANK_LIMIT = 5000
+
+# Tasks moved per archival transaction, and free pages released per incremental vacuum step
+ARCHIVE_BATCH_SIZE = 500
+VACUUM_PAGES_PER_STEP = 1000
+
+# Column lists copied between the live and archive tables. Spelled out because
+# migrated databases have the later columns in a different physical order.
+TASK_COLUMNS = (
+    "id, guild_id, game_acronym, title, description, assignee_id, target_channel_id, thread_id, "
+    "control_message_id, header_message_id, status, deadline, eta, priority, version, "
+    "deadline_ts, created_ts, updated_ts, created_at, updated_at"
+)
+TASK_HISTORY_COLUMNS = "id, task_id, user_id, action, old_value, new_value, timestamp, ts"
+TASK_ASSIGNEE_COLUMNS = "id, task_id, user_id, is_primary, has_approved, added_at"
+
+# Upper bounds (seconds) of the duration histogram buckets in task_duration_daily;
+# one more bucket holds everything longer
+STATS_BUCKETS = (
+    900, 1800, 3600, 7200, 14400, 28800, 43200, 86400, 172800, 259200,
+    432000, 604800, 864000, 1209600, 1814400, 2592000, 5184000,
+)
+
+# Full-text index over task titles, descriptions and ETA notes; rowid is the task id.
+# Ranking weights favour title matches over description and notes.
+TASK_SEARCH_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+        title, description, notes,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS task_search_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_search (rowid, title, description, notes)
+        VALUES (NEW.id, NEW.title, COALESCE(NEW.description, ''), '');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS task_search_update AFTER UPDATE OF title, description ON tasks BEGIN
+        UPDATE task_search SET title = NEW.title, description = COALESCE(NEW.description, '')
+        WHERE rowid = NEW.id;
+    END;
+
+    -- Archived tasks stay searchable, so only drop rows that were not archived.
+    -- Recreated on every start because older databases have the unconditional version.
+    DROP TRIGGER IF EXISTS task_search_delete;
+    CREATE TRIGGER task_search_delete AFTER DELETE ON tasks
+    WHEN NOT EXISTS (SELECT 1 FROM tasks_archive WHERE id = OLD.id) BEGIN
+        DELETE FROM task_search WHERE rowid = OLD.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS task_search_notes AFTER INSERT ON task_history
+    WHEN NEW.action = 'eta_update' AND NEW.new_value IS NOT NULL BEGIN
+        UPDATE task_search SET notes = notes || ' ' || NEW.new_value WHERE rowid = NEW.task_id;
+    END;
+"""
+
+# Task count per (guild, game, status), kept current by triggers so boards never count rows
+TASK_COUNTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS game_task_counts (
+        guild_id INTEGER NOT NULL,
+        game_acronym TEXT NOT NULL,
+        status TEXT NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, game_acronym, status)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS game_task_counts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO game_task_counts (guild_id, game_acronym, status, n)
+        VALUES (NEW.guild_id, NEW.game_acronym, COALESCE(NEW.status, 'todo'), 1)
+        ON CONFLICT(guild_id, game_acronym, status) DO UPDATE SET n = n + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS game_task_counts_update AFTER UPDATE OF status, game_acronym, guild_id ON tasks
+    WHEN OLD.status IS NOT NEW.status OR OLD.game_acronym IS NOT NEW.game_acronym
+      OR OLD.guild_id IS NOT NEW.guild_id BEGIN
+        UPDATE game_task_counts SET n = n - 1
+        WHERE guild_id = OLD.guild_id AND game_acronym = OLD.game_acronym
+          AND status = COALESCE(OLD.status, 'todo');
+        INSERT INTO game_task_counts (guild_id, game_acronym, status, n)
+        VALUES (NEW.guild_id, NEW.game_acronym, COALESCE(NEW.status, 'todo'), 1)
+        ON CONFLICT(guild_id, game_acronym, status) DO UPDATE SET n = n + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS game_task_counts_delete AFTER DELETE ON tasks BEGIN
+        UPDATE game_task_counts SET n = n - 1
+        WHERE guild_id = OLD.guild_id AND game_acronym = OLD.game_acronym
+          AND status = COALESCE(OLD.status, 'todo');
+    END;
+"""
+
+
+def connect() -> aiosqlite.Connection:
+    """Open the bot database. Statements are traced for the slow-query log while it is on."""
+    return traced_connect(DATABASE_PATH)
 
 
 async def init_db():
     """Initialize database schema and seed default data."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
+        # Incremental auto-vacuum lets the archive job hand freed pages back to the
+        # filesystem a step at a time; switching an existing database takes one VACUUM
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] != 2:
+            await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await db.execute("VACUUM")
+
+        # WAL lets readers run alongside the writer, so shard processes can share
+        # the database; the mode is stored in the file
+        await db.execute("PRAGMA journal_mode = WAL")
+
         # Create tables
         await db.executescript("""
             CREATE TABLE IF NOT EXISTS games (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL DEFAULT 0,
                 name TEXT NOT NULL,
-                acronym TEXT UNIQUE NOT NULL,
+                acronym TEXT NOT NULL,
                 category_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(guild_id, acronym)
             );
 
             CREATE TABLE IF NOT EXISTS groups (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                emoji TEXT NOT NULL
+                guild_id INTEGER NOT NULL DEFAULT 0,
+                name TEXT NOT NULL,
+                emoji TEXT NOT NULL,
+                UNIQUE(guild_id, name)
             );
 
             CREATE TABLE IF NOT EXISTS template_channels (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL DEFAULT 0,
                 name TEXT NOT NULL,
                 group_name TEXT NOT NULL,
                 is_voice BOOLEAN DEFAULT 0,
                 description TEXT,
-                UNIQUE(name)
+                UNIQUE(guild_id, name)
             );
 
             CREATE TABLE IF NOT EXISTS game_channels (
@@ -55,6 +206,7 @@ async def init_db():
             -- Task management tables
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL DEFAULT 0,
                 game_acronym TEXT NOT NULL,
                 title TEXT NOT NULL,
                 description TEXT,
@@ -67,6 +219,10 @@ async def init_db():
                 deadline DATETIME,
                 eta TEXT,
                 priority TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                deadline_ts INTEGER,
+                created_ts INTEGER,
+                updated_ts INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
@@ -79,14 +235,17 @@ async def init_db():
                 old_value TEXT,
                 new_value TEXT,
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ts INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                 FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE
             );
 
             CREATE TABLE IF NOT EXISTS task_boards (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_acronym TEXT NOT NULL UNIQUE,
+                guild_id INTEGER NOT NULL DEFAULT 0,
+                game_acronym TEXT NOT NULL,
                 channel_id INTEGER NOT NULL,
-                message_ids TEXT NOT NULL
+                message_ids TEXT NOT NULL,
+                UNIQUE(guild_id, game_acronym)
             );
 
             -- Multi-assignee support
@@ -110,6 +269,116 @@ async def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
+
+            -- Pending Discord embed renders, written with the state change they reflect
+            CREATE TABLE IF NOT EXISTS render_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL DEFAULT 0,
+                target TEXT NOT NULL,
+                ref TEXT NOT NULL,
+                generation INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(target, ref)
+            );
+
+            -- Daily rollup of status durations from task_history, bucketed for percentiles.
+            -- metric is the status a task left, or 'lead' for created -> done.
+            CREATE TABLE IF NOT EXISTS task_duration_daily (
+                guild_id INTEGER NOT NULL DEFAULT 0,
+                game_acronym TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                n INTEGER NOT NULL DEFAULT 0,
+                seconds INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, day, game_acronym, metric, bucket)
+            ) WITHOUT ROWID;
+
+            -- Progress markers for incremental jobs (e.g. last task_history id rolled up)
+            CREATE TABLE IF NOT EXISTS stats_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+
+            -- Durable background jobs. Lower priority values run first; a claimed job
+            -- is hidden until locked_until_ts, then becomes claimable again so work
+            -- held by a crashed consumer is retried. Jobs that use up max_attempts
+            -- stay behind with status 'dead'.
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                guild_id INTEGER NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL DEFAULT 'pending',
+                priority INTEGER NOT NULL DEFAULT 5,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 5,
+                run_after_ts INTEGER NOT NULL DEFAULT 0,
+                locked_until_ts INTEGER,
+                error TEXT,
+                created_ts INTEGER NOT NULL,
+                started_ts INTEGER,
+                finished_ts INTEGER
+            );
+
+            -- Time-limited ownership of background work among replicas sharing this database
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                acquired_ts INTEGER NOT NULL,
+                expires_ts INTEGER NOT NULL
+            );
+
+            -- Done/cancelled tasks moved out of the hot tables by archive_closed_tasks.
+            -- Rows keep their original ids; archived_ts records when they moved.
+            CREATE TABLE IF NOT EXISTS tasks_archive (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL DEFAULT 0,
+                game_acronym TEXT NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT,
+                assignee_id INTEGER NOT NULL,
+                target_channel_id INTEGER NOT NULL,
+                thread_id INTEGER,
+                control_message_id INTEGER,
+                header_message_id INTEGER,
+                status TEXT,
+                deadline DATETIME,
+                eta TEXT,
+                priority TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                deadline_ts INTEGER,
+                created_ts INTEGER,
+                updated_ts INTEGER,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                archived_ts INTEGER NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS task_history_archive (
+                id INTEGER PRIMARY KEY,
+                task_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                old_value TEXT,
+                new_value TEXT,
+                timestamp TIMESTAMP,
+                ts INTEGER
+            );
+
+            CREATE TABLE IF NOT EXISTS task_assignees_archive (
+                id INTEGER PRIMARY KEY,
+                task_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                is_primary BOOLEAN DEFAULT 0,
+                has_approved BOOLEAN DEFAULT 0,
+                added_at TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_task_history_archive_task_id ON task_history_archive(task_id);
+            CREATE INDEX IF NOT EXISTS idx_task_assignees_archive_task_id ON task_assignees_archive(task_id);
         """)
         
         # Migration: Add header_message_id column if it doesn't exist
@@ -118,6 +387,208 @@ async def init_db():
         if 'header_message_id' not in columns:
             await db.execute("ALTER TABLE tasks ADD COLUMN header_message_id INTEGER")
         
+        # Migration: Add version column for optimistic concurrency
+        if 'version' not in columns:
+            await db.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+        # Migration: Partition by guild. Existing rows start out unassigned
+        if 'guild_id' not in columns:
+            await db.execute("ALTER TABLE tasks ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+        cursor = await db.execute("PRAGMA table_info(tasks_archive)")
+        if 'guild_id' not in [row[1] for row in await cursor.fetchall()]:
+            await db.execute("ALTER TABLE tasks_archive ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+
+        # Migration: Integer epoch timestamps, backfilled from the text columns
+        if 'deadline_ts' not in columns:
+            await db.execute("ALTER TABLE tasks ADD COLUMN deadline_ts INTEGER")
+            await db.execute("ALTER TABLE tasks ADD COLUMN created_ts INTEGER")
+            await db.execute("ALTER TABLE tasks ADD COLUMN updated_ts INTEGER")
+            await db.execute(
+                """UPDATE tasks SET created_ts = CAST(strftime('%s', created_at) AS INTEGER),
+                   updated_ts = CAST(strftime('%s', updated_at) AS INTEGER)"""
+            )
+            cursor = await db.execute("SELECT id, deadline FROM tasks WHERE deadline IS NOT NULL")
+            await db.executemany(
+                "UPDATE tasks SET deadline_ts = ? WHERE id = ?",
+                [(parse_deadline(deadline), task_id) for task_id, deadline in await cursor.fetchall()]
+            )
+
+        # Migration: task_history.ts needs an expression default, which ALTER TABLE
+        # cannot add, so the table is rebuilt once (its triggers and indexes are
+        # recreated below)
+        cursor = await db.execute("PRAGMA table_info(task_history)")
+        if 'ts' not in [row[1] for row in await cursor.fetchall()]:
+            await db.commit()
+            await db.executescript("""
+                BEGIN;
+                CREATE TABLE task_history_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    action TEXT NOT NULL,
+                    old_value TEXT,
+                    new_value TEXT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    ts INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                    FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE
+                );
+                INSERT INTO task_history_new (id, task_id, user_id, action, old_value, new_value, timestamp, ts)
+                SELECT id, task_id, user_id, action, old_value, new_value, timestamp,
+                       CAST(strftime('%s', timestamp) AS INTEGER)
+                FROM task_history;
+                DROP TABLE task_history;
+                ALTER TABLE task_history_new RENAME TO task_history;
+                COMMIT;
+            """)
+
+        # Migration: games, task boards and the stats rollup get guild_id in their
+        # unique keys, which ALTER TABLE cannot change, so they are rebuilt once
+        cursor = await db.execute("PRAGMA table_info(games)")
+        if 'guild_id' not in [row[1] for row in await cursor.fetchall()]:
+            await db.commit()
+            await db.executescript("""
+                BEGIN;
+                CREATE TABLE games_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    name TEXT NOT NULL,
+                    acronym TEXT NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(guild_id, acronym)
+                );
+                INSERT INTO games_new (id, name, acronym, category_id, created_at)
+                SELECT id, name, acronym, category_id, created_at FROM games;
+                DROP TABLE games;
+                ALTER TABLE games_new RENAME TO games;
+
+                CREATE TABLE task_boards_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    game_acronym TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    message_ids TEXT NOT NULL,
+                    UNIQUE(guild_id, game_acronym)
+                );
+                INSERT INTO task_boards_new (id, game_acronym, channel_id, message_ids)
+                SELECT id, game_acronym, channel_id, message_ids FROM task_boards;
+                DROP TABLE task_boards;
+                ALTER TABLE task_boards_new RENAME TO task_boards;
+
+                CREATE TABLE task_duration_daily_new (
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    game_acronym TEXT NOT NULL,
+                    day INTEGER NOT NULL,
+                    metric TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    n INTEGER NOT NULL DEFAULT 0,
+                    seconds INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (guild_id, day, game_acronym, metric, bucket)
+                ) WITHOUT ROWID;
+                INSERT INTO task_duration_daily_new (game_acronym, day, metric, bucket, n, seconds)
+                SELECT game_acronym, day, metric, bucket, n, seconds FROM task_duration_daily;
+                DROP TABLE task_duration_daily;
+                ALTER TABLE task_duration_daily_new RENAME TO task_duration_daily;
+
+                -- Board renders are keyed "guild:acronym" now
+                UPDATE render_outbox SET ref = '0:' || ref WHERE target = 'board' AND instr(ref, ':') = 0;
+
+                -- Status counts are rebuilt per guild below
+                DROP TRIGGER IF EXISTS game_task_counts_insert;
+                DROP TRIGGER IF EXISTS game_task_counts_update;
+                DROP TRIGGER IF EXISTS game_task_counts_delete;
+                DROP TABLE IF EXISTS game_task_counts;
+                COMMIT;
+            """)
+
+        # Migration: Each guild has its own template and groups. The shared ones
+        # become unassigned and go to the home guild in claim_unassigned_rows
+        cursor = await db.execute("PRAGMA table_info(groups)")
+        if 'guild_id' not in [row[1] for row in await cursor.fetchall()]:
+            await db.commit()
+            await db.executescript("""
+                BEGIN;
+                CREATE TABLE groups_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    name TEXT NOT NULL,
+                    emoji TEXT NOT NULL,
+                    UNIQUE(guild_id, name)
+                );
+                INSERT INTO groups_new (id, name, emoji) SELECT id, name, emoji FROM groups;
+                DROP TABLE groups;
+                ALTER TABLE groups_new RENAME TO groups;
+
+                CREATE TABLE template_channels_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    name TEXT NOT NULL,
+                    group_name TEXT NOT NULL,
+                    is_voice BOOLEAN DEFAULT 0,
+                    description TEXT,
+                    UNIQUE(guild_id, name)
+                );
+                INSERT INTO template_channels_new (id, name, group_name, is_voice, description)
+                SELECT id, name, group_name, is_voice, description FROM template_channels;
+                DROP TABLE template_channels;
+                ALTER TABLE template_channels_new RENAME TO template_channels;
+                COMMIT;
+            """)
+
+        # Migration: Renders record their guild so each shard only applies its own
+        cursor = await db.execute("PRAGMA table_info(render_outbox)")
+        if 'guild_id' not in [row[1] for row in await cursor.fetchall()]:
+            await db.execute("ALTER TABLE render_outbox ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+            await db.execute(
+                """UPDATE render_outbox SET guild_id = CAST(substr(ref, 1, instr(ref, ':') - 1) AS INTEGER)
+                   WHERE target = ?""",
+                (RENDER_BOARD,)
+            )
+            await db.execute(
+                """UPDATE render_outbox SET guild_id = COALESCE(
+                       (SELECT guild_id FROM tasks WHERE id = CAST(render_outbox.ref AS INTEGER)), 0)
+                   WHERE target != ?""",
+                (RENDER_BOARD,)
+            )
+
+        # Migration: Jobs get priorities, retries and visibility timeouts
+        cursor = await db.execute("PRAGMA table_info(jobs)")
+        job_columns = [row[1] for row in await cursor.fetchall()]
+        for column, definition in (
+            ('priority', "INTEGER NOT NULL DEFAULT 5"),
+            ('attempts', "INTEGER NOT NULL DEFAULT 0"),
+            ('max_attempts', "INTEGER NOT NULL DEFAULT 5"),
+            ('run_after_ts', "INTEGER NOT NULL DEFAULT 0"),
+            ('locked_until_ts', "INTEGER"),
+        ):
+            if column not in job_columns:
+                await db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        await db.execute("UPDATE jobs SET status = 'dead' WHERE status = 'failed'")
+        await db.execute("DROP INDEX IF EXISTS idx_jobs_status_id")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority, id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_guild_status ON jobs(guild_id, status)")
+
+        # Indexes for guild-scoped lookups and time-window queries (reminders,
+        # stagnant tasks, stats). status/updated_ts without a guild serves archival.
+        await db.execute("DROP INDEX IF EXISTS idx_tasks_deadline_ts")
+        await db.execute("DROP INDEX IF EXISTS idx_tasks_game_status")
+        await db.execute("DROP INDEX IF EXISTS idx_tasks_archive_game_status")
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_guild_game_status ON tasks(guild_id, game_acronym, status)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_guild_status_updated_ts ON tasks(guild_id, status, updated_ts)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_guild_deadline_ts ON tasks(guild_id, deadline_ts)"
+        )
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status_updated_ts ON tasks(status, updated_ts)")
+        await db.execute(
+            """CREATE INDEX IF NOT EXISTS idx_tasks_archive_guild_game_status
+               ON tasks_archive(guild_id, game_acronym, status)"""
+        )
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_task_history_ts ON task_history(ts)")
+        
         # Migration: Create task_assignees index for performance
         await db.execute("""
             CREATE INDEX IF NOT EXISTS idx_task_assignees_task_id 
@@ -127,73 +598,115 @@ async def init_db():
             CREATE INDEX IF NOT EXISTS idx_task_assignees_user_id 
             ON task_assignees(user_id)
         """)
-        
-        # Seed default groups if empty
-        cursor = await db.execute("SELECT COUNT(*) FROM groups")
-        count = (await cursor.fetchone())[0]
-        if count == 0:
-            for name, emoji in DEFAULT_GROUPS.items():
-                await db.execute(
-                    "INSERT INTO groups (name, emoji) VALUES (?, ?)",
-                    (name, emoji)
-                )
-        
-        # Seed default template channels if empty
-        cursor = await db.execute("SELECT COUNT(*) FROM template_channels")
-        count = (await cursor.fetchone())[0]
-        if count == 0:
-            for name, group_name, is_voice, description in DEFAULT_TEMPLATE:
-                await db.execute(
-                    "INSERT INTO template_channels (name, group_name, is_voice, description) VALUES (?, ?, ?, ?)",
-                    (name, group_name, is_voice, description)
-                )
-        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_task_history_task_id
+            ON task_history(task_id)
+        """)
+
+        # Migration: Full-text search index, backfilled once from existing tasks
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE name = 'task_search'")
+        search_exists = await cursor.fetchone() is not None
+        await db.executescript(TASK_SEARCH_SCHEMA)
+        if not search_exists:
+            await db.execute("""
+                INSERT INTO task_search (rowid, title, description, notes)
+                SELECT t.id, t.title, COALESCE(t.description, ''),
+                       COALESCE((SELECT group_concat(h.new_value, ' ') FROM task_history h
+                                 WHERE h.task_id = t.id AND h.action = 'eta_update'), '')
+                FROM tasks t
+            """)
+            await db.execute(
+                "INSERT INTO task_search (task_search, rank) VALUES ('rank', 'bm25(10.0, 3.0, 1.0)')"
+            )
+
+        # Migration: Materialized per-game status counts, backfilled once
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE name = 'game_task_counts'")
+        counts_exist = await cursor.fetchone() is not None
+        await db.executescript(TASK_COUNTS_SCHEMA)
+        if not counts_exist:
+            await db.execute("""
+                INSERT INTO game_task_counts (guild_id, game_acronym, status, n)
+                SELECT guild_id, game_acronym, COALESCE(status, 'todo'), COUNT(*) FROM tasks
+                GROUP BY guild_id, game_acronym, COALESCE(status, 'todo')
+            """)
+
         await db.commit()
 
 
 # ============== GROUPS ==============
 
-async def get_all_groups() -> List[Group]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+# Guilds whose default template this process has already made sure of
+_seeded_guilds = set()
+
+
+async def _ensure_guild_template(db, guild_id: int):
+    """Give a guild the default groups and template channels the first time it is used.
+
+    A guild has its template once it has any group; /template import replace only
+    clears channels, so an emptied template is not reseeded.
+    """
+    if guild_id in _seeded_guilds:
+        return
+    cursor = await db.execute("SELECT 1 FROM groups WHERE guild_id = ? LIMIT 1", (guild_id,))
+    if await cursor.fetchone() is None:
+        await db.executemany(
+            "INSERT OR IGNORE INTO groups (guild_id, name, emoji) VALUES (?, ?, ?)",
+            [(guild_id, name, emoji) for name, emoji in DEFAULT_GROUPS.items()]
+        )
+        await db.executemany(
+            """INSERT OR IGNORE INTO template_channels (guild_id, name, group_name, is_voice, description)
+               VALUES (?, ?, ?, ?, ?)""",
+            [(guild_id, *channel) for channel in DEFAULT_TEMPLATE]
+        )
+        await db.commit()
+    _seeded_guilds.add(guild_id)
+
+
+async def get_all_groups(guild_id: int) -> List[Group]:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM groups")
+        cursor = await db.execute("SELECT * FROM groups WHERE guild_id = ? ORDER BY id", (guild_id,))
         rows = await cursor.fetchall()
         return [Group(id=r["id"], name=r["name"], emoji=r["emoji"]) for r in rows]
 
 
-async def get_group(name: str) -> Optional[Group]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_group(guild_id: int, name: str) -> Optional[Group]:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM groups WHERE name = ?", (name,))
+        cursor = await db.execute("SELECT * FROM groups WHERE guild_id = ? AND name = ?", (guild_id, name))
         row = await cursor.fetchone()
         if row:
             return Group(id=row["id"], name=row["name"], emoji=row["emoji"])
         return None
 
 
-async def update_group_emoji(name: str, emoji: str) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def update_group_emoji(guild_id: int, name: str, emoji: str) -> bool:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         cursor = await db.execute(
-            "UPDATE groups SET emoji = ? WHERE name = ?",
-            (emoji, name)
+            "UPDATE groups SET emoji = ? WHERE guild_id = ? AND name = ?",
+            (emoji, guild_id, name)
         )
         await db.commit()
         return cursor.rowcount > 0
 
 
-async def get_groups_dict() -> dict:
+async def get_groups_dict(guild_id: int) -> dict:
     """Return dict of group_name -> emoji."""
-    groups = await get_all_groups()
+    groups = await get_all_groups(guild_id)
     return {g.name: g.emoji for g in groups}
 
 
-async def upsert_group(name: str, emoji: str) -> bool:
+async def upsert_group(guild_id: int, name: str, emoji: str) -> bool:
     """Insert or update a group."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         await db.execute(
-            """INSERT INTO groups (name, emoji) VALUES (?, ?)
-               ON CONFLICT(name) DO UPDATE SET emoji = excluded.emoji""",
-            (name, emoji)
+            """INSERT INTO groups (guild_id, name, emoji) VALUES (?, ?, ?)
+               ON CONFLICT(guild_id, name) DO UPDATE SET emoji = excluded.emoji""",
+            (guild_id, name, emoji)
         )
         await db.commit()
         return True
@@ -201,10 +714,11 @@ async def upsert_group(name: str, emoji: str) -> bool:
 
 # ============== TEMPLATE CHANNELS ==============
 
-async def get_all_template_channels() -> List[TemplateChannel]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_all_template_channels(guild_id: int) -> List[TemplateChannel]:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM template_channels ORDER BY id")
+        cursor = await db.execute("SELECT * FROM template_channels WHERE guild_id = ? ORDER BY id", (guild_id,))
         rows = await cursor.fetchall()
         return [
             TemplateChannel(
@@ -218,12 +732,15 @@ async def get_all_template_channels() -> List[TemplateChannel]:
         ]
 
 
-async def add_template_channel(name: str, group_name: str, is_voice: bool = False, description: str = None) -> bool:
+async def add_template_channel(guild_id: int, name: str, group_name: str, is_voice: bool = False,
+                               description: str = None) -> bool:
     try:
-        async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with connect() as db:
+            await _ensure_guild_template(db, guild_id)
             await db.execute(
-                "INSERT INTO template_channels (name, group_name, is_voice, description) VALUES (?, ?, ?, ?)",
-                (name, group_name, is_voice, description)
+                """INSERT INTO template_channels (guild_id, name, group_name, is_voice, description)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (guild_id, name, group_name, is_voice, description)
             )
             await db.commit()
             return True
@@ -231,46 +748,51 @@ async def add_template_channel(name: str, group_name: str, is_voice: bool = Fals
         return False
 
 
-async def remove_template_channel(name: str) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def remove_template_channel(guild_id: int, name: str) -> bool:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         cursor = await db.execute(
-            "DELETE FROM template_channels WHERE name = ?",
-            (name,)
+            "DELETE FROM template_channels WHERE guild_id = ? AND name = ?",
+            (guild_id, name)
         )
         await db.commit()
         return cursor.rowcount > 0
 
 
-async def clear_template_channels() -> int:
-    """Delete all template channels. Returns count deleted."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute("DELETE FROM template_channels")
+async def clear_template_channels(guild_id: int) -> int:
+    """Delete all of a guild's template channels. Returns count deleted."""
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
+        cursor = await db.execute("DELETE FROM template_channels WHERE guild_id = ?", (guild_id,))
         await db.commit()
         return cursor.rowcount
 
 
-async def upsert_template_channel(name: str, group_name: str, is_voice: bool = False, description: str = None) -> bool:
+async def upsert_template_channel(guild_id: int, name: str, group_name: str, is_voice: bool = False,
+                                  description: str = None) -> bool:
     """Insert or update a template channel."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         await db.execute(
-            """INSERT INTO template_channels (name, group_name, is_voice, description) 
-               VALUES (?, ?, ?, ?)
-               ON CONFLICT(name) DO UPDATE SET 
+            """INSERT INTO template_channels (guild_id, name, group_name, is_voice, description) 
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(guild_id, name) DO UPDATE SET 
                group_name = excluded.group_name,
                is_voice = excluded.is_voice,
                description = excluded.description""",
-            (name, group_name, is_voice, description)
+            (guild_id, name, group_name, is_voice, description)
         )
         await db.commit()
         return True
 
 
-async def get_template_channel(name: str) -> Optional[TemplateChannel]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_template_channel(guild_id: int, name: str) -> Optional[TemplateChannel]:
+    async with connect() as db:
+        await _ensure_guild_template(db, guild_id)
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM template_channels WHERE name = ?",
-            (name,)
+            "SELECT * FROM template_channels WHERE guild_id = ? AND name = ?",
+            (guild_id, name)
         )
         row = await cursor.fetchone()
         if row:
@@ -286,10 +808,13 @@ async def get_template_channel(name: str) -> Optional[TemplateChannel]:
 
 # ============== GAMES ==============
 
-async def get_all_games() -> List[Game]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_all_games(guild_id: int) -> List[Game]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM games ORDER BY created_at DESC")
+        cursor = await db.execute(
+            "SELECT * FROM games WHERE guild_id = ? ORDER BY created_at DESC",
+            (guild_id,)
+        )
         rows = await cursor.fetchall()
         return [
             Game(
@@ -297,18 +822,19 @@ async def get_all_games() -> List[Game]:
                 name=r["name"],
                 acronym=r["acronym"],
                 category_id=r["category_id"],
-                created_at=r["created_at"]
+                created_at=r["created_at"],
+                guild_id=r["guild_id"]
             )
             for r in rows
         ]
 
 
-async def get_game_by_acronym(acronym: str) -> Optional[Game]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_game_by_acronym(guild_id: int, acronym: str) -> Optional[Game]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM games WHERE LOWER(acronym) = LOWER(?)",
-            (acronym,)
+            "SELECT * FROM games WHERE guild_id = ? AND LOWER(acronym) = LOWER(?)",
+            (guild_id, acronym)
         )
         row = await cursor.fetchone()
         if row:
@@ -317,35 +843,37 @@ async def get_game_by_acronym(acronym: str) -> Optional[Game]:
                 name=row["name"],
                 acronym=row["acronym"],
                 category_id=row["category_id"],
-                created_at=row["created_at"]
+                created_at=row["created_at"],
+                guild_id=row["guild_id"]
             )
         return None
 
 
-async def get_all_acronyms() -> Set[str]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute("SELECT acronym FROM games")
+async def get_all_acronyms(guild_id: int) -> Set[str]:
+    async with connect() as db:
+        cursor = await db.execute("SELECT acronym FROM games WHERE guild_id = ?", (guild_id,))
         rows = await cursor.fetchall()
         return {r[0] for r in rows}
 
 
-async def create_game(name: str, acronym: str, category_id: int) -> Game:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def create_game(guild_id: int, name: str, acronym: str, category_id: int) -> Game:
+    async with connect() as db:
         cursor = await db.execute(
-            "INSERT INTO games (name, acronym, category_id) VALUES (?, ?, ?)",
-            (name, acronym, category_id)
+            "INSERT INTO games (guild_id, name, acronym, category_id) VALUES (?, ?, ?, ?)",
+            (guild_id, name, acronym, category_id)
         )
         await db.commit()
         return Game(
             id=cursor.lastrowid,
             name=name,
             acronym=acronym,
-            category_id=category_id
+            category_id=category_id,
+            guild_id=guild_id
         )
 
 
 async def delete_game(game_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute("DELETE FROM games WHERE id = ?", (game_id,))
         await db.commit()
         return cursor.rowcount > 0
@@ -354,7 +882,7 @@ async def delete_game(game_id: int) -> bool:
 # ============== GAME CHANNELS ==============
 
 async def get_game_channels(game_id: int) -> List[GameChannel]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM game_channels WHERE game_id = ?",
@@ -383,7 +911,7 @@ async def add_game_channel(
     is_custom: bool = False,
     is_voice: bool = False
 ) -> GameChannel:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
             """INSERT INTO game_channels 
                (game_id, channel_id, name, group_name, is_custom, is_voice) 
@@ -404,7 +932,7 @@ async def add_game_channel(
 
 async def remove_game_channel(game_id: int, name: str) -> Optional[int]:
     """Remove game channel by name, return channel_id if found."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT channel_id FROM game_channels WHERE game_id = ? AND name = ?",
             (game_id, name)
@@ -423,7 +951,7 @@ async def remove_game_channel(game_id: int, name: str) -> Optional[int]:
 
 
 async def get_game_channel_by_name(game_id: int, name: str) -> Optional[GameChannel]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM game_channels WHERE game_id = ? AND name = ?",
@@ -445,7 +973,7 @@ async def get_game_channel_by_name(game_id: int, name: str) -> Optional[GameChan
 
 async def get_non_custom_game_channels(game_id: int) -> List[GameChannel]:
     """Get only template-based channels for a game."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM game_channels WHERE game_id = ? AND is_custom = 0",
@@ -469,7 +997,7 @@ async def get_non_custom_game_channels(game_id: int) -> List[GameChannel]:
 # ============== GAME ROLES ==============
 
 async def get_game_roles(game_id: int) -> List[GameRole]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM game_roles WHERE game_id = ?",
@@ -488,7 +1016,7 @@ async def get_game_roles(game_id: int) -> List[GameRole]:
 
 
 async def add_game_role(game_id: int, role_id: int, suffix: str) -> GameRole:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
             "INSERT INTO game_roles (game_id, role_id, suffix) VALUES (?, ?, ?)",
             (game_id, role_id, suffix)
@@ -502,11 +1030,15 @@ async def add_game_role(game_id: int, role_id: int, suffix: str) -> GameRole:
         )
 
 
-async def get_all_game_roles() -> List[GameRole]:
-    """Get all game roles across all games."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_all_game_roles(guild_id: int) -> List[GameRole]:
+    """Get all game roles across a guild's games."""
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM game_roles")
+        cursor = await db.execute(
+            """SELECT gr.* FROM game_roles gr JOIN games g ON g.id = gr.game_id
+               WHERE g.guild_id = ?""",
+            (guild_id,)
+        )
         rows = await cursor.fetchall()
         return [
             GameRole(
@@ -537,57 +1069,86 @@ def _row_to_task(r) -> Task:
         deadline=r["deadline"],
         eta=r["eta"],
         priority=r["priority"],
+        version=r["version"] if "version" in r.keys() else 0,
+        deadline_ts=r["deadline_ts"] if "deadline_ts" in r.keys() else None,
+        created_ts=r["created_ts"] if "created_ts" in r.keys() else None,
+        updated_ts=r["updated_ts"] if "updated_ts" in r.keys() else None,
         created_at=r["created_at"],
-        updated_at=r["updated_at"]
+        updated_at=r["updated_at"],
+        guild_id=r["guild_id"] if "guild_id" in r.keys() else UNASSIGNED_GUILD
     )
 
 
 async def create_task(
+    guild_id: int,
     game_acronym: str,
     title: str,
     description: str,
     assignee_id: int,
     target_channel_id: int,
     deadline: str = None,
-    priority: str = None
+    priority: str = None,
+    deadline_ts: int = None,
+    status: str = 'todo',
+    eta: str = None
 ) -> Task:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    """Insert a task. deadline_ts is parsed from deadline unless the caller already did.
+
+    status and eta let imports bring tasks back in the state they were exported in.
+    """
+    if deadline_ts is None:
+        deadline_ts = parse_deadline(deadline)
+    async with connect() as db:
         cursor = await db.execute(
-            """INSERT INTO tasks 
-               (game_acronym, title, description, assignee_id, target_channel_id, deadline, priority)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (game_acronym, title, description, assignee_id, target_channel_id, deadline, priority)
+            f"""INSERT INTO tasks 
+               (guild_id, game_acronym, title, description, assignee_id, target_channel_id, deadline, priority,
+                deadline_ts, status, eta, created_ts, updated_ts)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {NOW_TS}, {NOW_TS})""",
+            (guild_id, game_acronym, title, description, assignee_id, target_channel_id, deadline, priority, deadline_ts,
+             status, eta)
         )
+        if eta:
+            # ETAs are searchable notes; later ones arrive through task_history
+            await db.execute("UPDATE task_search SET notes = ? WHERE rowid = ?", (eta, cursor.lastrowid))
         await db.commit()
-        return Task(
-            id=cursor.lastrowid,
-            game_acronym=game_acronym,
-            title=title,
-            description=description,
-            assignee_id=assignee_id,
-            target_channel_id=target_channel_id,
-            thread_id=None,
-            control_message_id=None,
-            header_message_id=None,
-            status='todo',
-            deadline=deadline,
-            eta=None,
-            priority=priority
-        )
-
-
-async def get_task(task_id: int) -> Optional[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+        # Read the row back so defaults such as created_at match later renders
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM tasks WHERE id = ?", (cursor.lastrowid,))
+        return _row_to_task(await cursor.fetchone())
+
+
+async def get_task(task_id: int, guild_id: int = None) -> Optional[Task]:
+    """Get a task by ID; with guild_id, tasks of other guilds are not found."""
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+        cursor = await db.execute(
+            "SELECT * FROM tasks WHERE id = ? AND (? IS NULL OR guild_id = ?)",
+            (task_id, guild_id, guild_id)
+        )
         row = await cursor.fetchone()
         if row:
             return _row_to_task(row)
         return None
 
 
+async def get_existing_task_ids(guild_id: int, task_ids: List[int]) -> Set[int]:
+    """Which of task_ids belong to live or archived tasks of the guild."""
+    existing = set()
+    async with connect() as db:
+        for start in range(0, len(task_ids), EXPORT_BATCH_SIZE):
+            chunk = task_ids[start:start + EXPORT_BATCH_SIZE]
+            marks = ', '.join('?' * len(chunk))
+            cursor = await db.execute(
+                f"""SELECT id FROM tasks WHERE guild_id = ? AND id IN ({marks})
+                    UNION SELECT id FROM tasks_archive WHERE guild_id = ? AND id IN ({marks})""",
+                (guild_id, *chunk, guild_id, *chunk)
+            )
+            existing.update(row[0] for row in await cursor.fetchall())
+    return existing
+
+
 async def get_task_by_thread_id(thread_id: int) -> Optional[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("SELECT * FROM tasks WHERE thread_id = ?", (thread_id,))
         row = await cursor.fetchone()
@@ -596,145 +1157,237 @@ async def get_task_by_thread_id(thread_id: int) -> Optional[Task]:
         return None
 
 
-async def get_tasks_by_game(game_acronym: str) -> List[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_tasks_by_game(guild_id: int, game_acronym: str) -> List[Task]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM tasks WHERE game_acronym = ? ORDER BY created_at DESC",
-            (game_acronym,)
+            "SELECT * FROM tasks WHERE guild_id = ? AND game_acronym = ? ORDER BY created_at DESC",
+            (guild_id, game_acronym)
         )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def get_tasks_by_assignee(assignee_id: int) -> List[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_tasks_by_assignee(guild_id: int, assignee_id: int) -> List[Task]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM tasks WHERE assignee_id = ? AND status NOT IN ('done', 'cancelled') ORDER BY deadline ASC",
-            (assignee_id,)
+            """SELECT * FROM tasks WHERE guild_id = ? AND assignee_id = ?
+               AND status NOT IN ('done', 'cancelled')
+               ORDER BY deadline_ts IS NULL, deadline_ts ASC""",
+            (guild_id, assignee_id)
         )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def get_tasks_by_status(status: str, game_acronym: str = None) -> List[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_tasks_by_status(guild_id: int, status: str, game_acronym: str = None) -> List[Task]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         if game_acronym:
             cursor = await db.execute(
-                "SELECT * FROM tasks WHERE status = ? AND game_acronym = ? ORDER BY created_at DESC",
-                (status, game_acronym)
+                """SELECT * FROM tasks WHERE guild_id = ? AND game_acronym = ? AND status = ?
+                   ORDER BY created_at DESC""",
+                (guild_id, game_acronym, status)
             )
         else:
             cursor = await db.execute(
-                "SELECT * FROM tasks WHERE status = ? ORDER BY created_at DESC",
-                (status,)
+                "SELECT * FROM tasks WHERE guild_id = ? AND status = ? ORDER BY created_at DESC",
+                (guild_id, status)
             )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def get_overdue_tasks() -> List[Task]:
+async def get_board_tasks(guild_id: int, game_acronym: str, statuses, limit: int) -> Dict[str, List[Task]]:
+    """Newest `limit` tasks of each status for a game, one indexed lookup per status."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        result = {}
+        for status in statuses:
+            cursor = await db.execute(
+                """SELECT * FROM tasks WHERE guild_id = ? AND game_acronym = ? AND status = ?
+                   ORDER BY id DESC LIMIT ?""",
+                (guild_id, game_acronym, status, limit)
+            )
+            result[status] = [_row_to_task(r) for r in await cursor.fetchall()]
+        return result
+
+
+async def get_game_task_counts(guild_id: int, game_acronym: str) -> Dict[str, int]:
+    """Task count per status for a game, read from game_task_counts."""
+    async with connect() as db:
+        cursor = await db.execute(
+            "SELECT status, n FROM game_task_counts WHERE guild_id = ? AND game_acronym = ? AND n > 0",
+            (guild_id, game_acronym)
+        )
+        return dict(await cursor.fetchall())
+
+
+async def get_task_counts(guild_id: int) -> Dict[str, int]:
+    """Task count per status across a guild's games."""
+    async with connect() as db:
+        cursor = await db.execute(
+            """SELECT status, SUM(n) FROM game_task_counts WHERE guild_id = ?
+               GROUP BY status HAVING SUM(n) > 0""",
+            (guild_id,)
+        )
+        return dict(await cursor.fetchall())
+
+
+async def get_overdue_tasks(guild_id: int) -> List[Task]:
     """Get tasks past deadline that are not done."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             """SELECT * FROM tasks 
-               WHERE status NOT IN ('done', 'cancelled')
-               AND deadline IS NOT NULL 
-               AND deadline < datetime('now')
-               ORDER BY deadline ASC"""
+               WHERE guild_id = ? AND deadline_ts < ?
+               AND status NOT IN ('done', 'cancelled')
+               ORDER BY deadline_ts ASC""",
+            (guild_id, int(time.time()))
         )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def get_tasks_due_soon(hours: int = 24) -> List[Task]:
-    """Get tasks due within the next N hours."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_tasks_due_soon(guild_id: int, hours: int = 24, limit: int = -1) -> List[Task]:
+    """Get tasks due within the next N hours, soonest first."""
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
+        now = int(time.time())
         cursor = await db.execute(
-            f"""SELECT * FROM tasks 
-               WHERE status NOT IN ('done', 'cancelled')
-               AND deadline IS NOT NULL 
-               AND deadline > datetime('now')
-               AND deadline <= datetime('now', '+{hours} hours')
-               ORDER BY deadline ASC"""
+            """SELECT * FROM tasks 
+               WHERE guild_id = ? AND deadline_ts > ? AND deadline_ts <= ?
+               AND status NOT IN ('done', 'cancelled')
+               ORDER BY deadline_ts ASC LIMIT ?""",
+            (guild_id, now, now + hours * 3600, limit)
         )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def get_stagnant_tasks(days: int = 3) -> List[Task]:
-    """Get in-progress tasks not updated in N days."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_stagnant_tasks(guild_id: int, days: int = 3, limit: int = -1) -> List[Task]:
+    """Get in-progress tasks not updated in N days, longest idle first."""
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            f"""SELECT * FROM tasks 
-               WHERE status = 'progress' 
-               AND updated_at < datetime('now', '-{days} days')
-               ORDER BY updated_at ASC"""
+            """SELECT * FROM tasks 
+               WHERE guild_id = ? AND status = 'progress' 
+               AND updated_ts < ?
+               ORDER BY updated_ts ASC LIMIT ?""",
+            (guild_id, int(time.time()) - days * 86400, limit)
         )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
+async def _enqueue_renders(db, task_id: int, targets=RENDER_ALL):
+    """Queue embed renders for a task inside the caller's transaction.
+
+    Pending renders coalesce per message: re-queueing an existing entry only
+    bumps its generation so the worker knows it must render again.
+    """
+    for target in targets:
+        if target == RENDER_BOARD:
+            await db.execute(
+                """INSERT INTO render_outbox (guild_id, target, ref)
+                   SELECT guild_id, ?, guild_id || ':' || game_acronym FROM tasks WHERE id = ?
+                   ON CONFLICT(target, ref) DO UPDATE SET
+                   generation = generation + 1,
+                   attempts = 0,
+                   next_attempt_at = CURRENT_TIMESTAMP""",
+                (RENDER_BOARD, task_id)
+            )
+        else:
+            await db.execute(
+                """INSERT INTO render_outbox (guild_id, target, ref)
+                   SELECT guild_id, ?, ? FROM tasks WHERE id = ?
+                   ON CONFLICT(target, ref) DO UPDATE SET
+                   generation = generation + 1,
+                   attempts = 0,
+                   next_attempt_at = CURRENT_TIMESTAMP""",
+                (target, str(task_id), task_id)
+            )
+
+
+async def _record_change(db, task_id: int, actor_id: Optional[int], action: str, column: str, new_value,
+                         expected_version: int = None):
+    """Write a history row capturing the column's current value before it changes."""
+    if actor_id is None:
+        return
+    await db.execute(
+        f"""INSERT INTO task_history (task_id, user_id, action, old_value, new_value)
+            SELECT id, ?, ?, {column}, ? FROM tasks
+            WHERE id = ? AND (? IS NULL OR version = ?)""",
+        (actor_id, action, new_value, task_id, expected_version, expected_version)
+    )
+
+
+async def _update_task_field(db, task_id: int, column: str, value, actor_id: Optional[int], action: str,
+                             expected_version: Optional[int], targets) -> bool:
+    """Compare-and-swap a single task column, bumping its version.
+
+    When expected_version is given and no longer matches, nothing is written and
+    False is returned so the caller can report the conflict.
+    """
+    await _record_change(db, task_id, actor_id, action, column, value, expected_version)
+    cursor = await db.execute(
+        f"""UPDATE tasks SET {column} = ?, {TOUCH_TASK}
+            WHERE id = ? AND (? IS NULL OR version = ?)""",
+        (value, task_id, expected_version, expected_version)
+    )
+    if cursor.rowcount == 0:
+        await db.rollback()
+        return False
+    await _enqueue_renders(db, task_id, targets)
+    await db.commit()
+    return True
+
+
 async def update_task_thread(task_id: int, thread_id: int, control_message_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
-            """UPDATE tasks SET thread_id = ?, control_message_id = ?, updated_at = CURRENT_TIMESTAMP 
-               WHERE id = ?""",
+            f"UPDATE tasks SET thread_id = ?, control_message_id = ?, {TOUCH_TASK} WHERE id = ?",
             (thread_id, control_message_id, task_id)
         )
+        await _enqueue_renders(db, task_id, (RENDER_BOARD,))
         await db.commit()
         return cursor.rowcount > 0
 
 
-async def update_task_status(task_id: int, status: str) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "UPDATE tasks SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (status, task_id)
+async def update_task_status(task_id: int, status: str, actor_id: int = None, expected_version: int = None) -> bool:
+    """Change task status, recording history and queueing renders atomically."""
+    async with connect() as db:
+        return await _update_task_field(
+            db, task_id, 'status', status, actor_id, 'status_change', expected_version, RENDER_ALL
         )
-        await db.commit()
-        return cursor.rowcount > 0
 
 
-async def update_task_eta(task_id: int, eta: str) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "UPDATE tasks SET eta = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (eta, task_id)
+async def update_task_eta(task_id: int, eta: str, actor_id: int = None, expected_version: int = None) -> bool:
+    async with connect() as db:
+        return await _update_task_field(
+            db, task_id, 'eta', eta, actor_id, 'eta_update', expected_version, (RENDER_CONTROL,)
         )
-        await db.commit()
-        return cursor.rowcount > 0
 
 
-async def update_task_assignee(task_id: int, assignee_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "UPDATE tasks SET assignee_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (assignee_id, task_id)
+async def update_task_assignee(task_id: int, assignee_id: int, expected_version: int = None) -> bool:
+    async with connect() as db:
+        return await _update_task_field(
+            db, task_id, 'assignee_id', assignee_id, None, 'reassign', expected_version, RENDER_ALL
         )
-        await db.commit()
-        return cursor.rowcount > 0
 
 
-async def update_task_priority(task_id: int, priority: str) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "UPDATE tasks SET priority = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (priority, task_id)
+async def update_task_priority(task_id: int, priority: str, actor_id: int = None, expected_version: int = None) -> bool:
+    async with connect() as db:
+        return await _update_task_field(
+            db, task_id, 'priority', priority, actor_id, 'priority_change', expected_version, RENDER_ALL
         )
-        await db.commit()
-        return cursor.rowcount > 0
 
 
 async def update_task_header_message(task_id: int, header_message_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
-            "UPDATE tasks SET header_message_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            f"UPDATE tasks SET header_message_id = ?, {TOUCH_TASK} WHERE id = ?",
             (header_message_id, task_id)
         )
         await db.commit()
@@ -742,7 +1395,12 @@ async def update_task_header_message(task_id: int, header_message_id: int) -> bo
 
 
 async def delete_task(task_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
+        await _enqueue_renders(db, task_id, (RENDER_BOARD,))
+        await db.execute(
+            "DELETE FROM render_outbox WHERE target IN (?, ?) AND ref = ?",
+            (RENDER_CONTROL, RENDER_HEADER, str(task_id))
+        )
         cursor = await db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
         await db.commit()
         return cursor.rowcount > 0
@@ -751,7 +1409,7 @@ async def delete_task(task_id: int) -> bool:
 # ============== TASK HISTORY ==============
 
 async def add_task_history(task_id: int, user_id: int, action: str, old_value: str = None, new_value: str = None):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT INTO task_history (task_id, user_id, action, old_value, new_value)
                VALUES (?, ?, ?, ?, ?)""",
@@ -761,10 +1419,10 @@ async def add_task_history(task_id: int, user_id: int, action: str, old_value: s
 
 
 async def get_task_history(task_id: int) -> List[TaskHistory]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM task_history WHERE task_id = ? ORDER BY timestamp DESC",
+            "SELECT * FROM task_history WHERE task_id = ? ORDER BY ts DESC, id DESC",
             (task_id,)
         )
         rows = await cursor.fetchall()
@@ -776,7 +1434,8 @@ async def get_task_history(task_id: int) -> List[TaskHistory]:
                 action=r["action"],
                 old_value=r["old_value"],
                 new_value=r["new_value"],
-                timestamp=r["timestamp"]
+                timestamp=r["timestamp"],
+                ts=r["ts"]
             )
             for r in rows
         ]
@@ -784,12 +1443,12 @@ async def get_task_history(task_id: int) -> List[TaskHistory]:
 
 # ============== TASK BOARDS ==============
 
-async def get_task_board(game_acronym: str) -> Optional[TaskBoard]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_task_board(guild_id: int, game_acronym: str) -> Optional[TaskBoard]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM task_boards WHERE game_acronym = ?",
-            (game_acronym,)
+            "SELECT * FROM task_boards WHERE guild_id = ? AND game_acronym = ?",
+            (guild_id, game_acronym)
         )
         row = await cursor.fetchone()
         if row:
@@ -797,40 +1456,49 @@ async def get_task_board(game_acronym: str) -> Optional[TaskBoard]:
                 id=row["id"],
                 game_acronym=row["game_acronym"],
                 channel_id=row["channel_id"],
-                message_ids=row["message_ids"]
+                message_ids=row["message_ids"],
+                guild_id=row["guild_id"]
             )
         return None
 
 
-async def upsert_task_board(game_acronym: str, channel_id: int, message_ids: str) -> TaskBoard:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def upsert_task_board(guild_id: int, game_acronym: str, channel_id: int, message_ids: str) -> TaskBoard:
+    async with connect() as db:
         await db.execute(
-            """INSERT INTO task_boards (game_acronym, channel_id, message_ids)
-               VALUES (?, ?, ?)
-               ON CONFLICT(game_acronym) DO UPDATE SET
+            """INSERT INTO task_boards (guild_id, game_acronym, channel_id, message_ids)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT(guild_id, game_acronym) DO UPDATE SET
                channel_id = excluded.channel_id,
                message_ids = excluded.message_ids""",
-            (game_acronym, channel_id, message_ids)
+            (guild_id, game_acronym, channel_id, message_ids)
         )
         await db.commit()
         return TaskBoard(
             id=None,
             game_acronym=game_acronym,
             channel_id=channel_id,
-            message_ids=message_ids
+            message_ids=message_ids,
+            guild_id=guild_id
         )
 
 
 # ============== TASK ASSIGNEES ==============
 
-async def add_task_assignee(task_id: int, user_id: int, is_primary: bool = False) -> TaskAssignee:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def add_task_assignee(task_id: int, user_id: int, is_primary: bool = False, actor_id: int = None) -> TaskAssignee:
+    async with connect() as db:
         cursor = await db.execute(
             """INSERT INTO task_assignees (task_id, user_id, is_primary)
                VALUES (?, ?, ?)
                ON CONFLICT(task_id, user_id) DO UPDATE SET is_primary = excluded.is_primary""",
             (task_id, user_id, is_primary)
         )
+        if actor_id is not None:
+            await db.execute(
+                """INSERT INTO task_history (task_id, user_id, action, old_value, new_value)
+                   VALUES (?, ?, 'add_assignee', NULL, ?)""",
+                (task_id, actor_id, str(user_id))
+            )
+        await _enqueue_renders(db, task_id, (RENDER_CONTROL, RENDER_HEADER))
         await db.commit()
         return TaskAssignee(
             id=cursor.lastrowid,
@@ -841,18 +1509,25 @@ async def add_task_assignee(task_id: int, user_id: int, is_primary: bool = False
         )
 
 
-async def remove_task_assignee(task_id: int, user_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def remove_task_assignee(task_id: int, user_id: int, actor_id: int = None) -> bool:
+    async with connect() as db:
         cursor = await db.execute(
             "DELETE FROM task_assignees WHERE task_id = ? AND user_id = ?",
             (task_id, user_id)
         )
+        if actor_id is not None and cursor.rowcount > 0:
+            await db.execute(
+                """INSERT INTO task_history (task_id, user_id, action, old_value, new_value)
+                   VALUES (?, ?, 'remove_assignee', ?, NULL)""",
+                (task_id, actor_id, str(user_id))
+            )
+        await _enqueue_renders(db, task_id, (RENDER_CONTROL, RENDER_HEADER))
         await db.commit()
         return cursor.rowcount > 0
 
 
 async def get_task_assignees(task_id: int) -> List[TaskAssignee]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM task_assignees WHERE task_id = ? ORDER BY is_primary DESC, added_at ASC",
@@ -873,7 +1548,7 @@ async def get_task_assignees(task_id: int) -> List[TaskAssignee]:
 
 
 async def get_task_primary_assignee(task_id: int) -> Optional[TaskAssignee]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM task_assignees WHERE task_id = ? AND is_primary = 1",
@@ -892,8 +1567,16 @@ async def get_task_primary_assignee(task_id: int) -> Optional[TaskAssignee]:
         return None
 
 
-async def set_task_primary_assignee(task_id: int, user_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def set_task_primary_assignee(task_id: int, user_id: int, actor_id: int = None) -> bool:
+    async with connect() as db:
+        if actor_id is not None:
+            await db.execute(
+                """INSERT INTO task_history (task_id, user_id, action, old_value, new_value)
+                   VALUES (?, ?, 'set_primary',
+                           (SELECT CAST(user_id AS TEXT) FROM task_assignees WHERE task_id = ? AND is_primary = 1),
+                           ?)""",
+                (task_id, actor_id, task_id, str(user_id))
+            )
         await db.execute(
             "UPDATE task_assignees SET is_primary = 0 WHERE task_id = ?",
             (task_id,)
@@ -902,22 +1585,31 @@ async def set_task_primary_assignee(task_id: int, user_id: int) -> bool:
             "UPDATE task_assignees SET is_primary = 1 WHERE task_id = ? AND user_id = ?",
             (task_id, user_id)
         )
+        await _enqueue_renders(db, task_id, (RENDER_CONTROL, RENDER_HEADER))
         await db.commit()
         return cursor.rowcount > 0
 
 
-async def clear_task_primary_assignee(task_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def clear_task_primary_assignee(task_id: int, actor_id: int = None) -> bool:
+    async with connect() as db:
+        if actor_id is not None:
+            await db.execute(
+                """INSERT INTO task_history (task_id, user_id, action, old_value, new_value)
+                   SELECT task_id, ?, 'remove_primary', CAST(user_id AS TEXT), NULL
+                   FROM task_assignees WHERE task_id = ? AND is_primary = 1""",
+                (actor_id, task_id)
+            )
         cursor = await db.execute(
             "UPDATE task_assignees SET is_primary = 0 WHERE task_id = ?",
             (task_id,)
         )
+        await _enqueue_renders(db, task_id, (RENDER_CONTROL, RENDER_HEADER))
         await db.commit()
         return cursor.rowcount > 0
 
 
 async def set_task_assignee_approval(task_id: int, user_id: int, approved: bool) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
             "UPDATE task_assignees SET has_approved = ? WHERE task_id = ? AND user_id = ?",
             (approved, task_id, user_id)
@@ -940,7 +1632,7 @@ async def get_task_approval_status(task_id: int) -> dict:
 
 
 async def reset_task_approvals(task_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
             "UPDATE task_assignees SET has_approved = 0 WHERE task_id = ?",
             (task_id,)
@@ -950,7 +1642,7 @@ async def reset_task_approvals(task_id: int) -> bool:
 
 
 async def is_user_task_assignee(task_id: int, user_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT 1 FROM task_assignees WHERE task_id = ? AND user_id = ?",
             (task_id, user_id)
@@ -958,34 +1650,50 @@ async def is_user_task_assignee(task_id: int, user_id: int) -> bool:
         return await cursor.fetchone() is not None
 
 
-async def get_tasks_by_assignee_multi(user_id: int) -> List[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_tasks_by_assignee_multi(guild_id: int, user_id: int) -> List[Task]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             """SELECT t.* FROM tasks t
                JOIN task_assignees ta ON t.id = ta.task_id
-               WHERE ta.user_id = ? AND t.status NOT IN ('done', 'cancelled')
-               ORDER BY t.deadline ASC""",
-            (user_id,)
+               WHERE ta.user_id = ? AND t.guild_id = ? AND t.status NOT IN ('done', 'cancelled')
+               ORDER BY t.deadline_ts IS NULL, t.deadline_ts ASC""",
+            (user_id, guild_id)
+        )
+        rows = await cursor.fetchall()
+        return [_row_to_task(r) for r in rows]
+
+
+async def get_open_tasks() -> List[Task]:
+    """Open tasks across all guilds, for re-attaching persistent views on startup."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM tasks WHERE status IN ('todo', 'progress', 'review') ORDER BY id"
         )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def get_all_tasks() -> List[Task]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_all_tasks(guild_id: int) -> List[Task]:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM tasks ORDER BY created_at DESC")
+        cursor = await db.execute(
+            "SELECT * FROM tasks WHERE guild_id = ? ORDER BY created_at DESC", (guild_id,)
+        )
         rows = await cursor.fetchall()
         return [_row_to_task(r) for r in rows]
 
 
-async def migrate_tasks_to_multi_assignee() -> dict:
-    """Migrate existing tasks to multi-assignee system. Returns stats."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def migrate_tasks_to_multi_assignee(guild_id: int) -> dict:
+    """Migrate a guild's existing tasks to multi-assignee system. Returns stats."""
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         
-        cursor = await db.execute("SELECT id, assignee_id FROM tasks WHERE assignee_id IS NOT NULL")
+        cursor = await db.execute(
+            "SELECT id, assignee_id FROM tasks WHERE guild_id = ? AND assignee_id IS NOT NULL",
+            (guild_id,)
+        )
         tasks = await cursor.fetchall()
         
         migrated = 0
@@ -1011,10 +1719,479 @@ async def migrate_tasks_to_multi_assignee() -> dict:
         return {"migrated": migrated, "skipped": skipped, "total": len(tasks)}
 
 
+# ============== TASK STATS ==============
+
+def _bucket_sql(expr: str) -> str:
+    cases = ' '.join(f"WHEN {expr} <= {bound} THEN {i}" for i, bound in enumerate(STATS_BUCKETS))
+    return f"CASE {cases} ELSE {len(STATS_BUCKETS)} END"
+
+
+async def refresh_task_stats() -> int:
+    """Roll status changes recorded since the last run into task_duration_daily.
+
+    One windowed pass pairs each new status_change with the previous change of the
+    same task (or the task's creation) to get the time spent in the old status.
+    The watermark moves with a compare-and-swap in the same transaction, so
+    concurrent refreshes never count a change twice. Returns history rows covered.
+    """
+    async with connect() as db:
+        cursor = await db.execute("SELECT value FROM stats_state WHERE key = 'history_rollup'")
+        row = await cursor.fetchone()
+        low = row[0] if row else 0
+        cursor = await db.execute("SELECT MAX(id) FROM task_history")
+        high = (await cursor.fetchone())[0] or 0
+        if high <= low:
+            return 0
+
+        cursor = await db.execute(
+            """INSERT INTO stats_state (key, value) VALUES ('history_rollup', ?)
+               ON CONFLICT(key) DO UPDATE SET value = excluded.value WHERE value = ?""",
+            (high, low)
+        )
+        if cursor.rowcount == 0:
+            await db.rollback()
+            return 0
+
+        await db.execute(
+            f"""WITH transitions AS (
+                    SELECT h.id, h.task_id, h.old_value, h.new_value, h.ts,
+                           LAG(h.ts) OVER (PARTITION BY h.task_id ORDER BY h.id) AS prev_ts
+                    FROM task_history h
+                    WHERE h.action = 'status_change' AND h.id <= :high
+                      AND h.task_id IN (
+                          SELECT task_id FROM task_history
+                          WHERE id > :low AND id <= :high AND action = 'status_change'
+                      )
+                ),
+                samples AS (
+                    SELECT t.guild_id, t.game_acronym, tr.ts / 86400 AS day,
+                           COALESCE(tr.old_value, 'todo') AS metric,
+                           MAX(tr.ts - COALESCE(tr.prev_ts, t.created_ts), 0) AS seconds
+                    FROM transitions tr JOIN tasks t ON t.id = tr.task_id
+                    WHERE tr.id > :low
+                    UNION ALL
+                    SELECT t.guild_id, t.game_acronym, tr.ts / 86400, 'lead', MAX(tr.ts - t.created_ts, 0)
+                    FROM transitions tr JOIN tasks t ON t.id = tr.task_id
+                    WHERE tr.id > :low AND tr.new_value = 'done'
+                )
+                INSERT INTO task_duration_daily (guild_id, game_acronym, day, metric, bucket, n, seconds)
+                SELECT guild_id, game_acronym, day, metric, {_bucket_sql('seconds')}, COUNT(*), SUM(seconds)
+                FROM samples WHERE seconds IS NOT NULL
+                GROUP BY 1, 2, 3, 4, 5
+                ON CONFLICT(guild_id, day, game_acronym, metric, bucket) DO UPDATE SET
+                n = n + excluded.n,
+                seconds = seconds + excluded.seconds""",
+            {'low': low, 'high': high}
+        )
+        await db.commit()
+        return high - low
+
+
+async def get_task_stats(guild_id: int, game_acronym: str = None, since_day: int = 0) -> dict:
+    """Merged duration histograms and weekly throughput from the daily rollup.
+
+    Returns {'histograms': {metric: [n per bucket]}, 'seconds': {metric: total},
+    'weekly': [(week start epoch, tasks done)]}. Weeks start on Monday.
+    """
+    async with connect() as db:
+        cursor = await db.execute(
+            """SELECT metric, bucket, SUM(n), SUM(seconds) FROM task_duration_daily
+               WHERE guild_id = ? AND day >= ? AND (? IS NULL OR game_acronym = ?)
+               GROUP BY metric, bucket""",
+            (guild_id, since_day, game_acronym, game_acronym)
+        )
+        histograms = {}
+        seconds = {}
+        for metric, bucket, n, total in await cursor.fetchall():
+            histograms.setdefault(metric, [0] * (len(STATS_BUCKETS) + 1))[bucket] = n
+            seconds[metric] = seconds.get(metric, 0) + total
+
+        # Epoch day 0 was a Thursday, so +3 aligns weeks to Monday
+        cursor = await db.execute(
+            """SELECT (day + 3) / 7 AS week, SUM(n) FROM task_duration_daily
+               WHERE guild_id = ? AND day >= ? AND metric = 'lead' AND (? IS NULL OR game_acronym = ?)
+               GROUP BY week ORDER BY week""",
+            (guild_id, since_day, game_acronym, game_acronym)
+        )
+        weekly = [((week * 7 - 3) * 86400, n) for week, n in await cursor.fetchall()]
+        return {'histograms': histograms, 'seconds': seconds, 'weekly': weekly}
+
+
+async def get_assignee_load(guild_id: int, game_acronym: str = None, limit: int = 10) -> List[tuple]:
+    """(user_id, open, in progress, in review) for the busiest assignees."""
+    async with connect() as db:
+        cursor = await db.execute(
+            """SELECT ta.user_id, COUNT(*) AS open,
+                      SUM(t.status = 'progress'), SUM(t.status = 'review')
+               FROM task_assignees ta JOIN tasks t ON t.id = ta.task_id
+               WHERE t.guild_id = ? AND t.status NOT IN ('done', 'cancelled')
+                 AND (? IS NULL OR t.game_acronym = ?)
+               GROUP BY ta.user_id
+               ORDER BY open DESC
+               LIMIT ?""",
+            (guild_id, game_acronym, game_acronym, limit)
+        )
+        return await cursor.fetchall()
+
+
+# ============== TASK SEARCH ==============
+
+def _search_expression(text: str, column: str = None) -> Optional[str]:
+    """Turn user input into an FTS5 expression: all words must match, the last as a prefix."""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    expression = ' '.join(terms)
+    return f'{column} : ({expression})' if column else expression
+
+
+async def search_tasks(
+    guild_id: int,
+    query: str,
+    game_acronym: str = None,
+    status: str = None,
+    limit: int = 10,
+    offset: int = 0,
+    include_archive: bool = False
+) -> List[Task]:
+    """Full-text search over tasks, best matches first.
+
+    bm25 has to score every match, so queries matching more than
+    SEARCH_RANK_LIMIT of the guild's tasks are listed newest first instead. Archived tasks
+    are only returned with include_archive.
+    """
+    expression = _search_expression(query)
+    if not expression:
+        return []
+    # Each table is joined separately so both keep rowid lookups; a UNION ALL
+    # subquery would be materialized in full before the join. CROSS JOIN keeps
+    # the match as the outer loop: driven from the guild index instead, SQLite
+    # would re-run the full-text query once per task of the guild.
+    tables = ("tasks", "tasks_archive") if include_archive else ("tasks",)
+
+    def branches(columns: str) -> str:
+        return " UNION ALL ".join(
+            f"""SELECT {columns}
+                FROM task_search s CROSS JOIN {table} t ON t.id = s.rowid
+                WHERE task_search MATCH :expression
+                  AND t.guild_id = :guild
+                  AND (:game IS NULL OR t.game_acronym = :game)
+                  AND (:status IS NULL OR t.status = :status)"""
+            for table in tables
+        )
+
+    params = {'expression': expression, 'guild': guild_id, 'game': game_acronym, 'status': status}
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        # Count the rows the results query would rank, not every match in the guild
+        cursor = await db.execute(
+            f"SELECT COUNT(*) FROM ({branches('1')} LIMIT :rank_limit)",
+            dict(params, rank_limit=SEARCH_RANK_LIMIT + 1)
+        )
+        order = "search_rank" if (await cursor.fetchone())[0] <= SEARCH_RANK_LIMIT else "search_rowid DESC"
+        columns = ', '.join('t.' + c for c in TASK_COLUMNS.split(', '))
+        cursor = await db.execute(
+            f"{branches(columns + ', s.rank AS search_rank, s.rowid AS search_rowid')} "
+            f"ORDER BY {order} LIMIT :limit OFFSET :offset",
+            dict(params, limit=limit, offset=offset)
+        )
+        rows = await cursor.fetchall()
+        return [_row_to_task(r) for r in rows]
+
+
+async def suggest_tasks(guild_id: int, current: str, limit: int = 25) -> List[tuple]:
+    """(id, title) pairs for task ID autocomplete: exact ID, else title prefix match, else newest."""
+    async with connect() as db:
+        if current.strip().isdigit():
+            cursor = await db.execute(
+                "SELECT id, title FROM tasks WHERE id = ? AND guild_id = ?", (int(current.strip()), guild_id)
+            )
+            rows = await cursor.fetchall()
+            if rows:
+                return rows
+        expression = _search_expression(current, column='title')
+        if expression:
+            cursor = await db.execute(
+                """SELECT s.rowid, s.title FROM task_search s CROSS JOIN tasks t ON t.id = s.rowid
+                   WHERE task_search MATCH ? AND t.guild_id = ? ORDER BY s.rank LIMIT ?""",
+                (expression, guild_id, limit)
+            )
+        else:
+            cursor = await db.execute(
+                "SELECT id, title FROM tasks WHERE guild_id = ? ORDER BY id DESC LIMIT ?", (guild_id, limit)
+            )
+        return await cursor.fetchall()
+
+
+# ============== TASK EXPORT ==============
+
+_EXPORT_HISTORY_SQL = """,
+    (SELECT json_group_array(json_object(
+         'user_id', CAST(h.user_id AS TEXT), 'action', h.action,
+         'old_value', h.old_value, 'new_value', h.new_value, 'timestamp', h.timestamp))
+     FROM (SELECT * FROM {history} WHERE task_id = t.id ORDER BY id) h) AS history"""
+
+# (tasks, history, assignees) tables read by an export, live first
+_EXPORT_SOURCES = (('tasks', 'task_history', 'task_assignees'),)
+_EXPORT_ARCHIVE_SOURCES = _EXPORT_SOURCES + (
+    ('tasks_archive', 'task_history_archive', 'task_assignees_archive'),
+)
+
+
+async def iter_task_export_rows(
+    guild_id: int,
+    game_acronym: str = None,
+    status: str = None,
+    include_history: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    include_archive: bool = False
+) -> AsyncIterator[dict]:
+    """Yield tasks as import-compatible dicts, one keyset page at a time.
+
+    Assignees and history are aggregated in SQL so each page is a single query.
+    Pages are separate statements, so the read lock is released between them
+    and writers are not blocked for the length of a large export. With
+    include_archive, archived tasks follow the live ones.
+    """
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        for tasks_table, history_table, assignees_table in (
+            _EXPORT_ARCHIVE_SOURCES if include_archive else _EXPORT_SOURCES
+        ):
+            history_sql = _EXPORT_HISTORY_SQL.format(history=history_table) if include_history else ''
+            query = f"""
+                SELECT t.id, t.game_acronym, t.title, t.description, t.assignee_id,
+                       t.target_channel_id, t.status, t.deadline, t.eta, t.priority,
+                       t.created_at, t.updated_at,
+                       (SELECT group_concat(user_id) FROM (
+                            SELECT user_id FROM {assignees_table}
+                            WHERE task_id = t.id AND user_id != t.assignee_id
+                            ORDER BY is_primary DESC, added_at ASC
+                       )) AS additional_assignees{history_sql}
+                FROM {tasks_table} t
+                WHERE t.id > ? AND t.guild_id = ?
+                  AND (? IS NULL OR t.game_acronym = ?)
+                  AND (? IS NULL OR t.status = ?)
+                ORDER BY t.id
+                LIMIT ?
+            """
+            async for row in _iter_export_pages(db, query, guild_id, game_acronym, status, include_history,
+                                                batch_size):
+                yield row
+
+
+async def _iter_export_pages(db, query: str, guild_id: int, game_acronym: str, status: str,
+                             include_history: bool, batch_size: int) -> AsyncIterator[dict]:
+    last_id = 0
+    while True:
+        cursor = await db.execute(
+            query, (last_id, guild_id, game_acronym, game_acronym, status, status, batch_size)
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        for r in rows:
+            row = {
+                'id': r["id"],
+                'game': r["game_acronym"],
+                'title': r["title"],
+                'description': r["description"] or '',
+                'assignee_id': str(r["assignee_id"]),
+                'target_channel_id': str(r["target_channel_id"]),
+                'additional_assignees': r["additional_assignees"] or '',
+                'status': r["status"],
+                'deadline': r["deadline"],
+                'eta': r["eta"],
+                'priority': r["priority"],
+                'created_at': r["created_at"],
+                'updated_at': r["updated_at"],
+            }
+            if include_history:
+                row['history'] = json.loads(r["history"])
+            yield row
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+# ============== TASK ARCHIVE ==============
+
+async def archive_closed_tasks(older_than_days: int, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move done/cancelled tasks untouched for older_than_days into the archive tables.
+
+    Each batch is one transaction that copies the tasks with their history and
+    assignees, deletes the originals and drops their pending message renders.
+    The search index keeps archived tasks; status counts and boards lose them.
+    Returns the number of tasks archived.
+    """
+    # History is about to leave task_history, so fold it into the stats rollup first
+    await refresh_task_stats()
+    cutoff = int(time.time()) - older_than_days * 86400
+    archived = 0
+    async with connect() as db:
+        while True:
+            cursor = await db.execute(
+                """SELECT id, guild_id, game_acronym FROM tasks
+                   WHERE status IN ('done', 'cancelled') AND updated_ts < ?
+                   LIMIT ?""",
+                (cutoff, batch_size)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                break
+            ids = [r[0] for r in rows]
+            marks = ','.join('?' * len(ids))
+            await db.execute(
+                f"""INSERT INTO tasks_archive ({TASK_COLUMNS}, archived_ts)
+                    SELECT {TASK_COLUMNS}, {NOW_TS} FROM tasks WHERE id IN ({marks})""",
+                ids
+            )
+            await db.execute(
+                f"""INSERT INTO task_history_archive ({TASK_HISTORY_COLUMNS})
+                    SELECT {TASK_HISTORY_COLUMNS} FROM task_history WHERE task_id IN ({marks})""",
+                ids
+            )
+            await db.execute(
+                f"""INSERT INTO task_assignees_archive ({TASK_ASSIGNEE_COLUMNS})
+                    SELECT {TASK_ASSIGNEE_COLUMNS} FROM task_assignees WHERE task_id IN ({marks})""",
+                ids
+            )
+            await db.execute(f"DELETE FROM task_history WHERE task_id IN ({marks})", ids)
+            await db.execute(f"DELETE FROM task_assignees WHERE task_id IN ({marks})", ids)
+            await db.execute(
+                f"DELETE FROM render_outbox WHERE target IN (?, ?) AND ref IN ({marks})",
+                [RENDER_CONTROL, RENDER_HEADER] + [str(i) for i in ids]
+            )
+            await db.execute(f"DELETE FROM tasks WHERE id IN ({marks})", ids)
+            for guild_id, game_acronym in {(r[1], r[2]) for r in rows}:
+                await db.execute(
+                    """INSERT INTO render_outbox (guild_id, target, ref) VALUES (?, ?, ?)
+                       ON CONFLICT(target, ref) DO UPDATE SET
+                       generation = generation + 1,
+                       attempts = 0,
+                       next_attempt_at = CURRENT_TIMESTAMP""",
+                    (guild_id, RENDER_BOARD, board_ref(guild_id, game_acronym))
+                )
+            await db.commit()
+            archived += len(ids)
+            if len(rows) < batch_size:
+                break
+    return archived
+
+
+async def incremental_vacuum(max_pages: int = VACUUM_PAGES_PER_STEP) -> int:
+    """Release up to max_pages free pages back to the filesystem. Returns how many were freed."""
+    async with connect() as db:
+        cursor = await db.execute("PRAGMA freelist_count")
+        before = (await cursor.fetchone())[0]
+        cursor = await db.execute(f"PRAGMA incremental_vacuum({int(max_pages)})")
+        await cursor.fetchall()
+        cursor = await db.execute("PRAGMA freelist_count")
+        return before - (await cursor.fetchone())[0]
+
+
+# ============== RENDER OUTBOX ==============
+
+def _row_to_outbox_entry(r) -> OutboxEntry:
+    return OutboxEntry(
+        id=r["id"],
+        target=r["target"],
+        ref=r["ref"],
+        guild_id=r["guild_id"],
+        generation=r["generation"],
+        attempts=r["attempts"],
+        created_at=r["created_at"]
+    )
+
+
+async def enqueue_task_renders(task_id: int, targets=RENDER_ALL):
+    """Queue renders for a task outside of a state change (e.g. after creation)."""
+    async with connect() as db:
+        await _enqueue_renders(db, task_id, targets)
+        await db.commit()
+
+
+def board_ref(guild_id: int, game_acronym: str) -> str:
+    """render_outbox ref of a game's board."""
+    return f"{guild_id}:{game_acronym}"
+
+
+def parse_board_ref(ref: str) -> tuple:
+    """(guild_id, game_acronym) from a board render ref."""
+    guild_id, game_acronym = ref.split(':', 1)
+    return int(guild_id), game_acronym
+
+
+async def enqueue_board_render(guild_id: int, game_acronym: str):
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO render_outbox (guild_id, target, ref) VALUES (?, ?, ?)
+               ON CONFLICT(target, ref) DO UPDATE SET
+               generation = generation + 1,
+               attempts = 0,
+               next_attempt_at = CURRENT_TIMESTAMP""",
+            (guild_id, RENDER_BOARD, board_ref(guild_id, game_acronym))
+        )
+        await db.commit()
+
+
+def _shard_filter(shards) -> tuple:
+    """SQL condition (with a leading AND) and params restricting guild_id to some shards."""
+    if not shards:
+        return '', []
+    shard_ids, shard_count = shards
+    return f"AND (guild_id >> 22) % ? IN ({','.join('?' * len(shard_ids))})", [shard_count, *shard_ids]
+
+
+async def get_pending_renders(limit: int = 100, shards=None) -> List[OutboxEntry]:
+    """Get renders that are due, oldest first.
+
+    shards is (shard IDs, shard count) from sharding.local_shards; when given,
+    only renders for guilds on those shards are returned.
+    """
+    shard_filter, params = _shard_filter(shards)
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"""SELECT * FROM render_outbox
+                WHERE next_attempt_at <= CURRENT_TIMESTAMP {shard_filter}
+                ORDER BY id ASC LIMIT ?""",
+            (*params, limit)
+        )
+        rows = await cursor.fetchall()
+        return [_row_to_outbox_entry(r) for r in rows]
+
+
+async def complete_render(entry: OutboxEntry) -> bool:
+    """Remove an applied render unless it was re-queued while being applied."""
+    async with connect() as db:
+        cursor = await db.execute(
+            "DELETE FROM render_outbox WHERE id = ? AND generation = ?",
+            (entry.id, entry.generation)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def defer_render(entry: OutboxEntry, delay_seconds: int) -> bool:
+    """Push a failed render back for a later retry."""
+    async with connect() as db:
+        cursor = await db.execute(
+            """UPDATE render_outbox SET
+               attempts = attempts + 1,
+               next_attempt_at = datetime('now', ?)
+               WHERE id = ? AND generation = ?""",
+            (f"+{int(delay_seconds)} seconds", entry.id, entry.generation)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
 # ============== SERVER CONFIG ==============
 
 async def get_server_config(guild_id: int) -> Optional[ServerConfig]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM server_config WHERE guild_id = ?",
@@ -1031,8 +2208,66 @@ async def get_server_config(guild_id: int) -> Optional[ServerConfig]:
         return None
 
 
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _settings_from_config(guild_id: int, config: Optional[ServerConfig]) -> GuildSettings:
+    if not config:
+        return GuildSettings(guild_id=guild_id)
+    try:
+        cfg = json.loads(config.config_json or '{}')
+    except json.JSONDecodeError:
+        cfg = {}
+    defaults = GuildSettings(guild_id=guild_id)
+    return GuildSettings(
+        guild_id=guild_id,
+        setup_completed=config.setup_completed,
+        channel_mode=cfg.get('channel_mode') or defaults.channel_mode,
+        board_channel_template=cfg.get('board_channel_template') or defaults.board_channel_template,
+        questions_channel_template=cfg.get('questions_channel_template') or defaults.questions_channel_template,
+        leads_channel_template=cfg.get('leads_channel_template') or defaults.leads_channel_template,
+        global_board_channel_id=_int_or_none(cfg.get('global_board_channel_id')),
+        global_questions_channel_id=_int_or_none(cfg.get('global_questions_channel_id')),
+        global_leads_channel_id=_int_or_none(cfg.get('global_leads_channel_id')),
+        lead_role_ids=frozenset(
+            rid for rid in map(_int_or_none, cfg.get('lead_role_ids') or []) if rid is not None
+        ),
+        approval_mode=cfg.get('approval_mode') or defaults.approval_mode,
+        approval_threshold=_int_or_none(cfg.get('approval_threshold')),
+    )
+
+
+# Parsed settings per guild with when they were loaded (monotonic seconds);
+# upsert_server_config drops the entry it writes
+_guild_settings: Dict[int, tuple] = {}
+
+
+async def get_guild_settings(guild_id: int) -> GuildSettings:
+    """Typed settings for a guild, read and parsed once and then served from memory.
+
+    Entries are reloaded after CACHE_TTL_SECONDS so settings saved by another
+    replica take effect. An unchanged reload keeps the same object, which the
+    permission cache uses to tell whether lead roles need recomputing.
+    """
+    cached = _guild_settings.get(guild_id)
+    now = time.monotonic()
+    fresh = cached is not None and now - cached[1] < CACHE_TTL_SECONDS
+    cache_lookup('guild_settings', fresh)
+    if fresh:
+        return cached[0]
+    settings = _settings_from_config(guild_id, await get_server_config(guild_id))
+    if cached is not None and cached[0] == settings:
+        settings = cached[0]
+    _guild_settings[guild_id] = (settings, now)
+    return settings
+
+
 async def upsert_server_config(guild_id: int, config_json: str, setup_completed: bool = False) -> ServerConfig:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT INTO server_config (guild_id, config_json, setup_completed)
                VALUES (?, ?, ?)
@@ -1043,6 +2278,7 @@ async def upsert_server_config(guild_id: int, config_json: str, setup_completed:
             (guild_id, config_json, setup_completed)
         )
         await db.commit()
+        _guild_settings.pop(guild_id, None)
         return ServerConfig(
             id=None,
             guild_id=guild_id,
@@ -1052,6 +2288,280 @@ async def upsert_server_config(guild_id: int, config_json: str, setup_completed:
 
 
 async def is_setup_completed(guild_id: int) -> bool:
-    config = await get_server_config(guild_id)
-    return config.setup_completed if config else False
+    return (await get_guild_settings(guild_id)).setup_completed
+
+
+# ============== GUILDS ==============
+
+async def claim_unassigned_rows(guild_id: int) -> int:
+    """Hand rows from before guild partitioning to guild_id. Returns the number of tasks claimed.
+
+    Games and boards whose acronym the guild already uses stay unassigned.
+    The shared template and groups replace the guild's defaults.
+    Status counts follow the tasks through their update trigger.
+    """
+    async with connect() as db:
+        cursor = await db.execute("SELECT 1 FROM groups WHERE guild_id = ? LIMIT 1", (UNASSIGNED_GUILD,))
+        if await cursor.fetchone():
+            for table in ('groups', 'template_channels'):
+                await db.execute(f"DELETE FROM {table} WHERE guild_id = ?", (guild_id,))
+                await db.execute(f"UPDATE {table} SET guild_id = ? WHERE guild_id = ?", (guild_id, UNASSIGNED_GUILD))
+            _seeded_guilds.add(guild_id)
+        cursor = await db.execute(
+            "UPDATE tasks SET guild_id = ? WHERE guild_id = ?", (guild_id, UNASSIGNED_GUILD)
+        )
+        claimed = cursor.rowcount
+        for table in ('tasks_archive', 'games', 'task_boards'):
+            await db.execute(
+                f"UPDATE OR IGNORE {table} SET guild_id = ? WHERE guild_id = ?", (guild_id, UNASSIGNED_GUILD)
+            )
+        await db.execute(
+            """INSERT INTO task_duration_daily (guild_id, game_acronym, day, metric, bucket, n, seconds)
+               SELECT ?, game_acronym, day, metric, bucket, n, seconds
+               FROM task_duration_daily WHERE guild_id = ?
+               ON CONFLICT(guild_id, day, game_acronym, metric, bucket) DO UPDATE SET
+               n = n + excluded.n,
+               seconds = seconds + excluded.seconds""",
+            (guild_id, UNASSIGNED_GUILD)
+        )
+        await db.execute("DELETE FROM task_duration_daily WHERE guild_id = ?", (UNASSIGNED_GUILD,))
+        await db.execute("DELETE FROM game_task_counts WHERE guild_id = ?", (UNASSIGNED_GUILD,))
+        await db.execute(
+            """UPDATE OR IGNORE render_outbox SET ref = ? || substr(ref, instr(ref, ':'))
+               WHERE target = ? AND ref LIKE ?""",
+            (str(guild_id), RENDER_BOARD, f"{UNASSIGNED_GUILD}:%")
+        )
+        await db.execute(
+            "UPDATE render_outbox SET guild_id = ? WHERE guild_id = ?", (guild_id, UNASSIGNED_GUILD)
+        )
+        await db.commit()
+        return claimed
+
+
+# ============== LEASES ==============
+
+async def acquire_lease(name: str, holder: str, ttl_seconds: int) -> bool:
+    """Take or renew the lease for ttl_seconds. True if holder owns it afterwards.
+
+    A single upsert, so two replicas racing for a free or expired lease cannot
+    both win; a live lease held by someone else is left untouched.
+    """
+    async with connect() as db:
+        cursor = await db.execute(
+            f"""INSERT INTO leases (name, holder, acquired_ts, expires_ts)
+                VALUES (?, ?, {NOW_TS}, {NOW_TS} + ?)
+                ON CONFLICT(name) DO UPDATE SET
+                holder = excluded.holder,
+                acquired_ts = CASE WHEN leases.holder = excluded.holder
+                                   THEN leases.acquired_ts ELSE excluded.acquired_ts END,
+                expires_ts = excluded.expires_ts
+                WHERE leases.holder = excluded.holder OR leases.expires_ts <= {NOW_TS}""",
+            (name, holder, ttl_seconds)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def release_lease(name: str, holder: str) -> bool:
+    """Give up the lease if holder still owns it, so another replica can take it immediately."""
+    async with connect() as db:
+        cursor = await db.execute(
+            "DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+# ============== JOBS ==============
+
+def _row_to_job(r) -> Job:
+    return Job(
+        id=r["id"],
+        kind=r["kind"],
+        guild_id=r["guild_id"],
+        payload=json.loads(r["payload"]),
+        status=r["status"],
+        priority=r["priority"],
+        attempts=r["attempts"],
+        max_attempts=r["max_attempts"],
+        error=r["error"],
+        created_ts=r["created_ts"],
+        run_after_ts=r["run_after_ts"]
+    )
+
+
+async def enqueue_job(kind: str, guild_id: int, payload: dict = None, priority: int = JOB_PRIORITY_NORMAL,
+                      max_attempts: int = 5, max_pending: Optional[int] = None) -> Optional[int]:
+    """Queue a job. Returns its id, or None if an identical job is still pending.
+
+    With max_pending, raises ValueError when the guild already has that many
+    jobs waiting, so bursts of commands are pushed back instead of piling up.
+    """
+    payload_json = json.dumps(payload or {}, sort_keys=True)
+    async with connect() as db:
+        if max_pending is not None:
+            cursor = await db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE guild_id = ? AND status IN ('pending', 'running')",
+                (guild_id,)
+            )
+            if (await cursor.fetchone())[0] >= max_pending:
+                raise ValueError(f"This server already has {max_pending} jobs queued; try again later.")
+        cursor = await db.execute(
+            f"""INSERT INTO jobs (kind, guild_id, payload, priority, max_attempts, created_ts)
+                SELECT ?, ?, ?, ?, ?, {NOW_TS}
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM jobs
+                    WHERE status = 'pending' AND kind = ? AND guild_id = ? AND payload = ?
+                )""",
+            (kind, guild_id, payload_json, priority, max_attempts, kind, guild_id, payload_json)
+        )
+        await db.commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+
+async def claim_job(kinds, visibility_seconds: int, shards=None) -> Optional[Job]:
+    """Claim the next runnable job of one of kinds, hiding it for visibility_seconds.
+
+    Runnable means pending and past its retry delay, or running with an expired
+    lock. Expired jobs that already used all their attempts are dead-lettered first.
+    """
+    kinds = list(kinds)
+    kind_filter = ','.join('?' * len(kinds))
+    shard_filter, shard_params = _shard_filter(shards)
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        await db.execute(
+            f"""UPDATE jobs SET status = 'dead', finished_ts = {NOW_TS},
+                error = COALESCE(error, 'visibility timeout expired')
+                WHERE status = 'running' AND locked_until_ts <= {NOW_TS} AND attempts >= max_attempts"""
+        )
+        cursor = await db.execute(
+            f"""UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                started_ts = {NOW_TS}, locked_until_ts = {NOW_TS} + ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE ((status = 'pending' AND run_after_ts <= {NOW_TS})
+                           OR (status = 'running' AND locked_until_ts <= {NOW_TS}))
+                      AND kind IN ({kind_filter}) {shard_filter}
+                    ORDER BY priority, id LIMIT 1
+                )
+                RETURNING *""",
+            (visibility_seconds, *kinds, *shard_params)
+        )
+        row = await cursor.fetchone()
+        await db.commit()
+        return _row_to_job(row) if row else None
+
+
+async def extend_job_lock(job: Job, visibility_seconds: int) -> bool:
+    """Keep a running job hidden. False if it was reclaimed after its lock expired."""
+    async with connect() as db:
+        cursor = await db.execute(
+            f"""UPDATE jobs SET locked_until_ts = {NOW_TS} + ?
+                WHERE id = ? AND status = 'running' AND attempts = ?""",
+            (visibility_seconds, job.id, job.attempts)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def complete_job(job: Job) -> bool:
+    async with connect() as db:
+        cursor = await db.execute(
+            f"""UPDATE jobs SET status = 'done', error = NULL, finished_ts = {NOW_TS}, locked_until_ts = NULL
+                WHERE id = ? AND status = 'running' AND attempts = ?""",
+            (job.id, job.attempts)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def fail_job(job: Job, error: str, retry_delay_seconds: int) -> str:
+    """Schedule a retry after retry_delay_seconds, or dead-letter the job if it is out of attempts.
+
+    Returns the job's new status.
+    """
+    status = 'pending' if job.attempts < job.max_attempts else 'dead'
+    async with connect() as db:
+        await db.execute(
+            f"""UPDATE jobs SET status = ?, error = ?, locked_until_ts = NULL,
+                run_after_ts = {NOW_TS} + ?,
+                finished_ts = CASE WHEN ? = 'dead' THEN {NOW_TS} END
+                WHERE id = ? AND status = 'running' AND attempts = ?""",
+            (status, error[:1000], retry_delay_seconds, status, job.id, job.attempts)
+        )
+        await db.commit()
+        return status
+
+
+async def retry_job(guild_id: int, job_id: int) -> bool:
+    """Put a dead job back in the queue with its attempts reset."""
+    async with connect() as db:
+        cursor = await db.execute(
+            """UPDATE jobs SET status = 'pending', attempts = 0, run_after_ts = 0, finished_ts = NULL
+               WHERE id = ? AND guild_id = ? AND status = 'dead'""",
+            (job_id, guild_id)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def get_job_counts(guild_id: int) -> Dict[str, int]:
+    """{status: count} of one guild's jobs."""
+    async with connect() as db:
+        cursor = await db.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE guild_id = ? GROUP BY status", (guild_id,)
+        )
+        return {status: count for status, count in await cursor.fetchall()}
+
+
+async def get_jobs(guild_id: int, statuses=JOB_STATUSES, limit: int = 10) -> List[Job]:
+    """A guild's most recent jobs with one of statuses, newest first."""
+    statuses = list(statuses)
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"""SELECT * FROM jobs WHERE guild_id = ? AND status IN ({','.join('?' * len(statuses))})
+                ORDER BY id DESC LIMIT ?""",
+            (guild_id, *statuses, limit)
+        )
+        return [_row_to_job(r) for r in await cursor.fetchall()]
+
+
+async def prune_jobs(days: int) -> int:
+    """Delete finished jobs older than days. Dead jobs are kept until retried or pruned the same way."""
+    async with connect() as db:
+        cursor = await db.execute(
+            f"DELETE FROM jobs WHERE status IN ('done', 'dead') AND finished_ts < {NOW_TS} - ?",
+            (days * 86400,)
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def get_queue_depths() -> Dict[str, Dict[str, int]]:
+    """Rows per status in the job queue and render outbox, across all guilds."""
+    async with connect() as db:
+        cursor = await db.execute("SELECT status, COUNT(*) FROM jobs WHERE status IN ('pending', 'running') GROUP BY status")
+        depths = {'jobs': {status: 0 for status in ('pending', 'running')}}
+        depths['jobs'].update(dict(await cursor.fetchall()))
+        # Renders whose edit failed at least once are retrying until Discord accepts them
+        cursor = await db.execute(
+            "SELECT CASE WHEN attempts > 0 THEN 'retrying' ELSE 'pending' END, COUNT(*) FROM render_outbox GROUP BY 1"
+        )
+        depths['render_outbox'] = {status: 0 for status in ('pending', 'retrying')}
+        depths['render_outbox'].update(dict(await cursor.fetchall()))
+        return depths
+
+
+# ============== INSTRUMENTATION ==============
+
+def _instrument():
+    # Time every public query function (see bot/query_stats.py). Runs at import, before
+    # other modules bind the names
+    for name, fn in list(globals().items()):
+        if not name.startswith('_') and inspect.iscoroutinefunction(fn) and fn.__module__ == __name__:
+            globals()[name] = timed_query(fn)
+
 
+_instrument()
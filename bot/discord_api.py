@@ -0,0 +1,19 @@
+import discord.http
+
+from .config import DISCORD_API_BASE
+
+# Where discord.py sends REST requests unless DISCORD_API_BASE is set
+DEFAULT_API_BASE = discord.http.Route.BASE
+
+
+def use_api_base(base: str = DISCORD_API_BASE):
+    """Send every REST request, interaction responses and webhooks included, to base.
+
+    discord.py builds all of them from Route.BASE, so the real HTTP client and its
+    rate limit handling stay in play. The gateway is not redirected; against a
+    stand-in API only REST-only processes (the worker) and in-process load tests work.
+    """
+    if not base:
+        return
+    discord.http.Route.BASE = base.rstrip('/')
+    print(f"Discord REST requests go to {discord.http.Route.BASE}")
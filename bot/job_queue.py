@@ -0,0 +1,146 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from discord.ext import commands, tasks
+
+from . import tracing
+from .config import (
+    JOB_POLL_SECONDS,
+    JOB_CONCURRENCY,
+    JOB_VISIBILITY_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_MAX_PENDING_PER_GUILD,
+    JOB_RETENTION_DAYS,
+)
+from .database import (
+    enqueue_job,
+    claim_job,
+    extend_job_lock,
+    complete_job,
+    fail_job,
+    prune_jobs,
+    JOB_PRIORITY_NORMAL,
+)
+from .models import Job
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+# Seconds between deletions of old finished jobs
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def retry_delay(attempts: int) -> int:
+    """Seconds to wait before retrying a job that has failed attempts times."""
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), JOB_RETRY_MAX_SECONDS)
+
+
+async def enqueue(kind: str, guild_id: int, payload: dict = None, priority: int = JOB_PRIORITY_NORMAL,
+                  max_attempts: int = JOB_MAX_ATTEMPTS, throttle: bool = False) -> Optional[int]:
+    """Queue a job. With throttle, raises ValueError once the guild has JOB_MAX_PENDING_PER_GUILD waiting.
+
+    Commands throttle; periodic producers don't, since identical pending jobs are deduplicated.
+    """
+    return await enqueue_job(
+        kind, guild_id, payload, priority=priority, max_attempts=max_attempts,
+        max_pending=JOB_MAX_PENDING_PER_GUILD if throttle else None
+    )
+
+
+class JobConsumer:
+    """
+    Claims jobs from the jobs table and runs them with registered handlers.
+
+    Only kinds with a handler are claimed, so the bot and the worker share one
+    table while each runs its own kinds. Up to concurrency jobs run at once.
+    A running job's lock is extended every third of JOB_VISIBILITY_SECONDS, so a
+    job only reappears when its consumer died. A handler that raises is retried
+    with exponential backoff until the job runs out of attempts and is dead-lettered.
+    """
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, shards: Callable[[], Optional[tuple]] = None,
+                 active: Callable[[], bool] = None):
+        self.handlers: Dict[str, JobHandler] = {}
+        self.concurrency = concurrency
+        # Called per claim: (shard IDs, shard count) to only claim local guilds' jobs
+        self.shards = shards
+        # Called per poll: jobs are only claimed while it returns True
+        self.active = active
+        self.bot: Optional[commands.Bot] = None
+        self._next_prune = 0.0
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    def start(self, bot: commands.Bot):
+        """Poll from the bot's event loop once it is ready."""
+        self.bot = bot
+        self.poll.start()
+
+    def stop(self):
+        self.poll.cancel()
+
+    async def run_once(self) -> int:
+        """Claim and run up to concurrency jobs. Returns how many ran."""
+        if not self.handlers or (self.active and not self.active()):
+            return 0
+        if time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+            await prune_jobs(JOB_RETENTION_DAYS)
+
+        shards = self.shards() if self.shards else None
+        claimed = []
+        for _ in range(self.concurrency):
+            job = await claim_job(self.handlers, JOB_VISIBILITY_SECONDS, shards)
+            if not job:
+                break
+            claimed.append(job)
+        await asyncio.gather(*(self.execute(job) for job in claimed))
+        return len(claimed)
+
+    async def run(self, stop_when_empty: bool = False):
+        """Consume until cancelled, or until the queue is empty."""
+        while True:
+            if not await self.run_once():
+                if stop_when_empty:
+                    return
+                await asyncio.sleep(JOB_POLL_SECONDS)
+
+    @tasks.loop(seconds=JOB_POLL_SECONDS)
+    async def poll(self):
+        while await self.run_once():
+            pass
+
+    @poll.before_loop
+    async def before_poll(self):
+        await self.bot.wait_until_ready()
+
+    async def execute(self, job: Job):
+        with tracing.span(f"job {job.kind}", tracing.KIND_CONSUMER, root=True, **{
+            'job.id': job.id, 'job.attempt': job.attempts, 'discord.guild_id': job.guild_id
+        }) as span:
+            label = f"Job {job.id} ({job.kind}, guild {job.guild_id})"
+            keepalive = asyncio.create_task(self._keep_locked(job))
+            started = time.monotonic()
+            try:
+                await self.handlers[job.kind](job)
+            except Exception as e:
+                status = await fail_job(job, repr(e), retry_delay(job.attempts))
+                outcome = "dead-lettered" if status == 'dead' else f"retrying in {retry_delay(job.attempts)}s"
+                print(f"{label} failed on attempt {job.attempts}/{job.max_attempts}, {outcome}: {e!r}")
+                if span:
+                    span.set(status=status, error=repr(e))
+                return
+            finally:
+                keepalive.cancel()
+            await complete_job(job)
+            print(f"{label} done in {time.monotonic() - started:.1f}s")
+
+    async def _keep_locked(self, job: Job):
+        while True:
+            await asyncio.sleep(JOB_VISIBILITY_SECONDS / 3)
+            if not await extend_job_lock(job, JOB_VISIBILITY_SECONDS):
+                print(f"Job {job.id} ({job.kind}) lost its lock and may run twice")
+                return
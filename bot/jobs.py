@@ -0,0 +1,286 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+import discord
+
+from .config import MEMBER_ROLES
+from .database import (
+    get_all_games,
+    get_all_game_roles,
+    get_all_template_channels,
+    get_groups_dict,
+    get_non_custom_game_channels,
+    add_game_channel,
+    remove_game_channel,
+    get_tasks_due_soon,
+    get_stagnant_tasks,
+    get_task_assignees,
+    JOB_REMINDERS,
+    JOB_ROLE_SYNC,
+    JOB_TEMPLATE_SYNC,
+)
+from .job_queue import JobConsumer
+from .models import GameRole, Job
+from .utils import format_channel_name
+
+# Members checked by a role sync between yields to the event loop; members whose roles
+# are already right cost no awaits, so big guilds would otherwise block it
+ROLE_SYNC_YIELD_EVERY = 500
+
+# Resolves a channel or thread ID to a channel object, or None if it is gone.
+# The gateway process reads its cache; the worker asks the REST API.
+ChannelLookup = Callable[[int], Awaitable[Optional[discord.abc.Snowflake]]]
+
+
+def cached_channels(guild: discord.Guild) -> ChannelLookup:
+    """Channel lookup backed by the gateway cache."""
+    async def get_channel(channel_id: int):
+        return guild.get_channel_or_thread(channel_id)
+    return get_channel
+
+
+class GatewayContext:
+    """Where shared job handlers find guilds, members and channels: the gateway cache."""
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+
+    async def guild(self, guild_id: int) -> Optional[discord.Guild]:
+        return self.client.get_guild(guild_id)
+
+    async def members(self, guild: discord.Guild) -> List[discord.Member]:
+        return guild.members
+
+    def channels(self, guild: discord.Guild) -> ChannelLookup:
+        return cached_channels(guild)
+
+
+class RestContext:
+    """Where shared job handlers find guilds, members and channels: the REST API, per job."""
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+
+    async def guild(self, guild_id: int) -> Optional[discord.Guild]:
+        try:
+            return await self.client.fetch_guild(guild_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+
+    async def members(self, guild: discord.Guild) -> List[discord.Member]:
+        return [m async for m in guild.fetch_members(limit=None)]
+
+    def channels(self, guild: discord.Guild) -> ChannelLookup:
+        async def get_channel(channel_id: int):
+            try:
+                return await self.client.fetch_channel(channel_id)
+            except (discord.NotFound, discord.Forbidden):
+                return None
+        return get_channel
+
+
+async def report(client: discord.Client, job: Job, content: str = None, embed: discord.Embed = None):
+    """Post a job's outcome to the channel it was started from, if any."""
+    channel_id = job.payload.get('channel_id')
+    if not channel_id:
+        return
+    try:
+        await client.get_partial_messageable(channel_id).send(content=content, embed=embed)
+    except discord.HTTPException:
+        pass
+
+
+def register_shared_jobs(consumer: JobConsumer, context):
+    """Register the jobs that run either in the bot or in the worker."""
+    async def run_reminders(job: Job):
+        # Sending needs no channel lookup; a deleted thread just fails the send
+        async def messageable(channel_id: int):
+            return context.client.get_partial_messageable(channel_id)
+        await send_reminders(job.guild_id, messageable, job.payload.get('limit', -1))
+
+    async def run_role_sync(job: Job):
+        guild = await context.guild(job.guild_id)
+        if not guild:
+            return
+        checked = await sync_guild_game_roles(guild, await context.members(guild))
+        if checked:
+            print(f"Synced game roles for {checked} members of {guild.name}")
+
+    async def run_template_sync(job: Job):
+        guild = await context.guild(job.guild_id)
+        if not guild:
+            return
+        added, removed, errors = await sync_template_channels(
+            guild, context.channels(guild), job.payload.get('names'), job.payload.get('remove', True)
+        )
+        await report(context.client, job, format_template_sync(added, removed, errors))
+
+    consumer.register(JOB_REMINDERS, run_reminders)
+    consumer.register(JOB_ROLE_SYNC, run_role_sync)
+    consumer.register(JOB_TEMPLATE_SYNC, run_template_sync)
+
+
+# ============== GAME ROLES ==============
+
+async def sync_member_game_roles(member: discord.Member, game_roles: List[GameRole]):
+    """Give a member the game roles matching their member roles and take away the rest."""
+    guild = member.guild
+    member_role_names = {r.name for r in member.roles}
+    member_role_ids = {r.id for r in member.roles}
+
+    # Map suffix -> member role name
+    suffix_to_member_role = {role: role for role in MEMBER_ROLES}
+
+    roles_to_add = []
+    roles_to_remove = []
+
+    for game_role in game_roles:
+        discord_role = guild.get_role(game_role.role_id)
+        if not discord_role:
+            continue
+
+        # Check if member has corresponding member role
+        member_role_name = suffix_to_member_role.get(game_role.suffix)
+        has_member_role = member_role_name and member_role_name in member_role_names
+        has_game_role = discord_role.id in member_role_ids
+
+        if has_member_role and not has_game_role:
+            roles_to_add.append(discord_role)
+        elif not has_member_role and has_game_role:
+            roles_to_remove.append(discord_role)
+
+    try:
+        if roles_to_add:
+            await member.add_roles(*roles_to_add, reason="Game role sync")
+        if roles_to_remove:
+            await member.remove_roles(*roles_to_remove, reason="Game role sync")
+    except discord.Forbidden:
+        print(f"Missing permissions to modify roles for {member.name}")
+    except discord.HTTPException as e:
+        print(f"Failed to modify roles for {member.name}: {e}")
+
+
+async def sync_guild_game_roles(guild: discord.Guild, members: Iterable[discord.Member]) -> int:
+    """Sync game roles for members of one guild. Returns the number of members checked."""
+    game_roles = await get_all_game_roles(guild.id)
+    if not game_roles:
+        return 0
+
+    checked = 0
+    for member in members:
+        if member.bot:
+            continue
+        await sync_member_game_roles(member, game_roles)
+        checked += 1
+        if checked % ROLE_SYNC_YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    return checked
+
+
+# ============== TEMPLATES ==============
+
+async def sync_template_channels(guild: discord.Guild, get_channel: ChannelLookup, names: List[str] = None,
+                                 remove: bool = True) -> Tuple[int, int, List[str]]:
+    """Create missing template channels in every game and delete ones no longer in the template.
+
+    names limits creation to those template channels; remove=False keeps extra channels.
+    Returns (added, removed, errors).
+    """
+    games = await get_all_games(guild.id)
+    template_channels = await get_all_template_channels(guild.id)
+    template_names = {ch.name for ch in template_channels}
+    if names is not None:
+        template_channels = [ch for ch in template_channels if ch.name in names]
+    groups = await get_groups_dict(guild.id)
+
+    added_count = 0
+    removed_count = 0
+    errors = []
+
+    for game in games:
+        category = await get_channel(game.category_id)
+        if not category:
+            errors.append(f"Category not found for {game.name}")
+            continue
+
+        game_channels = await get_non_custom_game_channels(game.id)
+        game_channel_names = {ch.name for ch in game_channels}
+
+        for template_ch in template_channels:
+            if template_ch.name not in game_channel_names:
+                emoji = groups.get(template_ch.group_name, "")
+                channel_name = format_channel_name(emoji, game.acronym, template_ch.name)
+
+                try:
+                    if template_ch.is_voice:
+                        new_channel = await guild.create_voice_channel(name=channel_name, category=category)
+                    else:
+                        new_channel = await guild.create_text_channel(
+                            name=channel_name,
+                            category=category,
+                            topic=template_ch.description
+                        )
+
+                    await add_game_channel(
+                        game_id=game.id,
+                        channel_id=new_channel.id,
+                        name=template_ch.name,
+                        group_name=template_ch.group_name,
+                        is_custom=False,
+                        is_voice=template_ch.is_voice
+                    )
+                    added_count += 1
+                except discord.HTTPException as e:
+                    errors.append(f"Failed to create {channel_name}: {e}")
+
+        for game_ch in game_channels:
+            if remove and game_ch.name not in template_names:
+                channel = await get_channel(game_ch.channel_id)
+                if channel:
+                    try:
+                        await channel.delete(reason="Template sync")
+                        removed_count += 1
+                    except discord.HTTPException as e:
+                        errors.append(f"Failed to delete {game_ch.name}: {e}")
+                await remove_game_channel(game.id, game_ch.name)
+
+    return added_count, removed_count, errors
+
+
+def format_template_sync(added: int, removed: int, errors: List[str]) -> str:
+    result = f"Sync complete.\nAdded: {added} channels\nRemoved: {removed} channels"
+    if errors:
+        result += "\n\nErrors:\n" + "\n".join(errors[:10])
+        if len(errors) > 10:
+            result += f"\n... and {len(errors) - 10} more errors"
+    return result
+
+
+# ============== REMINDERS ==============
+
+async def send_reminders(guild_id: int, get_channel: ChannelLookup, limit: int):
+    """Ping assignees of one guild's tasks that are due soon or have gone quiet.
+
+    Sends at most limit reminders of each kind.
+    """
+    due_soon = await get_tasks_due_soon(guild_id, 24, limit=limit)
+    for task in due_soon:
+        await _remind(task, get_channel, "\u26a0\ufe0f {mentions} This task is due within 24 hours!")
+
+    stagnant = await get_stagnant_tasks(guild_id, 3, limit=limit)
+    for task in stagnant:
+        await _remind(task, get_channel, "\U0001f4ac {mentions} Update request: How is this task going?")
+
+
+async def _remind(task, get_channel: ChannelLookup, message: str):
+    if not task.thread_id:
+        return
+    thread = await get_channel(task.thread_id)
+    if not thread:
+        return
+    try:
+        assignees = await get_task_assignees(task.id)
+        mentions = ' '.join(f"<@{a.user_id}>" for a in assignees) if assignees else f"<@{task.assignee_id}>"
+        await thread.send(message.format(mentions=mentions))
+    except discord.HTTPException:
+        pass
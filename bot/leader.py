@@ -0,0 +1,83 @@
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+from discord.ext import commands, tasks
+
+from .config import LEASE_TTL_SECONDS, LEASE_RENEW_SECONDS, REPLICA_ID, SHARD_IDS
+from .database import acquire_lease, release_lease
+
+
+def lease_name() -> str:
+    """Replicas running the same shards compete for one lease; other shard sets have their own."""
+    if SHARD_IDS:
+        return "background:" + ",".join(str(s) for s in sorted(SHARD_IDS))
+    return "background"
+
+
+class LeaderLease:
+    """
+    Elects one replica to run background loops and gateway side effects.
+
+    Every replica answers interactions, but reminders, archival, backups, the
+    outbox retry loop, role sync and thread moderation run only where is_leader
+    is true. The holder renews its row in the leases table every
+    LEASE_RENEW_SECONDS; if it dies, the row expires after LEASE_TTL_SECONDS and
+    the next replica to renew takes over. A clean shutdown releases the lease so
+    the standby takes over on its next heartbeat.
+    """
+
+    def __init__(self):
+        self.name = lease_name()
+        self.holder = REPLICA_ID or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.bot = None
+        self._held = False
+        # Local deadline measured from before each renewal, so a leader whose
+        # renewals stall stops acting before another replica can take over
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._held and time.monotonic() < self._valid_until
+
+    def start(self, bot: commands.Bot):
+        self.bot = bot
+        self.heartbeat.start()
+
+    async def renew(self) -> bool:
+        """Take or keep the lease. Dispatches leadership_acquired on a follower -> leader change."""
+        started = time.monotonic()
+        try:
+            held = await acquire_lease(self.name, self.holder, LEASE_TTL_SECONDS)
+        except sqlite3.Error as e:
+            print(f"Lease renewal failed: {e}")
+            return self.is_leader
+
+        was_leader = self._held
+        self._held = held
+        self._valid_until = started + LEASE_TTL_SECONDS if held else 0.0
+        if held and not was_leader:
+            print(f"Replica {self.holder} is now leader for {self.name}")
+            if self.bot:
+                self.bot.dispatch('leadership_acquired')
+        elif was_leader and not held:
+            print(f"Replica {self.holder} lost leadership of {self.name}")
+        return held
+
+    async def release(self):
+        self.heartbeat.cancel()
+        if self._held:
+            self._held = False
+            try:
+                await release_lease(self.name, self.holder)
+            except sqlite3.Error as e:
+                print(f"Lease release failed: {e}")
+
+    @tasks.loop(seconds=LEASE_RENEW_SECONDS)
+    async def heartbeat(self):
+        await self.renew()
+
+
+leader = LeaderLease()
@@ -1,24 +1,73 @@
+import asyncio
+import signal
+
 import discord
 from discord.ext import commands
 
-from .config import DISCORD_TOKEN, GUILD_ID, MEMBER_ROLES
-from .database import init_db, get_all_games, get_game_roles, get_all_game_roles
+from .config import (
+    DISCORD_TOKEN, GUILD_ID, MEMBER_ROLES, SHARDED, SHARD_COUNT, SHARD_IDS, ROLE_SYNC_STAGGER_SECONDS, JOB_WORKER,
+    METRICS_HOST, METRICS_PORT
+)
+from .database import (
+    init_db, get_all_game_roles, claim_unassigned_rows, get_queue_depths, JOB_ROLE_SYNC, JOB_PRIORITY_LOW
+)
+from . import jobs, metrics, tracing
+from .job_queue import JobConsumer, enqueue
+from .leader import leader
+from .sharding import local_shards, runs_shard_zero
+from .discord_api import use_api_base
+from .watchdog import watchdog
 from .utils import format_role_name
 
 
-class GameDevBot(commands.Bot):
+class GameDevBot(commands.AutoShardedBot if SHARDED else commands.Bot):
     def __init__(self):
+        use_api_base()
         intents = discord.Intents.default()
         intents.members = True
         intents.guilds = True
-        super().__init__(command_prefix="!", intents=intents)
+        options = {}
+        if SHARDED:
+            if SHARD_COUNT:
+                options['shard_count'] = SHARD_COUNT
+            if SHARD_IDS:
+                options['shard_ids'] = SHARD_IDS
+        self.metrics = None
+        if METRICS_PORT or tracing.enabled():
+            # Interaction and REST hooks feed both metrics and traces
+            metrics.instrument_views()
+            options['tree_cls'] = metrics.InstrumentedTree
+            options['http_trace'] = metrics.http_trace()
+        if METRICS_PORT:
+            self.metrics = metrics.MetricsServer(METRICS_HOST, METRICS_PORT)
+            metrics.registry.collector(self.collect_metrics)
+        super().__init__(command_prefix="!", intents=intents, **options)
+        # Only the leader claims jobs, and only for guilds on this process's shards.
+        # Cogs register their own kinds; with JOB_WORKER the shared ones run in the worker
+        self.jobs = JobConsumer(shards=lambda: local_shards(self), active=lambda: leader.is_leader)
+        if not JOB_WORKER:
+            jobs.register_shared_jobs(self.jobs, jobs.GatewayContext(self))
     
     async def setup_hook(self):
+        watchdog.start()
         await init_db()
+        if self.metrics:
+            await self.metrics.start()
+        leader.start(self)
+        try:
+            # docker stop sends SIGTERM; close cleanly so the lease is released
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except NotImplementedError:
+            pass
         await self.load_extension("bot.cogs.templates")
         await self.load_extension("bot.cogs.games")
         await self.load_extension("bot.cogs.tasks")
         await self.load_extension("bot.cogs.setup")
+        self.jobs.start(self)
+
+        # Commands are global, so with one process per shard only one syncs them
+        if not runs_shard_zero(self):
+            return
         
         if GUILD_ID:
             guild = discord.Object(id=int(GUILD_ID))
@@ -30,12 +79,59 @@ class GameDevBot(commands.Bot):
     async def on_ready(self):
         print(f"Logged in as {self.user} (ID: {self.user.id})")
         print("------")
+
+        # Data from before guild partitioning belongs to the guild the bot was
+        # configured for, or the only guild it is in
+        home_guild_id = int(GUILD_ID) if GUILD_ID else (
+            self.guilds[0].id if len(self.guilds) == 1 and not SHARDED else None
+        )
+        if home_guild_id:
+            claimed = await claim_unassigned_rows(home_guild_id)
+            if claimed:
+                print(f"Assigned {claimed} existing tasks to guild {home_guild_id}")
         
-        # Sync roles on startup
-        await self.sync_all_game_roles()
+        # Sync roles on startup; sharded bots sync each shard as it comes up.
+        # Standby replicas skip this and sync everything if they are promoted
+        if not SHARDED and leader.is_leader:
+            await self.sync_all_game_roles()
+
+    async def on_shard_ready(self, shard_id: int):
+        """Sync roles for one shard's guilds, staggered so shards don't hit the API at once."""
+        if not leader.is_leader:
+            return
+        await asyncio.sleep(shard_id * ROLE_SYNC_STAGGER_SECONDS)
+        for guild in self.guilds:
+            if guild.shard_id == shard_id:
+                await self.sync_guild_game_roles(guild)
+    
+    async def on_leadership_acquired(self):
+        """A standby took over from a leader that stopped; catch up on role changes it missed."""
+        if self.is_ready():
+            await self.sync_all_game_roles()
+
+    async def close(self):
+        self.jobs.stop()
+        await leader.release()
+        if self.metrics:
+            await self.metrics.stop()
+        watchdog.stop()
+        await super().close()
+
+    async def collect_metrics(self):
+        """Refresh queue depth and gateway latency gauges before a scrape."""
+        metrics.QUEUE_DEPTH.clear()
+        for queue, counts in (await get_queue_depths()).items():
+            for status, count in counts.items():
+                metrics.QUEUE_DEPTH.set(count, queue=queue, status=status)
+        metrics.GATEWAY_LATENCY.clear()
+        for shard_id, latency in getattr(self, 'latencies', [(self.shard_id or 0, self.latency)]):
+            if latency == latency:  # NaN before the first heartbeat
+                metrics.GATEWAY_LATENCY.set(latency, shard=shard_id)
     
     async def on_member_update(self, before: discord.Member, after: discord.Member):
         """When member roles change, update their game roles."""
+        if not leader.is_leader:
+            return
         before_roles = set(r.name for r in before.roles)
         after_roles = set(r.name for r in after.roles)
         
@@ -53,71 +149,26 @@ class GameDevBot(commands.Bot):
         await self.sync_member_game_roles(after)
     
     async def sync_all_game_roles(self):
-        """Sync game roles for all members based on their member roles."""
-        if not GUILD_ID:
-            return
-        
-        guild = self.get_guild(int(GUILD_ID))
-        if not guild:
-            return
-        
-        games = await get_all_games()
-        if not games:
-            return
-        
-        print(f"Syncing game roles for {len(guild.members)} members...")
-        
-        for member in guild.members:
-            if member.bot:
-                continue
-            await self.sync_member_game_roles(member)
-        
-        print("Game role sync complete.")
+        """Sync game roles for all members of every guild based on their member roles."""
+        for guild in self.guilds:
+            await self.sync_guild_game_roles(guild)
+
+    async def sync_guild_game_roles(self, guild: discord.Guild, priority: int = JOB_PRIORITY_LOW):
+        """Queue a game role sync for all members of one guild."""
+        await enqueue(JOB_ROLE_SYNC, guild.id, priority=priority)
     
     async def sync_member_game_roles(self, member: discord.Member):
         """Sync game roles for a single member based on their member roles."""
-        guild = member.guild
-        member_role_names = {r.name for r in member.roles}
-        
-        # Get all game roles from DB
-        all_game_roles = await get_all_game_roles()
-        
-        # Map suffix -> member role name
-        suffix_to_member_role = {role: role for role in MEMBER_ROLES}
-        
-        roles_to_add = []
-        roles_to_remove = []
-        
-        for game_role in all_game_roles:
-            discord_role = guild.get_role(game_role.role_id)
-            if not discord_role:
-                continue
-            
-            # Check if member has corresponding member role
-            member_role_name = suffix_to_member_role.get(game_role.suffix)
-            has_member_role = member_role_name and member_role_name in member_role_names
-            has_game_role = discord_role in member.roles
-            
-            if has_member_role and not has_game_role:
-                roles_to_add.append(discord_role)
-            elif not has_member_role and has_game_role:
-                roles_to_remove.append(discord_role)
-        
-        try:
-            if roles_to_add:
-                await member.add_roles(*roles_to_add, reason="Game role sync")
-            if roles_to_remove:
-                await member.remove_roles(*roles_to_remove, reason="Game role sync")
-        except discord.Forbidden:
-            print(f"Missing permissions to modify roles for {member.name}")
-        except discord.HTTPException as e:
-            print(f"Failed to modify roles for {member.name}: {e}")
+        await jobs.sync_member_game_roles(member, await get_all_game_roles(member.guild.id))
 
 
 def main():
     if not DISCORD_TOKEN:
         print("Error: DISCORD_TOKEN not set in environment")
         return
+    if SHARD_IDS and not (SHARDED and SHARD_COUNT):
+        print("Error: SHARD_IDS needs SHARDED=true and SHARD_COUNT")
+        return
     
     bot = GameDevBot()
     bot.run(DISCORD_TOKEN)
@@ -0,0 +1,331 @@
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import discord
+from aiohttp import web
+from discord import app_commands
+
+from . import tracing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """One metric family in the Prometheus text format, with a fixed set of label names."""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def clear(self):
+        self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # [per-bucket counts..., +Inf count, sum]
+            entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[i] += 1
+                break
+        else:
+            entry[len(self.buckets)] += 1
+        entry[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, entry in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {entry[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        # Called before every scrape to refresh gauges (queue depths, gateway latency)
+        self.collectors: List[Callable[[], Awaitable[None]]] = []
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Awaitable[None]]):
+        self.collectors.append(fn)
+        return fn
+
+    async def render(self) -> str:
+        for collect in self.collectors:
+            try:
+                await collect()
+            except Exception as e:
+                print(f"Metrics collector {collect.__name__} failed: {e!r}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+INTERACTION_SECONDS = registry.add(Histogram(
+    'bot_interaction_seconds', "Time spent handling slash commands, autocomplete, buttons and modals",
+    ('kind', 'name', 'status')
+))
+DB_QUERY_SECONDS = registry.add(Histogram(
+    'bot_db_query_seconds', "Latency of bot.database functions (see bot/query_stats.py)", ('function',), QUERY_BUCKETS
+))
+REST_REQUESTS = registry.add(Counter(
+    'discord_rest_requests_total', "Discord REST requests by route and response status", ('method', 'route', 'status')
+))
+REST_SECONDS = registry.add(Histogram(
+    'discord_rest_request_seconds', "Discord REST request latency by route", ('method', 'route')
+))
+REST_RATE_LIMITED = registry.add(Counter(
+    'discord_rest_rate_limited_total', "Discord REST responses with status 429 by route", ('method', 'route')
+))
+QUEUE_DEPTH = registry.add(Gauge(
+    'bot_queue_depth', "Rows waiting in the render outbox and the job queue", ('queue', 'status')
+))
+CACHE_REQUESTS = registry.add(Counter(
+    'bot_cache_requests_total', "In-memory cache lookups by cache and result (hit or miss)", ('cache', 'result')
+))
+LOOP_LAG_SECONDS = registry.add(Gauge(
+    'bot_event_loop_lag_seconds', "How late the last event loop lag probe woke up"
+))
+LOOP_LAG_HISTOGRAM = registry.add(Histogram(
+    'bot_event_loop_lag_histogram_seconds', "Distribution of event loop lag probes", (), QUERY_BUCKETS
+))
+LOOP_STALLS = registry.add(Counter(
+    'bot_event_loop_stalls_total', "Event loop lag probes later than WATCHDOG_LAG_MS"
+))
+GATEWAY_LATENCY = registry.add(Gauge(
+    'discord_gateway_latency_seconds', "Heartbeat latency of each gateway shard", ('shard',)
+))
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+# ============== DISCORD REST ==============
+
+_SNOWFLAKE = re.compile(r'^\d{15,22}$')
+
+
+def route_label(path: str) -> str:
+    """Collapse IDs and tokens out of a REST path: /channels/{id}/messages/{id}."""
+    parts = path.split('/')
+    out = []
+    for i, part in enumerate(parts):
+        if _SNOWFLAKE.match(part):
+            out.append('{id}')
+        elif i >= 2 and out[-1] == '{id}' and out[-2] in ('webhooks', 'interactions'):
+            out.append('{token}')
+        else:
+            out.append(part)
+    route = '/'.join(out)
+    # Drop the /api/v10 prefix
+    return re.sub(r'^/api/v\d+', '', route)
+
+
+def http_trace() -> aiohttp.TraceConfig:
+    """aiohttp trace hooks for discord.py's HTTP session (Client(http_trace=...)).
+
+    Also records each request as a span of the current trace, if any.
+    """
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+        route = route_label(params.url.path)
+        context.span = tracing.start_span(
+            f"{params.method} {route}", tracing.KIND_CLIENT, **{'http.method': params.method, 'http.route': route}
+        )
+
+    async def on_request_end(session, context, params):
+        route = route_label(params.url.path)
+        method = params.method
+        status = params.response.status
+        REST_REQUESTS.inc(method=method, route=route, status=status)
+        REST_SECONDS.observe(time.perf_counter() - context.started, method=method, route=route)
+        if status == 429:
+            REST_RATE_LIMITED.inc(method=method, route=route)
+        if context.span:
+            context.span.set(**{'http.status_code': status})
+            context.span.finish()
+
+    async def on_request_exception(session, context, params):
+        REST_REQUESTS.inc(method=params.method, route=route_label(params.url.path), status='error')
+        if context.span:
+            context.span.finish(params.exception)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+# ============== INTERACTIONS ==============
+
+def _interaction_span(interaction: discord.Interaction):
+    """Root span of the trace for one interaction; renamed once the handler is known."""
+    return tracing.span('interaction', tracing.KIND_SERVER, root=True, **{
+        'discord.interaction_id': interaction.id,
+        'discord.guild_id': interaction.guild_id or 0,
+        'discord.user_id': interaction.user.id,
+    })
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    """Command tree that times and traces every slash command and autocomplete call."""
+
+    # _call is discord.py's internal entry point for application command interactions;
+    # there is no public hook that fires after a command finishes either way
+    async def _call(self, interaction: discord.Interaction):
+        started = time.perf_counter()
+        status = 'ok'
+        with _interaction_span(interaction) as span:
+            try:
+                await super()._call(interaction)
+                if interaction.command_failed:
+                    status = 'error'
+            except Exception:
+                status = 'error'
+                raise
+            finally:
+                kind = 'autocomplete' if interaction.type is discord.InteractionType.autocomplete else 'command'
+                command = interaction.command
+                name = command.qualified_name if command else interaction.data.get('name', 'unknown')
+                INTERACTION_SECONDS.observe(time.perf_counter() - started, kind=kind, name=name, status=status)
+                if span:
+                    span.name = f"{kind} {name}"
+                    span.set(status=status)
+
+
+def _item_name(view, item) -> str:
+    # Decorated buttons wrap their function; custom IDs carry task IDs and would explode cardinality
+    callback = getattr(item.callback, 'callback', item.callback)
+    return f"{type(view).__name__}.{getattr(callback, '__name__', type(item).__name__)}"
+
+
+def instrument_views():
+    """Time and trace every view item and modal callback. Idempotent."""
+    if getattr(discord.ui.View, '_metrics_instrumented', False):
+        return
+
+    # Like InstrumentedTree._call, these are the internal per-interaction entry points.
+    # They report errors through on_error themselves, so status is always ok
+    view_task = discord.ui.View._scheduled_task
+    modal_task = discord.ui.Modal._scheduled_task
+
+    async def timed_view_task(self, item, interaction):
+        started = time.perf_counter()
+        name = _item_name(self, item)
+        with _interaction_span(interaction) as span:
+            if span:
+                span.name = f"component {name}"
+                span.set(**{'discord.custom_id': getattr(item, 'custom_id', None) or ''})
+            try:
+                return await view_task(self, item, interaction)
+            finally:
+                INTERACTION_SECONDS.observe(time.perf_counter() - started, kind='component', name=name, status='ok')
+
+    async def timed_modal_task(self, interaction, *args):
+        started = time.perf_counter()
+        name = type(self).__name__
+        with _interaction_span(interaction) as span:
+            if span:
+                span.name = f"modal {name}"
+            try:
+                return await modal_task(self, interaction, *args)
+            finally:
+                INTERACTION_SECONDS.observe(time.perf_counter() - started, kind='modal', name=name, status='ok')
+
+    discord.ui.View._scheduled_task = timed_view_task
+    discord.ui.Modal._scheduled_task = timed_modal_task
+    discord.ui.View._metrics_instrumented = True
+
+
+# ============== SERVER ==============
+
+class MetricsServer:
+    """Serves GET /metrics on host:port. Event loop lag is sampled by bot/watchdog.py."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        body = await registry.render()
+        return web.Response(text=body, headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, FrozenSet, Optional
 
 
 @dataclass
@@ -10,6 +10,7 @@ class Game:
     acronym: str
     category_id: int
     created_at: Optional[datetime] = None
+    guild_id: int = 0
 
 
 @dataclass
@@ -62,8 +63,13 @@ class Task:
     deadline: Optional[datetime]
     eta: Optional[str]
     priority: Optional[str]
+    version: int = 0  # Bumped on every write, used for compare-and-swap updates
+    deadline_ts: Optional[int] = None  # UTC epoch seconds parsed from deadline
+    created_ts: Optional[int] = None
+    updated_ts: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    guild_id: int = 0
 
 
 @dataclass
@@ -75,6 +81,7 @@ class TaskHistory:
     old_value: Optional[str]
     new_value: Optional[str]
     timestamp: Optional[datetime] = None
+    ts: Optional[int] = None  # UTC epoch seconds
 
 
 @dataclass
@@ -83,6 +90,7 @@ class TaskBoard:
     game_acronym: str
     channel_id: int
     message_ids: str
+    guild_id: int = 0
 
 
 @dataclass
@@ -101,3 +109,81 @@ class ServerConfig:
     guild_id: int
     config_json: str
     setup_completed: bool = False
+
+
+@dataclass
+class GuildSettings:
+    """Parsed server_config for one guild; defaults match an unconfigured server."""
+    guild_id: int
+    setup_completed: bool = False
+    channel_mode: str = 'per_game'  # per_game, global
+    board_channel_template: str = 'tasks'
+    questions_channel_template: str = 'questions'
+    leads_channel_template: str = 'leads'
+    global_board_channel_id: Optional[int] = None
+    global_questions_channel_id: Optional[int] = None
+    global_leads_channel_id: Optional[int] = None
+    lead_role_ids: FrozenSet[int] = frozenset()
+    approval_mode: str = 'auto'  # auto, all, majority, any
+    approval_threshold: Optional[int] = None
+    # Per-game leads channel IDs, filled in as channels are resolved
+    leads_channel_ids: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def is_global(self) -> bool:
+        return self.channel_mode == 'global'
+
+
+@dataclass
+class OutboxEntry:
+    id: Optional[int]
+    target: str  # control, header, board
+    ref: str  # task id for control/header, "guild_id:acronym" for board
+    generation: int = 0
+    attempts: int = 0
+    created_at: Optional[datetime] = None
+    guild_id: int = 0
+
+
+@dataclass
+class Job:
+    id: Optional[int]
+    kind: str  # reminders, role_sync, template_sync, task_import, migrate_assignees
+    guild_id: int
+    payload: Dict = field(default_factory=dict)
+    status: str = 'pending'  # pending, running, done, dead
+    priority: int = 5
+    attempts: int = 0
+    max_attempts: int = 5
+    error: Optional[str] = None
+    created_ts: Optional[int] = None
+    run_after_ts: int = 0
+
+
+@dataclass
+class BackupSnapshot:
+    path: str
+    created_at: datetime
+    size: int  # compressed bytes on disk
+    sha256: str
+    db_size: Optional[int] = None  # uncompressed bytes, known for snapshots taken this run
+    manual: bool = False  # taken on request rather than by the schedule
+
+
+@dataclass(frozen=True)
+class TaskAccess:
+    is_assignee: bool = False
+    is_lead: bool = False
+
+    @property
+    def allowed(self) -> bool:
+        return self.is_assignee or self.is_lead
+
+
+@dataclass
+class ProfileReport:
+    mode: str  # cpu, alloc
+    seconds: float
+    summary: str  # top-N table as text
+    raw: bytes  # pstats dump (cpu) or tracemalloc snapshot (alloc)
+    raw_filename: str
@@ -0,0 +1,153 @@
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Tuple
+
+import discord
+from discord import app_commands
+
+from .config import CACHE_TTL_SECONDS
+from .database import get_guild_settings, get_task_assignees
+from .metrics import cache_lookup
+from .models import GuildSettings, TaskAccess
+
+# Tasks whose assignee sets and per-user decisions are kept in memory, and
+# (guild, member) lead decisions likewise
+PERMISSION_CACHE_TASKS = 4096
+
+# Role names that make a role a lead role while no lead roles are configured
+LEAD_ROLE_KEYWORDS = ('lead', 'admin')
+
+
+def is_lead_role_name(name: str) -> bool:
+    name = name.lower()
+    return any(keyword in name for keyword in LEAD_ROLE_KEYWORDS)
+
+
+def owner_only():
+    """App command check for process-wide commands: only the bot's owner (or its team) may run them.
+
+    Server administrators share the process and database with every other server,
+    so they do not qualify.
+    """
+    async def predicate(interaction: discord.Interaction) -> bool:
+        return await interaction.client.is_owner(interaction.user)
+    return app_commands.check(predicate)
+
+
+class PermissionCache:
+    """
+    Lead and assignee decisions for task gating, kept in memory.
+
+    Lead role IDs are resolved once per guild: the roles configured in setup,
+    or every role named like "lead"/"admin" while none are configured. They are
+    recomputed when the guild's settings object changes or a role event calls
+    invalidate_roles. Assignee sets are loaded once per task (LRU) and each
+    (task, user) decision is memoized inside its task entry, so repeat checks
+    cost two dict lookups. Per-member lead decisions are an LRU of the same size.
+    Callers invalidate on assignee and member role changes;
+    task entries are also reloaded after ttl seconds, since another replica may
+    have changed the team.
+    """
+
+    def __init__(self, maxsize: int = PERMISSION_CACHE_TASKS, ttl: float = CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lead_roles: Dict[int, Tuple[GuildSettings, FrozenSet[int]]] = {}
+        self._leads: 'OrderedDict[Tuple[int, int], bool]' = OrderedDict()
+        # Task ID -> (assignee IDs, decisions per user, monotonic load time)
+        self._tasks: 'OrderedDict[int, Tuple[FrozenSet[int], Dict[int, TaskAccess], float]]' = OrderedDict()
+        # Bumped by every invalidation so a load that raced one is not cached
+        self._generation = 0
+
+    def lead_role_ids(self, guild: discord.Guild, settings: GuildSettings) -> FrozenSet[int]:
+        cached = self._lead_roles.get(guild.id)
+        if cached and cached[0] is settings:
+            return cached[1]
+        if settings.lead_role_ids:
+            role_ids = settings.lead_role_ids
+        else:
+            role_ids = frozenset(r.id for r in guild.roles if is_lead_role_name(r.name))
+        if cached:
+            # Settings were saved again; earlier decisions may rest on the old roles
+            self._forget_leads(guild.id)
+        self._lead_roles[guild.id] = (settings, role_ids)
+        return role_ids
+
+    async def is_lead(self, member: discord.Member) -> bool:
+        """Admins and members holding a lead role."""
+        settings = await get_guild_settings(member.guild.id)
+        role_ids = self.lead_role_ids(member.guild, settings)
+        key = (member.guild.id, member.id)
+        lead = self._leads.get(key)
+        cache_lookup('permission_leads', lead is not None)
+        if lead is None:
+            lead = member.guild_permissions.administrator or any(
+                member.get_role(role_id) is not None for role_id in role_ids
+            )
+            self._leads[key] = lead
+            if len(self._leads) > self.maxsize:
+                self._leads.popitem(last=False)
+        else:
+            self._leads.move_to_end(key)
+        return lead
+
+    async def access(self, member: discord.Member, task_id: int) -> TaskAccess:
+        """Whether member is on the task's team and/or a lead."""
+        # Resolve lead roles first: a settings change clears memoized decisions
+        is_lead = await self.is_lead(member)
+
+        entry = self._tasks.get(task_id)
+        now = time.monotonic()
+        if entry is not None and now - entry[2] >= self.ttl:
+            entry = None
+        cache_lookup('permission_tasks', entry is not None)
+        if entry is None:
+            generation = self._generation
+            assignees = frozenset(a.user_id for a in await get_task_assignees(task_id))
+            entry = (assignees, {}, now)
+            if generation == self._generation:
+                self._tasks[task_id] = entry
+                if len(self._tasks) > self.maxsize:
+                    self._tasks.popitem(last=False)
+        else:
+            self._tasks.move_to_end(task_id)
+
+        assignees, decisions, _ = entry
+        decision = decisions.get(member.id)
+        if decision is None:
+            decision = TaskAccess(is_assignee=member.id in assignees, is_lead=is_lead)
+            decisions[member.id] = decision
+        return decision
+
+    def invalidate_task(self, task_id: int):
+        """Forget a task's team, e.g. after assignees were added or removed."""
+        self._generation += 1
+        self._tasks.pop(task_id, None)
+
+    def invalidate_roles(self, guild_id: int):
+        """Recompute lead roles for a guild on its next check (role created, renamed or deleted)."""
+        self._generation += 1
+        self._lead_roles.pop(guild_id, None)
+        self._forget_leads(guild_id)
+
+    def invalidate_member(self, guild_id: int, user_id: int):
+        """Forget decisions for a member whose roles changed."""
+        self._generation += 1
+        self._leads.pop((guild_id, user_id), None)
+        for _, decisions, _ in self._tasks.values():
+            decisions.pop(user_id, None)
+
+    def clear(self):
+        self._generation += 1
+        self._lead_roles.clear()
+        self._leads.clear()
+        self._tasks.clear()
+
+    def _forget_leads(self, guild_id: int):
+        for key in [k for k in self._leads if k[0] == guild_id]:
+            del self._leads[key]
+        for _, decisions, _ in self._tasks.values():
+            decisions.clear()
+
+
+permissions = PermissionCache()
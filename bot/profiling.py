@@ -0,0 +1,105 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+
+from .models import ProfileReport
+
+PROFILE_MODES = ('cpu', 'alloc')
+PROFILE_MAX_SECONDS = 120
+# Rows in the summary table
+PROFILE_TOP = 25
+# Frames kept per allocation traceback while tracing
+ALLOC_TRACE_FRAMES = 10
+
+# One profiling session per process: profilers are global to the interpreter
+_profile_lock = asyncio.Lock()
+
+
+async def run_profile(mode: str, seconds: float) -> ProfileReport:
+    """Profile the whole process for seconds and summarize it.
+
+    cpu runs cProfile on the event loop thread, which runs every handler and loop;
+    alloc diffs tracemalloc snapshots taken at the start and the end. Nothing is
+    installed outside a session. Raises ValueError if a session is already running.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+    if _profile_lock.locked():
+        raise ValueError("A profile is already running")
+    seconds = max(1.0, min(float(seconds), PROFILE_MAX_SECONDS))
+
+    async with _profile_lock:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        if mode == 'cpu':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+            summary, raw = await asyncio.to_thread(_summarize_cpu, profiler)
+            filename = f"profile-cpu-{stamp}.prof"
+        else:
+            # Leave tracing on if it was started with PYTHONTRACEMALLOC
+            started_here = not tracemalloc.is_tracing()
+            if started_here:
+                tracemalloc.start(ALLOC_TRACE_FRAMES)
+            try:
+                before = tracemalloc.take_snapshot()
+                await asyncio.sleep(seconds)
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                if started_here:
+                    tracemalloc.stop()
+            summary, raw = await asyncio.to_thread(_summarize_alloc, before, after, peak)
+            filename = f"profile-alloc-{stamp}.tracemalloc"
+
+    return ProfileReport(mode=mode, seconds=seconds, summary=summary, raw=raw, raw_filename=filename)
+
+
+def _read_dump(dump) -> bytes:
+    # pstats and tracemalloc only dump to a path
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        dump(path)
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def _summarize_cpu(profiler: cProfile.Profile):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs()
+    out.write("By own time:\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP)
+    out.write("By cumulative time:\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+    return out.getvalue(), _read_dump(profiler.dump_stats)
+
+
+def _summarize_alloc(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int):
+    # The tracer's own bookkeeping is noise
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = before.filter_traces(ignore)
+    after = after.filter_traces(ignore)
+
+    lines = [
+        f"Traced memory at end: {sum(s.size for s in after.statistics('filename')) / 1024:.1f} KiB",
+        f"Peak while tracing: {peak / 1024:.1f} KiB",
+    ]
+    lines.append(f"\nTop {PROFILE_TOP} lines by growth:")
+    for diff in after.compare_to(before, 'lineno')[:PROFILE_TOP]:
+        lines.append(str(diff))
+    lines.append(f"\nTop {PROFILE_TOP} lines by size at end:")
+    for stat in after.statistics('lineno')[:PROFILE_TOP]:
+        lines.append(str(stat))
+    return "\n".join(lines) + "\n", _read_dump(after.dump)
@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import sqlite3
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from . import tracing
+from .config import DB_SLOW_QUERY_MS
+from .metrics import DB_QUERY_SECONDS
+from .utils import histogram_percentile
+
+# Upper bounds (ms) of the per-function latency buckets used for percentiles
+LATENCY_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Statements shown, with their query plans, per slow-query log entry
+SLOW_LOG_STATEMENTS = 3
+SLOW_LOG_SQL_CHARS = 300
+# A function is logged as slow at most once per this many seconds
+SLOW_LOG_INTERVAL = 60
+
+# Statement kinds EXPLAIN QUERY PLAN is run for
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# (perf_counter at start, database path, expanded SQL) of each statement run by the
+# innermost timed function, while the slow-query log is on
+_statements: ContextVar[Optional[List[Tuple[float, str, str]]]] = ContextVar('query_statements', default=None)
+
+
+class FunctionStats:
+    """Call count, latency histogram and rows returned for one database function."""
+
+    __slots__ = ('calls', 'errors', 'total', 'max', 'rows', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+    def record(self, elapsed: float, rows: int, error: bool):
+        self.calls += 1
+        self.errors += error
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.rows += rows
+        ms = elapsed * 1000
+        for i, bound in enumerate(LATENCY_BOUNDS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile_ms(self, q: float) -> Optional[int]:
+        """Bucket upper bound holding the q-th quantile; None when it is beyond the last bound."""
+        return histogram_percentile(self.buckets, LATENCY_BOUNDS_MS, q)
+
+
+class QueryStats:
+    """Per-function statistics for bot.database since startup or the last reset."""
+
+    def __init__(self):
+        self.functions: Dict[str, FunctionStats] = {}
+        self.since = time.time()
+        self._last_logged: Dict[str, float] = {}
+        self._explains = set()
+
+    def record(self, name: str, elapsed: float, rows: int, error: bool):
+        entry = self.functions.get(name)
+        if entry is None:
+            entry = self.functions[name] = FunctionStats()
+        entry.record(elapsed, rows, error)
+
+    def top(self, sort: str = 'total', limit: int = 15) -> List[Tuple[str, FunctionStats]]:
+        """The limit busiest functions by total time, calls, rows or p95."""
+        keys = {
+            'total': lambda s: s.total,
+            'calls': lambda s: s.calls,
+            'rows': lambda s: s.rows,
+            'p95': lambda s: (s.percentile_ms(0.95) or float('inf'), s.max),
+        }
+        key = keys[sort]
+        return sorted(self.functions.items(), key=lambda item: key(item[1]), reverse=True)[:limit]
+
+    def reset(self):
+        self.functions.clear()
+        self._last_logged.clear()
+        self.since = time.time()
+
+    def log_slow(self, name: str, elapsed: float, statements: List[Tuple[float, str, str]], ended: float):
+        """Print a slow call with its slowest statements and their plans (off the caller's path)."""
+        now = time.monotonic()
+        if now - self._last_logged.get(name, -SLOW_LOG_INTERVAL) < SLOW_LOG_INTERVAL:
+            return
+        self._last_logged[name] = now
+        task = asyncio.create_task(self._explain_and_log(name, elapsed, statements, ended))
+        self._explains.add(task)
+        task.add_done_callback(self._explains.discard)
+
+    async def _explain_and_log(self, name: str, elapsed: float, statements, ended: float):
+        # A statement's duration is approximated by the gap to the next one starting
+        statements = sorted(statements)
+        timed = []
+        for i, (started, path, sql) in enumerate(statements):
+            finished = statements[i + 1][0] if i + 1 < len(statements) else ended
+            timed.append((finished - started, path, sql))
+        timed.sort(key=lambda t: t[0], reverse=True)
+
+        lines = [f"Slow query: {name} took {elapsed * 1000:.1f} ms ({len(statements)} statements)"]
+        for duration, path, sql in timed[:SLOW_LOG_STATEMENTS]:
+            sql = ' '.join(sql.split())
+            lines.append(f"  {duration * 1000:7.1f} ms  {sql[:SLOW_LOG_SQL_CHARS]}")
+            if sql.split(' ', 1)[0].upper() in EXPLAINABLE:
+                lines.extend(f"      plan: {step}" for step in await _explain(path, sql))
+        print("\n".join(lines))
+
+
+async def _explain(path: str, sql: str) -> List[str]:
+    try:
+        async with aiosqlite.connect(path) as db:
+            cursor = await db.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[3] for row in await cursor.fetchall()]
+    except sqlite3.Error as e:
+        return [f"unavailable ({e})"]
+
+
+stats = QueryStats()
+
+
+def traced_connect(path: str) -> aiosqlite.Connection:
+    """aiosqlite.connect(path), tracing statements into the running timed function if any."""
+    statements = _statements.get()
+    if statements is None:
+        return aiosqlite.connect(path)
+
+    def connector() -> sqlite3.Connection:
+        conn = sqlite3.connect(path)
+        conn.set_trace_callback(lambda sql: statements.append((time.perf_counter(), path, sql)))
+        return conn
+    return aiosqlite.Connection(connector, 64)
+
+
+def _row_count(result) -> int:
+    """Rows a function handed back: the length of collections, one per returned object."""
+    if result is None or isinstance(result, (bool, int, float, str)):
+        return 0
+    if isinstance(result, (list, tuple, dict, set, frozenset)):
+        return len(result)
+    return 1
+
+
+def timed_query(fn):
+    """Wrap a bot.database coroutine function to record its stats, trace it and log it when slow."""
+    name = fn.__name__
+    span_name = f"db {name}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token = _statements.set([]) if DB_SLOW_QUERY_MS else None
+        started = time.perf_counter()
+        result = None
+        error = True
+        with tracing.span(span_name, tracing.KIND_CLIENT, **{'db.system': 'sqlite'}) as span:
+            try:
+                result = await fn(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                ended = time.perf_counter()
+                elapsed = ended - started
+                rows = _row_count(result)
+                stats.record(name, elapsed, rows, error)
+                DB_QUERY_SECONDS.observe(elapsed, function=name)
+                statements = None
+                if token is not None:
+                    statements = _statements.get()
+                    _statements.reset(token)
+                    # Nested calls also count towards the caller's statements
+                    outer = _statements.get()
+                    if outer is not None:
+                        outer.extend(statements)
+                    if elapsed * 1000 >= DB_SLOW_QUERY_MS and statements:
+                        stats.log_slow(name, elapsed, statements, ended)
+                if span:
+                    span.set(**{'db.rows': rows})
+                    if statements is not None:
+                        span.set(**{'db.statements': len(statements)})
+    return wrapper
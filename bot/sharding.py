@@ -0,0 +1,34 @@
+from typing import Optional, Sequence, Tuple
+
+from discord.ext import commands
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """The shard Discord routes a guild to."""
+    return (guild_id >> 22) % shard_count
+
+
+def local_shards(bot: commands.Bot) -> Optional[Tuple[Sequence[int], int]]:
+    """(shard IDs run by this process, total shard count), or None when unsharded.
+
+    Also None until an auto-sharded bot has learned its shard count from Discord.
+    """
+    shard_count = getattr(bot, 'shard_count', None)
+    if not shard_count or shard_count <= 1:
+        return None
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if shard_ids is None:
+        shard_ids = [bot.shard_id or 0]
+    return list(shard_ids), shard_count
+
+
+def runs_shard_zero(bot: commands.Bot) -> bool:
+    """Whether this process owns shard 0 (always true unsharded).
+
+    Database-wide jobs such as archival, backups and command sync run only
+    here, so shard processes sharing one database do not repeat them.
+    """
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if shard_ids is None:
+        return not getattr(bot, 'shard_id', None)
+    return 0 in shard_ids
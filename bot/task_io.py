@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+from typing import IO, AsyncIterator, Iterator
+
+# Attachment types accepted by /task import
+IMPORT_EXTENSIONS = ('.json', '.ndjson', '.jsonl', '.csv', '.xml')
+
+# Column order of /task export files; history is appended when requested
+EXPORT_COLUMNS = (
+    'id', 'game', 'title', 'description', 'assignee_id', 'target_channel_id',
+    'additional_assignees', 'status', 'deadline', 'eta', 'priority', 'created_at', 'updated_at',
+)
+EXPORT_FORMATS = ('json', 'ndjson', 'csv')
+
+JSON_WHITESPACE = ' \t\r\n'
+
+
+def iter_json_array(fp: IO[str], chunk_size: int = 65536) -> Iterator:
+    """
+    Yield the items of a top-level JSON array, reading the stream in chunks.
+
+    Only the current item is held in memory, so large imports never have to be
+    loaded as a whole document.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            fill()
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of JSON input")
+
+        char = buf[pos]
+        if not started:
+            if char != '[':
+                raise ValueError("JSON must be an array of task objects")
+            started = True
+            pos += 1
+            continue
+        if char == ']':
+            return
+        if char == ',':
+            pos += 1
+            continue
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A scalar ending exactly at the buffer edge may continue in the next chunk
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            break
+        pos = end
+        yield item
+
+
+def iter_json_tasks(fp: IO[str]) -> Iterator[dict]:
+    """Yield task dicts from a JSON array, also accepting double-encoded JSON."""
+    head = fp.read(1)
+    while head and head in JSON_WHITESPACE:
+        head = fp.read(1)
+    if head == '"':
+        # Double-encoded JSON (string containing JSON) has to be decoded whole
+        tasks_data = json.loads(json.loads(head + fp.read()))
+        if not isinstance(tasks_data, list):
+            raise ValueError("JSON must be an array of task objects")
+        yield from tasks_data
+        return
+    yield from iter_json_array(_Prefixed(head, fp))
+
+
+def iter_xml_tasks(fp: IO[bytes]) -> Iterator[dict]:
+    """Yield task dicts from <tasks><task>...</task></tasks>, clearing parsed elements."""
+    root = None
+    for event, elem in ET.iterparse(fp, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        if elem.tag != 'task':
+            continue
+        task_dict = {
+            'title': elem.findtext('title', ''),
+            'description': elem.findtext('description', ''),
+            'assignee_id': elem.findtext('assignee_id', ''),
+            'target_channel_id': elem.findtext('target_channel_id', ''),
+            'deadline': elem.findtext('deadline'),
+            'priority': elem.findtext('priority'),
+        }
+        additional = elem.findtext('additional_assignees')
+        if additional:
+            task_dict['additional_assignees'] = additional
+        yield task_dict
+        root.clear()
+
+
+def iter_ndjson_tasks(fp: IO[str]) -> Iterator[dict]:
+    """Yield task dicts from newline-delimited JSON, skipping blank lines."""
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv_tasks(fp: IO[str]) -> Iterator[dict]:
+    """Yield task dicts from a CSV file with a header row; empty cells become None."""
+    for row in csv.DictReader(fp):
+        yield {k: (v if v != '' else None) for k, v in row.items()}
+
+
+def read_task_rows(fp: IO[bytes], filename: str) -> Iterator[dict]:
+    """Yield the task dicts of an import file as they are parsed.
+
+    Parsing blocks, so advance the iterator from a worker thread; fp must stay
+    open until it is exhausted.
+    """
+    if filename.endswith('.xml'):
+        yield from iter_xml_tasks(fp)
+        return
+    text = io.TextIOWrapper(fp, encoding='utf-8-sig', newline='')
+    try:
+        if filename.endswith(('.ndjson', '.jsonl')):
+            yield from iter_ndjson_tasks(text)
+        elif filename.endswith('.csv'):
+            yield from iter_csv_tasks(text)
+        else:
+            yield from iter_json_tasks(text)
+    finally:
+        text.detach()
+
+
+async def write_task_export(rows: AsyncIterator[dict], fp: IO[bytes], fmt: str, include_history: bool = False) -> int:
+    """Write export rows to a binary file object as they arrive. Returns the row count."""
+    text = io.TextIOWrapper(fp, encoding='utf-8', newline='')
+    count = 0
+    try:
+        if fmt == 'csv':
+            columns = EXPORT_COLUMNS + ('history',) if include_history else EXPORT_COLUMNS
+            writer = csv.DictWriter(text, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            async for row in rows:
+                if include_history:
+                    row['history'] = json.dumps(row['history'], ensure_ascii=False)
+                writer.writerow(row)
+                count += 1
+        elif fmt == 'ndjson':
+            async for row in rows:
+                text.write(json.dumps(row, ensure_ascii=False))
+                text.write('\n')
+                count += 1
+        else:
+            text.write('[')
+            async for row in rows:
+                text.write(',\n' if count else '\n')
+                text.write(json.dumps(row, ensure_ascii=False))
+                count += 1
+            text.write('\n]\n')
+    finally:
+        text.flush()
+        text.detach()
+    return count
+
+
+class _Prefixed:
+    """Text stream that replays already-consumed characters before the rest."""
+
+    def __init__(self, prefix: str, fp: IO[str]):
+        self.prefix = prefix
+        self.fp = fp
+
+    def read(self, size: int = -1) -> str:
+        if not self.prefix:
+            return self.fp.read(size)
+        prefix, self.prefix = self.prefix, ''
+        return prefix + self.fp.read(size - len(prefix) if size > 0 else size)
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from .config import TRACE_FILE, TRACE_SAMPLE_RATE
+
+SERVICE_NAME = 'gamedev-discord-bot'
+SCOPE_NAME = 'bot.tracing'
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2    # an interaction
+KIND_CLIENT = 3    # a database call or REST request
+KIND_CONSUMER = 5  # a queued job
+
+# Spans kept per trace; the rest are counted but dropped
+MAX_SPANS_PER_TRACE = 2000
+
+_current: ContextVar[Optional['Span']] = ContextVar('trace_span', default=None)
+_sink = None
+
+
+class Trace:
+    __slots__ = ('trace_id', 'spans', 'dropped', 'exported')
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.exported = False
+
+
+class Span:
+    """One timed operation in a trace. Finished spans are exported with their trace."""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: int, attributes: Dict):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.end_ns: Optional[int] = None
+        self.start_ns = time.time_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error: BaseException = None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = repr(error)
+        trace = self.trace
+        if len(trace.spans) < MAX_SPANS_PER_TRACE:
+            trace.spans.append(self)
+        else:
+            trace.dropped += 1
+        if self.parent_id is None:
+            if trace.dropped:
+                self.attributes['trace.dropped_spans'] = trace.dropped
+            _export(trace.spans)
+            trace.exported = True
+        elif trace.exported:
+            # Finished after its root (e.g. in a task the handler spawned)
+            _export([self])
+
+    def to_otlp(self) -> Dict:
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_attribute(k, v) for k, v in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def _export(spans: List[Span]):
+    """Append spans to TRACE_FILE as one OTLP/JSON ExportTraceServiceRequest per line."""
+    global _sink
+    if not spans:
+        return
+    try:
+        if _sink is None:
+            directory = os.path.dirname(TRACE_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            _sink = open(TRACE_FILE, 'a', encoding='utf-8')
+        _sink.write(json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [_attribute('service.name', SERVICE_NAME), _attribute('process.pid', os.getpid())]},
+            'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': [s.to_otlp() for s in spans]}],
+        }]}, separators=(',', ':')) + '\n')
+        _sink.flush()
+    except OSError as e:
+        print(f"Failed to write trace to {TRACE_FILE}: {e}")
+
+
+def enabled() -> bool:
+    return bool(TRACE_FILE)
+
+
+def start_span(name: str, kind: int = KIND_INTERNAL, root: bool = False, **attributes) -> Optional[Span]:
+    """A child of the current span, or a new sampled trace if root. None when not tracing."""
+    parent = _current.get()
+    if parent is not None:
+        return Span(parent.trace, name, parent.span_id, kind, attributes)
+    if not root or not TRACE_FILE or random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    return Span(Trace(), name, None, kind, attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, root: bool = False, **attributes):
+    """Time the block as a span and make it the parent of spans opened inside it.
+
+    Yields the span, or None when there is no trace to add to (then this costs one
+    context variable lookup).
+    """
+    current = start_span(name, kind, root, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    else:
+        current.finish()
+    finally:
+        _current.reset(token)
+
+
+# ============== CLI ==============
+
+def _load_spans(path: str) -> Dict[str, List[Dict]]:
+    traces: Dict[str, List[Dict]] = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    for s in scope['spans']:
+                        traces.setdefault(s['traceId'], []).append(s)
+    return traces
+
+
+def _print_waterfall(spans: List[Dict], width: int = 40):
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        children.setdefault(s.get('parentSpanId'), []).append(s)
+    roots = children.get(None) or sorted(spans, key=lambda s: int(s['startTimeUnixNano']))[:1]
+    start = min(int(s['startTimeUnixNano']) for s in spans)
+    end = max(int(s['endTimeUnixNano']) for s in spans)
+    total = max(end - start, 1)
+
+    def show(s, depth):
+        s_start = int(s['startTimeUnixNano']) - start
+        s_len = int(s['endTimeUnixNano']) - int(s['startTimeUnixNano'])
+        offset = round(s_start / total * width)
+        bar = ' ' * offset + '#' * max(1, round(s_len / total * width))
+        flag = ' !' if s.get('status', {}).get('code') == 2 else ''
+        print(f"{s_start / 1e6:8.1f} {s_len / 1e6:8.1f} ms |{bar:<{width}}| {'  ' * depth}{s['name']}{flag}")
+        for child in sorted(children.get(s['spanId'], []), key=lambda c: int(c['startTimeUnixNano'])):
+            show(child, depth + 1)
+
+    root = roots[0]
+    attrs = ' '.join(f"{a['key']}={list(a['value'].values())[0]}" for a in root.get('attributes', []))
+    print(f"trace {root['traceId']}  {total / 1e6:.1f} ms  {len(spans)} spans  {attrs}")
+    for r in roots:
+        show(r, 0)
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bot.tracing', description="Show trace waterfalls from TRACE_FILE")
+    parser.add_argument('file', nargs='?', default=TRACE_FILE or None, help="trace file (default: TRACE_FILE)")
+    parser.add_argument('--trace', help="only this trace ID")
+    parser.add_argument('--last', type=int, default=5, help="show the N most recent traces (default: %(default)s)")
+    parser.add_argument('--slowest', type=int, help="show the N slowest traces instead")
+    parser.add_argument('--name', help="only traces whose root span name contains this")
+    args = parser.parse_args(argv)
+    if not args.file:
+        parser.error("no trace file given and TRACE_FILE is not set")
+
+    traces = _load_spans(args.file)
+    if args.trace:
+        selected = [traces[args.trace]] if args.trace in traces else []
+    else:
+        def root_of(spans):
+            return next((s for s in spans if not s.get('parentSpanId')), spans[0])
+        candidates = [spans for spans in traces.values() if not args.name or args.name in root_of(spans)['name']]
+        if args.slowest:
+            def duration(spans):
+                root = root_of(spans)
+                return int(root['endTimeUnixNano']) - int(root['startTimeUnixNano'])
+            selected = sorted(candidates, key=duration, reverse=True)[:args.slowest]
+        else:
+            candidates.sort(key=lambda spans: int(root_of(spans)['startTimeUnixNano']))
+            selected = candidates[-args.last:]
+
+    if not selected:
+        print("No matching traces")
+    for spans in selected:
+        _print_waterfall(spans)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 import re
-from typing import Set
+from datetime import datetime, timezone
+from typing import Optional, Set
 
 
+# Non-ISO deadline formats accepted besides datetime.fromisoformat()
+DEADLINE_FORMATS = ("%Y/%m/%d", "%Y/%m/%d %H:%M", "%d.%m.%Y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y")
+
 # Articles/prepositions to skip (lowercase only, unless first word)
 SKIP_WORDS = {"a", "an", "the", "of", "in", "on", "at", "to", "for", "and", "or", "but"}
 
@@ -81,3 +85,87 @@ def format_role_name(acronym: str, role_suffix: str) -> str:
     Example: format_role_name("SaB", "Coder") -> "SaB-Coder"
     """
     return f"{acronym}-{role_suffix}"
+
+
+def parse_deadline(value) -> Optional[int]:
+    """
+    Parse a deadline into a UTC epoch timestamp, or None if it is not a date.
+    
+    Dates without a time mean midnight; values without a timezone are UTC.
+    
+    Examples:
+        "2026-05-20" -> 1779235200
+        "2026-05-20T18:00:00+02:00" -> 1779292800
+        "20 May 2026" -> 1779235200
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in DEADLINE_FORMATS:
+            try:
+                dt = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration compactly.
+    
+    Examples:
+        5400 -> "1.5h"
+        172800 -> "2d"
+    """
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}".rstrip('0').rstrip('.') + "h"
+    return f"{seconds / 86400:.1f}".rstrip('0').rstrip('.') + "d"
+
+
+def format_size(size: float) -> str:
+    """
+    Format a byte count with a binary unit.
+    
+    Examples:
+        512 -> "512 B"
+        1536 -> "1.5 KB"
+    """
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+
+def histogram_percentile(counts, bounds, q: float) -> Optional[int]:
+    """
+    Upper bound of the histogram bucket holding the q-th quantile.
+    
+    counts has one more entry than bounds (the overflow bucket); returns None
+    when the quantile falls in the overflow bucket or the histogram is empty.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    target = q * total
+    running = 0
+    for i, n in enumerate(counts):
+        running += n
+        if running >= target:
+            return bounds[i] if i < len(bounds) else None
+    return None
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .config import WATCHDOG_LAG_MS, ASYNCIO_DEBUG
+from .metrics import LOOP_LAG_SECONDS, LOOP_LAG_HISTOGRAM, LOOP_STALLS
+
+# Seconds between event loop lag probes
+PROBE_INTERVAL = 0.5
+# Stacks of blocked loops are printed at most once per this many seconds
+STACK_LOG_INTERVAL = 10
+# Innermost frames printed per stack
+STACK_LIMIT = 25
+
+
+class LoopWatchdog:
+    """
+    Measures how late the event loop runs a timer, and finds out why.
+
+    A probe task sleeps PROBE_INTERVAL at a time and records how late it woke
+    up. A daemon thread watches the probe's heartbeat; when the loop has not
+    come back for WATCHDOG_LAG_MS past the expected wake-up, the thread prints
+    the loop thread's current stack, which is the code blocking it. With
+    ASYNCIO_DEBUG, asyncio also logs every callback slower than the threshold.
+    """
+
+    def __init__(self, threshold_ms: float = WATCHDOG_LAG_MS, debug: bool = ASYNCIO_DEBUG):
+        self.threshold = threshold_ms / 1000
+        self.debug = debug
+        self._beat = 0
+        self._beat_deadline = 0.0
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._last_stack_log = -STACK_LOG_INTERVAL
+
+    def start(self):
+        """Start probing the running loop. Call from inside it."""
+        if self._task or not self.threshold:
+            return
+        loop = asyncio.get_running_loop()
+        if self.debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._probe())
+        threading.Thread(target=self._watch, name='loop-watchdog', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + PROBE_INTERVAL
+            self._beat_deadline = time.monotonic() + PROBE_INTERVAL + self.threshold
+            self._beat += 1
+            await asyncio.sleep(PROBE_INTERVAL)
+            lag = max(loop.time() - expected, 0.0)
+            LOOP_LAG_SECONDS.set(lag)
+            LOOP_LAG_HISTOGRAM.observe(lag)
+            if lag > self.threshold:
+                LOOP_STALLS.inc()
+                print(f"Event loop lagged {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(min(self.threshold / 2, PROBE_INTERVAL)):
+            beat = self._beat
+            if beat == reported or time.monotonic() < self._beat_deadline:
+                continue
+            # The probe is overdue: whatever the loop thread is running now is blocking it
+            reported = beat
+            now = time.monotonic()
+            if now - self._last_stack_log < STACK_LOG_INTERVAL:
+                continue
+            self._last_stack_log = now
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            print(f"Event loop blocked for over {self.threshold * 1000:.0f} ms in:\n{stack}", end='')
+
+
+watchdog = LoopWatchdog()
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+
+import discord
+
+from . import metrics, tracing
+from .config import DISCORD_TOKEN
+from .database import init_db
+from .discord_api import use_api_base
+from .job_queue import JobConsumer
+from .jobs import RestContext, register_shared_jobs
+from .watchdog import watchdog
+
+
+class Worker:
+    """
+    Runs queued reminders, role syncs and template syncs over the REST API.
+
+    Never connects to the gateway, so the bot process (JOB_WORKER=true) stays
+    free to ack interactions. Guilds, members and channels are fetched per job
+    instead of read from a cache. Jobs that need the bot's state (imports,
+    assignee migration) stay with the bot.
+    """
+
+    def __init__(self):
+        use_api_base()
+        # The members intent is required by fetch_members
+        intents = discord.Intents.none()
+        intents.members = True
+        self.client = discord.Client(intents=intents, http_trace=metrics.http_trace() if tracing.enabled() else None)
+        self.consumer = JobConsumer()
+        register_shared_jobs(self.consumer, RestContext(self.client))
+
+    async def run(self, once: bool = False):
+        watchdog.start()
+        await init_db()
+        async with self.client:
+            await self.client.login(DISCORD_TOKEN)
+            print(f"Worker logged in as {self.client.user}")
+            await self.consumer.run(stop_when_empty=once)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bot.worker', description="Run queued background jobs over REST")
+    parser.add_argument('--once', action='store_true', help="exit when the queue is empty")
+    args = parser.parse_args(argv)
+
+    if not DISCORD_TOKEN:
+        print("Error: DISCORD_TOKEN not set in environment")
+        return
+
+    try:
+        asyncio.run(Worker().run(once=args.once))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()